@@ -0,0 +1,40 @@
+# 整部视频重新编码的性能对比：一个 ffmpeg 进程 vs 关键帧分段并行编码
+#
+# 用法:
+#   python benchmarks/bench_chunked_encode.py --video 视频.mp4 [--workers 2 4 8] [--chunk_seconds 60] [--filter scale=1280:720]
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from movie_opt.chunked_encode import encode_chunked, default_workers
+
+
+def main():
+    parser = argparse.ArgumentParser(description="分段并行编码性能对比")
+    parser.add_argument("--video", required=True, help="视频文件路径")
+    parser.add_argument("--workers", type=int, nargs="+", default=None, help="同时编码的段数，可以写多个，默认CPU核数的四分之一")
+    parser.add_argument("--chunk_seconds", type=float, default=60, help="每一段的大约秒数")
+    parser.add_argument("--filter", default=None, help="视频滤镜，例如 scale=1280:720")
+    args = parser.parse_args()
+
+    output_dir = tempfile.mkdtemp(prefix="bench-chunked-")
+    extension = os.path.splitext(args.video)[1]
+    try:
+        baseline = None
+        for workers in [1] + (args.workers or [default_workers()]):
+            output_path = os.path.join(output_dir, f"output-{workers}{extension}")
+            start = time.perf_counter()
+            encode_chunked(args.video, output_path, video_filter=args.filter, workers=workers, chunk_seconds=args.chunk_seconds)
+            elapsed = time.perf_counter() - start
+            if baseline is None:
+                baseline = elapsed
+            name = "单进程" if workers == 1 else f"分段并行 workers={workers}"
+            print(f"{name}: {elapsed:.2f} 秒 加速比:{baseline / elapsed:.2f}x 输出大小:{os.path.getsize(output_path) / 1024 / 1024:.1f}MB")
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
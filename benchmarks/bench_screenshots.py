@@ -0,0 +1,56 @@
+# 每行截图的性能对比：逐行截图 vs 批量截图
+#
+# 用法:
+#   python benchmarks/bench_screenshots.py --video 视频.mp4 --srt 字幕.srt [--limit 50]
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from movie_opt.commands.picture import (
+    extract_subtitle_info_from_srt,
+    extract_line_screenshot,
+    extract_line_screenshots,
+    line_screenshot_seconds,
+)
+
+
+def bench_per_line(split_endtime_json_list, video_name, video, screenshots_dir):
+    id_counter = 0
+    for info in split_endtime_json_list:
+        id_counter += 1
+        screenshot_path = os.path.join(screenshots_dir, f"{video_name}-{id_counter}.jpg")
+        extract_line_screenshot(video, line_screenshot_seconds(info), screenshot_path)
+    return id_counter
+
+
+def bench_batch(split_endtime_json_list, video_name, video, screenshots_dir):
+    return len(extract_line_screenshots(split_endtime_json_list, video_name, video, screenshots_dir))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="每行截图性能对比")
+    parser.add_argument("--video", required=True, help="视频文件路径")
+    parser.add_argument("--srt", required=True, help="字幕文件路径")
+    parser.add_argument("--limit", type=int, default=None, help="只截取前N行")
+    args = parser.parse_args()
+
+    split_endtime_json_list = extract_subtitle_info_from_srt(args.srt)
+    if args.limit is not None:
+        split_endtime_json_list = split_endtime_json_list[:args.limit]
+    video_name = os.path.splitext(os.path.basename(args.video))[0]
+
+    for name, func in (("逐行截图", bench_per_line), ("批量截图", bench_batch)):
+        screenshots_dir = tempfile.mkdtemp(prefix="bench-screenshots-")
+        try:
+            start = time.perf_counter()
+            count = func(split_endtime_json_list, video_name, args.video, screenshots_dir)
+            elapsed = time.perf_counter() - start
+            print(f"{name}: {count} 张 {elapsed:.2f} 秒 ({elapsed / max(count, 1):.3f} 秒/张)")
+        finally:
+            shutil.rmtree(screenshots_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import logging
+import os
+import subprocess
+import threading
+from functools import lru_cache
+
+from movie_opt import audio_pcm
+from movie_opt import clip_spec
+from movie_opt.encoder import video_encode_args
+from movie_opt.config import CACHE_DIR
+
+
+# 包内静态文件所在的文件夹
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "commands", "static")
+
+# 处理好的片头视频保存在用户缓存文件夹中，不修改包内的静态文件
+HEADER_CACHE_DIR = os.path.join(CACHE_DIR, "headers")
+
+_header_lock = threading.Lock()
+
+
+def static_path(name):
+    """静态文件的完整路径，文件不存在抛出 FileNotFoundError"""
+    path = os.path.join(STATIC_DIR, name)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"静态文件不存在: {path}")
+    return path
+
+
+@lru_cache(maxsize=None)
+def audio_asset(name):
+    """
+    静态音频（empty1s.mp3、ding.mp3、follow.mp3、slowly.mp3）解码后的 PCM。
+
+    每个进程只解码一次，返回的数组是只读的，可以在多个线程中共享。
+    """
+    pcm = audio_pcm.decode_audio(static_path(name))
+    pcm.flags.writeable = False
+    logging.info(f"加载静态音频 {name} 时长:{audio_pcm.duration(pcm):.3f}秒")
+    return pcm
+
+
+def audio_asset_duration(name):
+    """静态音频的时长（秒），由采样数计算"""
+    return audio_pcm.duration(audio_asset(name))
+
+
+def header_video(name):
+    """
+    返回可以直接拼接的片头视频（例如 "中英对照横屏.mp4"）。
+
+    第一次使用时把包内的片头转换为统一的片段格式（clip_spec）保存到 HEADER_CACHE_DIR，之后直接复用。
+    源文件大小或修改时间变化后重新生成。
+    """
+    source = static_path(name)
+    stat = os.stat(source)
+    base_name, ext = os.path.splitext(name)
+    output_path = os.path.join(HEADER_CACHE_DIR, f"{base_name}-{stat.st_size}-{stat.st_mtime_ns}-{clip_spec.FPS}-{clip_spec.TIMESCALE}{ext}")
+
+    with _header_lock:
+        if os.path.exists(output_path):
+            return output_path
+        os.makedirs(HEADER_CACHE_DIR, exist_ok=True)
+        temp_path = f"{output_path}.temp{ext}"
+        command = [
+            "ffmpeg", "-y",
+            "-i", source,
+            *clip_spec.map_args(),
+            *video_encode_args(),
+            *clip_spec.output_args(),                      # 统一帧率、timescale 和音频参数，拼接时可以直接复制
+            temp_path
+        ]
+        logging.info(f"生成片头缓存 {' '.join(command)}")
+        try:
+            subprocess.run(command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            os.replace(temp_path, output_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+    return output_path
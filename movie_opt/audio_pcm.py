@@ -0,0 +1,84 @@
+import logging
+import subprocess
+import wave
+
+import numpy as np
+
+
+# 内存中统一使用的 PCM 格式：44.1kHz 双声道 16 位
+SAMPLE_RATE = 44100
+CHANNELS = 2
+
+
+def decode_audio(file_path, sample_rate=SAMPLE_RATE, channels=CHANNELS):
+    """
+    用 ffmpeg 把音频解码为内存中的 PCM 数组。
+
+    :return: numpy int16 数组，形状为 (采样数, 声道数)
+    """
+    command = [
+        "ffmpeg", "-v", "error",
+        "-i", file_path,
+        "-vn",
+        "-f", "s16le",
+        "-acodec", "pcm_s16le",
+        "-ar", str(sample_rate),
+        "-ac", str(channels),
+        "pipe:1"
+    ]
+    logging.info(" ".join(command))
+    result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise RuntimeError(f"解码音频失败 {file_path}: {result.stderr.decode('utf-8', errors='ignore').strip()}")
+    return np.frombuffer(result.stdout, dtype=np.int16).reshape(-1, channels)
+
+
+def silence(seconds, sample_rate=SAMPLE_RATE, channels=CHANNELS):
+    """生成 seconds 秒的静音"""
+    return np.zeros((max(0, int(round(seconds * sample_rate))), channels), dtype=np.int16)
+
+
+def silence_samples(samples, channels=CHANNELS):
+    """生成 samples 个采样的静音"""
+    return np.zeros((max(0, samples), channels), dtype=np.int16)
+
+
+def concat(*tracks):
+    """按顺序拼接多段 PCM"""
+    return np.concatenate(tracks, axis=0)
+
+
+def duration(pcm, sample_rate=SAMPLE_RATE):
+    """由采样数计算时长（秒）"""
+    return len(pcm) / sample_rate
+
+
+def input_args(sample_rate=SAMPLE_RATE, channels=CHANNELS):
+    """ffmpeg 从标准输入读取 PCM 时的输入参数，运行时把 pcm.tobytes() 写入 stdin"""
+    return ["-f", "s16le", "-ar", str(sample_rate), "-ac", str(channels), "-i", "pipe:0"]
+
+
+def write_wav(pcm, output_path, sample_rate=SAMPLE_RATE):
+    """把 PCM 保存为 wav（不需要编码）"""
+    with wave.open(output_path, "wb") as f:
+        f.setnchannels(pcm.shape[1])
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(np.ascontiguousarray(pcm).tobytes())
+
+
+def fit(pcm, samples):
+    """截取或在末尾补静音，使 PCM 正好是 samples 个采样"""
+    if len(pcm) >= samples:
+        return pcm[:samples]
+    return concat(pcm, silence_samples(samples - len(pcm), channels=pcm.shape[1]))
+
+
+def read_wav(file_path):
+    """读取 write_wav 保存的 16 位 wav，不启动 ffmpeg"""
+    with wave.open(file_path, "rb") as f:
+        if f.getsampwidth() != 2:
+            raise ValueError(f"只支持16位wav: {file_path}")
+        channels = f.getnchannels()
+        data = f.readframes(f.getnframes())
+    return np.frombuffer(data, dtype=np.int16).reshape(-1, channels)
@@ -0,0 +1,138 @@
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from movie_opt import config
+from movie_opt.encoder import video_encode_args, use_nvenc, threads_per_encoder
+from movie_opt.media_probe import probe_media, keyframe_times
+
+
+def plan_chunks(keyframes, duration, chunk_seconds):
+    """
+    在关键帧处把 [0, duration) 切成大约 chunk_seconds 秒的几段。
+
+    每一段都从关键帧开始，输入跳转（-ss 在 -i 前面）到段开头时不需要解码前面的画面，段与段之间没有重叠。
+    最后一段太短（不到 chunk_seconds 的一半）时并入前一段。
+
+    :return: [(开始秒, 结束秒), ...]
+    """
+    chunks = []
+    start = 0.0
+    for keyframe in sorted(keyframes):
+        if keyframe - start >= chunk_seconds and duration - keyframe >= chunk_seconds / 2:
+            chunks.append((start, keyframe))
+            start = keyframe
+    chunks.append((start, duration))
+    return chunks
+
+
+def default_workers():
+    # libx264 每个进程本身也是多线程的，同时编码的段数取 CPU 核数的四分之一
+    return max(1, (os.cpu_count() or 1) // 4)
+
+
+def _run(command, cwd=None):
+    logging.info(f"分段编码 {' '.join(command)}")
+    subprocess.run(command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=cwd)
+
+
+def _video_filter_args(video_filter, start, duration, workspace):
+    if video_filter is None:
+        return []
+    if callable(video_filter):
+        video_filter = video_filter(start, duration, workspace)
+    return ["-vf", video_filter]
+
+
+def encode_chunked(input_path, output_path, video_filter=None, audio_args=None, extra_args=None, workers=None, chunk_seconds=None):
+    """
+    重新编码整部视频：在关键帧处切成几段，多个 ffmpeg 进程用相同的参数同时编码，最后无损拼接。
+
+    音频单独处理一次（默认直接复制），拼接时和视频复用在一起。
+    只有一段、workers 为 1、config.CHUNKED_ENCODE 为 False 或者使用 nvenc（显卡同时编码的会话数有限）时，
+    退回到一个 ffmpeg 进程编码。
+
+    :param video_filter: 可选，视频滤镜字符串，或者 (段开始秒, 段时长, 段工作目录) -> 滤镜字符串 的函数。
+                         每一段的时间戳都从 0 开始，和时间有关的滤镜（例如 ass 字幕）需要用函数按段平移；
+                         ffmpeg 以段工作目录为工作目录运行，滤镜中可以使用相对文件名
+    :param audio_args: 音频编码参数，默认 ["-c:a", "copy"]
+    :param extra_args: 最终输出文件的其他参数（例如 -movflags）
+    :param workers: 同时编码的段数，默认 config.CHUNK_ENCODE_WORKERS
+    :param chunk_seconds: 每一段的大约时长，默认 config.CHUNK_ENCODE_SECONDS
+    :raises subprocess.CalledProcessError: 任何一个 ffmpeg 进程失败
+    """
+    workers = workers or config.CHUNK_ENCODE_WORKERS or default_workers()
+    chunk_seconds = chunk_seconds or config.CHUNK_ENCODE_SECONDS
+    audio_args = audio_args if audio_args is not None else ["-c:a", "copy"]
+    extra_args = extra_args or []
+    input_path = os.path.abspath(input_path)
+    output_path = os.path.abspath(output_path)
+
+    info = probe_media(input_path)
+    chunks = [(0.0, info.duration)]
+    if config.CHUNKED_ENCODE and workers > 1 and not use_nvenc():
+        chunks = plan_chunks(keyframe_times(input_path), info.duration, chunk_seconds)
+
+    workspace = tempfile.mkdtemp(prefix=".chunks-", dir=os.path.dirname(output_path))
+    try:
+        if len(chunks) <= 1:
+            command = [
+                "ffmpeg", "-y",
+                "-i", input_path,
+                "-map", "0:v:0", "-map", "0:a:0?",
+                *_video_filter_args(video_filter, 0.0, info.duration, workspace),
+                *video_encode_args(),
+                *audio_args,
+                *extra_args,
+                output_path
+            ]
+            _run(command, cwd=workspace)
+            return output_path
+
+        # 每个 x264 进程使用的线程数，避免几个进程同时抢占所有核心
+        encode_args = video_encode_args(threads=threads_per_encoder(workers))
+
+        jobs = []
+        parts = []
+        for index, (start, end) in enumerate(chunks):
+            chunk_dir = os.path.join(workspace, str(index))
+            os.makedirs(chunk_dir)
+            part_path = os.path.join(workspace, f"chunk-{index}.mp4")
+            parts.append(part_path)
+            jobs.append(([
+                "ffmpeg", "-y",
+                "-ss", f"{start:.6f}",          # 从关键帧开始
+                "-i", input_path,
+                "-t", f"{end - start:.6f}",
+                "-map", "0:v:0", "-an",
+                *_video_filter_args(video_filter, start, end - start, chunk_dir),
+                *encode_args,
+                part_path
+            ], chunk_dir))
+
+        audio_path = None
+        if info.has_audio:
+            audio_path = os.path.join(workspace, "audio.mka")
+            jobs.append((["ffmpeg", "-y", "-i", input_path, "-map", "0:a:0", "-vn", *audio_args, audio_path], workspace))
+
+        logging.info(f"分段编码 {input_path} 段数:{len(chunks)} workers:{workers}")
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for future in [pool.submit(_run, command, cwd) for command, cwd in jobs]:
+                future.result()
+
+        concat_list = os.path.join(workspace, "concat.txt")
+        with open(concat_list, "w", encoding="utf-8") as f:
+            for part_path in parts:
+                f.write(f"file '{part_path}'\n")
+
+        command = ["ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", concat_list]
+        if audio_path is not None:
+            command.extend(["-i", audio_path, "-map", "0:v:0", "-map", "1:a:0"])
+        command.extend(["-c", "copy", *extra_args, output_path])
+        _run(command)
+        return output_path
+    finally:
+        shutil.rmtree(workspace, ignore_errors=True)
@@ -0,0 +1,238 @@
+import logging
+import os
+import re
+import sqlite3
+import threading
+
+from movie_opt.media_probe import probe_media
+
+
+# 每部电影的“视频片段”文件夹中的片段目录：生成片段的代码登记每个片段，合并时按索引查询，不再遍历文件夹
+CATALOG_NAME = "clip_catalog.db"
+
+# 每行视频的文件夹类型（文件夹名为 {类型}-{视频名}，文件名为 {视频名}-{行号}{后缀}）
+LINE_KINDS = (
+    "每行完整视频", "每行分段视频", "每行中文视频", "每行儿童发音视频",
+    "每行发音视频", "每行发音视频2", "每行跟读视频",
+)
+
+# 合并视频的文件夹类型前缀（文件夹名为 合并视频-{类型}-{片段序号}）
+MERGED_PREFIX = "合并视频-"
+
+VIDEO_EXTENSIONS = (".mp4", ".mkv", ".avi", ".mov", ".flv")
+
+
+def split_video_name(video_name):
+    """视频名 {电影名}-{片段序号} 拆分为 (电影名, 片段序号)，没有序号时序号为 None"""
+    match = re.match(r"^(.*)-(\d+)$", video_name)
+    if match:
+        return match.group(1), int(match.group(2))
+    return video_name, None
+
+
+def parse_clip_path(file_path):
+    """
+    根据文件夹和文件名识别片段，识别不了返回 None。
+
+    :return: {"kind", "movie", "segment", "line"}，合并视频的 line 为 None
+    """
+    folder = os.path.basename(os.path.dirname(file_path))
+    name, ext = os.path.splitext(os.path.basename(file_path))
+    if ext.lower() not in VIDEO_EXTENSIONS:
+        return None
+
+    if folder.startswith(MERGED_PREFIX):
+        kind, _, segment = folder.rpartition("-")
+        if not segment.isdigit():
+            return None
+        movie, _ = split_video_name(name)
+        return {"kind": kind, "movie": movie, "segment": int(segment), "line": None}
+
+    kind, _, video_name = folder.partition("-")
+    if kind not in LINE_KINDS or not name.startswith(video_name + "-"):
+        return None
+    line = name[len(video_name) + 1:]
+    if not line.isdigit():
+        return None
+    movie, segment = split_video_name(video_name)
+    return {"kind": kind, "movie": movie, "segment": segment, "line": int(line)}
+
+
+# 片段目录中记录的媒体信息
+MEDIA_FIELDS = ("duration", "width", "height", "fps", "video_codec", "audio_codec")
+
+
+def probe_clip_media(file_path):
+    """用 ffprobe 读取片段的媒体信息（只用于不是由生成它的代码登记的片段），读取失败时返回 None"""
+    try:
+        info = probe_media(file_path)
+    except Exception as e:
+        logging.error(f"登记片段时读取媒体信息失败 {file_path}: {e}")
+        return None
+    return {
+        "duration": info.duration, "width": info.width, "height": info.height,
+        "fps": info.fps, "video_codec": info.video_codec, "audio_codec": info.audio_codec,
+    }
+
+
+class ClipCatalog:
+    """
+    一部电影所有片段的 SQLite 目录。
+
+    每个片段一行：(路径, 类型, 电影名, 片段序号, 行号, 时长, 格式, 大小, 修改时间)，
+    按 (类型, 片段序号, 行号) 建索引；查询时文件已经不存在的记录自动删除，被修改过的更新大小和修改时间。
+    媒体信息由生成片段的代码登记时给出，只有 sync 发现的旧片段才调用 ffprobe。
+    """
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self.db_path = os.path.join(self.root, CATALOG_NAME)
+        self.lock = threading.Lock()
+        self.conn = None
+        self.synced = False
+
+    def _connect(self):
+        if self.conn is None:
+            os.makedirs(self.root, exist_ok=True)
+            self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS clips ("
+                "path TEXT PRIMARY KEY, kind TEXT NOT NULL, movie TEXT, segment INTEGER, line INTEGER, "
+                "duration REAL, width INTEGER, height INTEGER, fps REAL, video_codec TEXT, audio_codec TEXT, "
+                "size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL)"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS clips_kind_segment_line ON clips (kind, segment, line)")
+            self.conn.commit()
+        return self.conn
+
+    def register(self, file_path, kind, movie, segment, line=None, media=None):
+        """
+        登记一个生成好的片段，同一路径重复登记时覆盖。
+
+        :param media: 生成片段的代码已知的媒体信息 {"duration", "width", "height", "fps", "video_codec", "audio_codec"}
+                      （见 clip_spec.clip_media），不调用 ffprobe；没有的项目记录为 NULL
+        """
+        path = os.path.abspath(file_path)
+        stat = os.stat(path)
+        media = media or {}
+        media = tuple(media.get(key) for key in MEDIA_FIELDS)
+        with self.lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO clips VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (path, kind, movie, segment, line) + media + (stat.st_size, stat.st_mtime_ns)
+            )
+            conn.commit()
+
+    def sync(self):
+        """
+        遍历一次文件夹，登记还没有登记的片段（例如旧版本生成的文件），删除已经不存在的记录。
+
+        每个进程只遍历一次，之后生成的片段由生成它的代码登记。
+        """
+        if self.synced:
+            return
+        with self.lock:
+            conn = self._connect()
+            known = {row[0]: (row[1], row[2]) for row in conn.execute("SELECT path, size, mtime_ns FROM clips")}
+        found = 0
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                parsed = parse_clip_path(path)
+                if parsed is None:
+                    continue
+                stat = os.stat(path)
+                if known.pop(path, None) == (stat.st_size, stat.st_mtime_ns):
+                    continue
+                # 不是由生成它的代码登记的片段，媒体信息未知，只有这里调用 ffprobe
+                self.register(path, parsed["kind"], parsed["movie"], parsed["segment"], parsed["line"], probe_clip_media(path))
+                found += 1
+        with self.lock:
+            conn = self._connect()
+            conn.executemany("DELETE FROM clips WHERE path = ?", [(path,) for path in known])
+            conn.commit()
+        self.synced = True
+        logging.info(f"同步片段目录 {self.root} 新登记:{found} 删除:{len(known)}")
+
+    def _rows(self, sql, params):
+        with self.lock:
+            conn = self._connect()
+            conn.row_factory = sqlite3.Row
+            try:
+                rows = conn.execute(sql, params).fetchall()
+            finally:
+                conn.row_factory = None
+        valid = []
+        stale = []
+        for row in rows:
+            row = dict(row)
+            try:
+                stat = os.stat(row["path"])
+            except OSError:
+                stale.append(row["path"])
+                continue
+            if (stat.st_size, stat.st_mtime_ns) != (row["size"], row["mtime_ns"]):
+                # 文件被修改过（例如 change_timescale），时长不变，只更新大小和修改时间
+                media = {key: row[key] for key in MEDIA_FIELDS}
+                self.register(row["path"], row["kind"], row["movie"], row["segment"], row["line"], media)
+                row.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+            valid.append(row)
+        if stale:
+            with self.lock:
+                conn = self._connect()
+                conn.executemany("DELETE FROM clips WHERE path = ?", [(path,) for path in stale])
+                conn.commit()
+        return valid
+
+    def segments(self, kinds):
+        """这些类型的片段所在的片段序号（升序）"""
+        placeholders = ",".join("?" for _ in kinds)
+        rows = self._rows(f"SELECT * FROM clips WHERE kind IN ({placeholders}) AND segment IS NOT NULL", tuple(kinds))
+        return sorted({row["segment"] for row in rows})
+
+    def lines(self, kinds, segment):
+        """一个片段序号中这些类型的每行视频，按 (行号, kinds 中的顺序) 排序"""
+        placeholders = ",".join("?" for _ in kinds)
+        rows = self._rows(f"SELECT * FROM clips WHERE segment = ? AND kind IN ({placeholders})", (segment,) + tuple(kinds))
+        return sorted(rows, key=lambda row: (row["line"] if row["line"] is not None else float("inf"), kinds.index(row["kind"])))
+
+    def merged(self, kind):
+        """某种合并视频：{片段序号: 记录}"""
+        return {row["segment"]: row for row in self._rows("SELECT * FROM clips WHERE kind = ? AND line IS NULL", (kind,))}
+
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def open_catalog(root):
+    """root 文件夹（“视频片段”）的片段目录，同一个进程中共用一个对象"""
+    root = os.path.abspath(root)
+    with _catalogs_lock:
+        catalog = _catalogs.get(root)
+        if catalog is None:
+            catalog = ClipCatalog(root)
+            _catalogs[root] = catalog
+        return catalog
+
+
+def register_clip(file_path, kind=None, line=None, media=None):
+    """
+    生成片段的代码调用：登记到片段所在文件夹的上一级（“视频片段”）的目录中。
+
+    kind/line 为 None 时根据文件夹和文件名识别；登记失败只记录日志，不影响生成。
+
+    :param media: 已知的媒体信息（见 clip_spec.clip_media），登记时不调用 ffprobe
+    """
+    try:
+        parsed = parse_clip_path(file_path) or {}
+        kind = kind or parsed.get("kind")
+        if kind is None:
+            logging.error(f"无法识别片段类型，不登记: {file_path}")
+            return
+        line = line if line is not None else parsed.get("line")
+        root = os.path.dirname(os.path.dirname(os.path.abspath(file_path)))
+        open_catalog(root).register(file_path, kind, parsed.get("movie"), parsed.get("segment"), line, media)
+    except Exception as e:
+        logging.error(f"登记片段失败 {file_path}: {e}")
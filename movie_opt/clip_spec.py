@@ -0,0 +1,119 @@
+import logging
+
+from movie_opt.media_probe import probe_media
+
+
+# 中间片段（每行视频、分段视频、完整视频）统一的格式。
+# 同一部电影的所有片段都满足这个格式时，拼接只需要 -c copy，不需要 change_timescale、normalize_audio 和重新编码。
+# 分辨率和原视频一致（同一部电影的所有片段分辨率相同）。
+VIDEO_CODEC = "h264"
+FPS = 25
+TIMESCALE = 1000
+PIX_FMT = "yuv420p"
+AUDIO_CODEC = "aac"
+SAMPLE_RATE = 44100
+CHANNELS = 2
+AUDIO_BIT_RATE = "128k"
+
+
+def map_args():
+    """只保留第一个视频流和第一个音频流（没有音频时忽略）"""
+    return ["-map", "0:v:0", "-map", "0:a:0?"]
+
+
+def timescale_args():
+    """mp4 视频轨道的 timescale，视频流复制（-c:v copy）时也需要设置"""
+    return ["-video_track_timescale", str(TIMESCALE)]
+
+
+def video_output_args():
+    """视频流的帧率、像素格式和 timescale（编码器参数由 encoder.video_encode_args 决定）"""
+    return [
+        "-r", str(FPS),
+        "-pix_fmt", PIX_FMT,
+    ] + timescale_args()
+
+
+def audio_output_args():
+    """音频流统一为 aac 44.1kHz 双声道 128k"""
+    return [
+        "-c:a", "aac",
+        "-b:a", AUDIO_BIT_RATE,
+        "-ar", str(SAMPLE_RATE),
+        "-ac", str(CHANNELS),
+    ]
+
+
+def output_args():
+    return video_output_args() + audio_output_args()
+
+
+def clip_media(duration=None, width=None, height=None):
+    """按统一格式生成的片段的媒体信息，登记到片段目录时使用（见 clip_catalog.register），不需要再调用 ffprobe"""
+    return {
+        "duration": duration, "width": width, "height": height,
+        "fps": FPS, "video_codec": VIDEO_CODEC, "audio_codec": AUDIO_CODEC,
+    }
+
+
+def check_clip(file_path, reference=None):
+    """
+    检查片段是否满足统一格式（使用缓存的 ffprobe 信息）。
+
+    :param reference: 可选，第一个片段的 MediaInfo，要求分辨率、h264 profile/level 和 B 帧设置都与它相同
+                      （直接复制拼接时只保留第一个片段的 SPS/PPS，这些不同的片段需要重新编码）
+    :return: 不满足的项目列表，满足时为空列表
+    """
+    try:
+        info = probe_media(file_path)
+    except Exception as e:
+        return [f"无法读取媒体信息: {e}"]
+
+    problems = []
+    if not info.has_video:
+        problems.append("没有视频流")
+    else:
+        if info.video_codec != VIDEO_CODEC:
+            problems.append(f"视频编码 {info.video_codec} != {VIDEO_CODEC}")
+        if info.fps is None or abs(info.fps - FPS) > 0.01:
+            problems.append(f"帧率 {info.fps} != {FPS}")
+        if info.time_base != f"1/{TIMESCALE}":
+            problems.append(f"time_base {info.time_base} != 1/{TIMESCALE}")
+        if info.pix_fmt != PIX_FMT:
+            problems.append(f"像素格式 {info.pix_fmt} != {PIX_FMT}")
+        if reference is not None:
+            if (info.width, info.height) != (reference.width, reference.height):
+                problems.append(f"分辨率 {info.width}x{info.height} != {reference.width}x{reference.height}")
+            if info.video_profile != reference.video_profile:
+                problems.append(f"profile {info.video_profile} != {reference.video_profile}")
+            if info.video_level != reference.video_level:
+                problems.append(f"level {info.video_level} != {reference.video_level}")
+            if info.has_b_frames != reference.has_b_frames:
+                problems.append(f"has_b_frames {info.has_b_frames} != {reference.has_b_frames}")
+    if not info.has_audio:
+        problems.append("没有音频流")
+    else:
+        if info.audio_codec != AUDIO_CODEC:
+            problems.append(f"音频编码 {info.audio_codec} != {AUDIO_CODEC}")
+        if info.sample_rate != SAMPLE_RATE:
+            problems.append(f"采样率 {info.sample_rate} != {SAMPLE_RATE}")
+        if info.channels != CHANNELS:
+            problems.append(f"声道数 {info.channels} != {CHANNELS}")
+    return problems
+
+
+def clips_conform(file_paths):
+    """
+    所有片段是否都满足统一格式，并且分辨率、h264 profile/level 相同，满足时可以直接 -c copy 拼接。
+    """
+    if not file_paths:
+        return False
+    reference = None
+    for file_path in file_paths:
+        problems = check_clip(file_path, reference)
+        if problems:
+            logging.info(f"片段不满足统一格式，拼接前需要转换: {file_path} {problems}")
+            return False
+        if reference is None:
+            reference = probe_media(file_path)
+    return True
@@ -2,31 +2,18 @@ import re
 from movie_opt.qwen_utils import * 
 import os
 from movie_opt.utils import *
-from datetime import datetime
 import requests
 import json  # 导入标准库的 json 模块
 from movie_opt.qwen_utils import QwenPlusAssistant
+from movie_opt import config
 from movie_opt.config import FILTER_SCORE, LOCAL_MODEL_NAME
+from movie_opt.llm_cache import LLM_CACHE
+from movie_opt.llm_client import LLM_CLIENT, PRIORITY_NORMAL
+from movie_opt.lexicon import LEXICAL_PREFILTER
+from concurrent.futures import ThreadPoolExecutor
 
 
 
-def parse_content(data):
-    # 将每个JSON字符串解析为字典
-    parsed_data = [json.loads(item) for item in data.splitlines()]
-    
-    # 根据created_at排序，处理时间格式
-    parsed_data.sort(key=lambda x: datetime.strptime(f'{x["created_at"][:-1][:23]}Z', "%Y-%m-%dT%H:%M:%S.%fZ"))
-    
-    # 提取content并判断done状态
-    content = []
-    for item in parsed_data:
-        if item['done']:
-            break
-        content.append(item['message']['content'])
-    
-    # 返回合并后的字符串
-    return ''.join(content)
-
 def find_yes_or_no(text):
     pattern = r'不是|是|否'  # 先匹配 “不是”，再匹配 “是”，再匹配 “否”
     matches = re.findall(pattern, text)
@@ -35,13 +22,78 @@ def find_yes_or_no(text):
     return None
 
 
+# 批量打分时每个单词的五项判断：字段名 -> 类型
+WORD_JUDGEMENT_FIELDS = {
+    "score": int,
+    "in_sentence": bool,
+    "misspelled": bool,
+    "is_name": bool,
+    "proper_noun": bool,
+}
+
+
+def parse_word_judgements(reply, words):
+    """
+    解析批量打分的 JSON 回答：{"words": [{"word", "score", "in_sentence", "misspelled", "is_name", "proper_noun"}, ...]}
+
+    每一项都检查字段和类型（score 为 0 到 10 的整数），不合格的项和回答中没有的单词不返回，由调用方逐个单词重新打分。
+
+    :param words: 提问的单词列表（小写）
+    :return: {单词: {字段: 值}}
+    """
+    text = reply.strip()
+    # 去掉模型有时会加上的 ```json 代码块
+    match = re.search(r"```(?:json)?\s*(.*?)```", text, re.S)
+    if match:
+        text = match.group(1).strip()
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return {}
+    items = data.get("words") if isinstance(data, dict) else data
+    if not isinstance(items, list):
+        return {}
+
+    wanted = set(words)
+    judgements = {}
+    for item in items:
+        if not isinstance(item, dict) or not isinstance(item.get("word"), str):
+            continue
+        word = item["word"].strip().lower()
+        if word not in wanted or word in judgements:
+            continue
+        judgement = {}
+        for field, field_type in WORD_JUDGEMENT_FIELDS.items():
+            value = item.get(field)
+            # bool 是 int 的子类，score 不接受 true/false
+            if not isinstance(value, field_type) or (field_type is int and isinstance(value, bool)):
+                break
+            judgement[field] = value
+        else:
+            if 0 <= judgement["score"] <= 10:
+                judgements[word] = judgement
+    return judgements
+
+
+def judgement_score(judgement, filter_score):
+    """与 score_for_word 的规则相同：分数低于 filter_score、句子中没有、拼写错误、名字或专有名词都为 0 分"""
+    if judgement["score"] < filter_score:
+        return 0
+    if not judgement["in_sentence"] or judgement["misspelled"] or judgement["is_name"] or judgement["proper_noun"]:
+        return 0
+    return judgement["score"]
+
+
 QWEN_ASSISTANT = None
 
 class LaunageAI:
     def __init__(self):
         print(f"初始化LaunageAI\n{'-'*22}")
         logging.info(f"初始化LaunageAI\n{'-'*22}")
-        self.local_model_url = "http://localhost:11434/api/chat"  # 替换为实际的 Ollama 服务地址和端口
+        # 本地 Ollama 的客户端（连接池，同时进行的请求数有上限），地址见 config.LLM_LOCAL_URL
+        self.llm_client = LLM_CLIENT
+        # get_hard_word_scores 提问之前的难词预筛选，可以换成任何有 check_line/filter_words 方法的对象，None 为不预筛选
+        self.hard_word_prefilter = LEXICAL_PREFILTER if config.LEXICAL_PREFILTER else None
         # 初始化ai.py的方法，只调用一次
         self.init_ai()
 
@@ -63,12 +115,18 @@ class LaunageAI:
 
 
 
-    def ask_english_teacher_local_llm(self,question,model_name=LOCAL_MODEL_NAME):
+    def ask_english_teacher_local_llm(self,question,model_name=LOCAL_MODEL_NAME,response_format=None,priority=PRIORITY_NORMAL,stop=None,stream=True):
         """
         调用本地 Ollama 的 Llama 3.2 模型，作为英语老师回答问题。
+
+        可以在多个线程中同时调用，请求通过 self.llm_client 的连接池发送。
         
         :param question: str, 用户提出的问题
-        :return: str, 模型的回答
+        :param response_format: 可选，"json" 时要求模型只输出 JSON
+        :param priority: 请求排队时的优先级，数字越小越先发送
+        :param stop: 可选，"number" 只需要第一个数字（打分），"yes_no" 只需要第一个“是/否”，出现后立即结束回答
+        :param stream: False 时 Ollama 一次返回整个回答（适合短回答），stop 不为空时总是流式
+        :return: str, 模型的回答（stop 不为空时只到需要的内容为止）
         """
         local_model_pre_messages = [
             {"role": "system", "content": "你是一位专业的英语老师，擅长中英翻译和英文语法的解析。回答内容简短明了，不要啰嗦。"}
@@ -77,25 +135,34 @@ class LaunageAI:
 
         payload = {
             "model": model_name,
-            "messages": local_model_pre_messages
+            "messages": local_model_pre_messages,
+            "stream": stream or stop is not None,
         }
+        # 影响回答内容的参数都是缓存 key 的一部分（提前结束的回答只有前面一部分）
+        options = None
+        if response_format is not None or stop is not None:
+            options = {"format": response_format, "stop": stop}
+        if response_format is not None:
+            payload["format"] = response_format
+
+        # 相同的提问直接使用缓存的回答（重新运行时不再请求模型）
+        cached = LLM_CACHE.get("ollama", model_name, local_model_pre_messages, options)
+        if cached is not None:
+            return cached
         
         try:
-            # 设置 stream=True 以支持流式响应
-            with requests.post(self.local_model_url, json=payload, stream=True) as response:
-                response.raise_for_status()
-                # 收集所有块，解码为字符串
-                full_response = ""
-                for chunk in response.iter_content(chunk_size=None):
-                    full_response += chunk.decode('utf-8')  # 将所有块连接为一个字符串
-                txt = parse_content(full_response)
-                return txt
+            # 每收到一帧就解码，收到 done 或者 stop 需要的内容已经出现时结束
+            txt = self.llm_client.chat(payload, priority, stop)
+            LLM_CACHE.put("ollama", model_name, local_model_pre_messages, txt, options)
+            return txt
         except requests.exceptions.RequestException as e:
             return f"ask_english_teacher_local_llm-调用模型时发生错误: {str(e)}"
         except ValueError as ve:
             return f"ask_english_teacher_local_llm-解析响应数据时发生错误: {str(ve)}"
         except KeyError:
             return "ask_english_teacher_local_llm-返回结果中缺少预期字段。"
+        except RuntimeError as model_error:
+            return f"ask_english_teacher_local_llm-模型返回错误: {str(model_error)}"
 
 
     def get_most_hard_words(self,cn_str,en_str):
@@ -150,7 +217,7 @@ class LaunageAI:
         sentence_score = 0
         try:
             q = f"给这个英语句子的难度打分，0到10分的范围，只告诉我分数无需其他任何信息：{en_content}"
-            reply = self.ask_english_teacher_local_llm(q,model_name=LOCAL_MODEL_NAME)
+            reply = self.ask_english_teacher_local_llm(q,model_name=LOCAL_MODEL_NAME,stop="number")
             logging.info("提问："+q+"\n回答：\n"+reply+"\n")
             print("提问："+q+"\n回答：\n"+reply+"\n")
             pattern = r'\d+'# 正则表达式模式匹配所有数字
@@ -173,7 +240,7 @@ class LaunageAI:
         score = 0
         try:
             q = f"给这个单词的难度打分，0到10分的范围，只告诉我分数无需其他任何信息：{most_hard_word}"
-            reply = self.ask_english_teacher_local_llm(q,model_name=LOCAL_MODEL_NAME)
+            reply = self.ask_english_teacher_local_llm(q,model_name=LOCAL_MODEL_NAME,stop="number")
             logging.info("提问："+q+"\n回答：\n"+reply+"\n")
             print("提问："+q+"\n回答：\n"+reply+"\n")
             pattern = r'\d+'# 正则表达式模式匹配所有数字
@@ -192,7 +259,7 @@ class LaunageAI:
                 return score
 
             q = f"这句话中:“{en_str}”是否存在 {most_hard_word} 这个单词。如果存在直接返回“是”，否则返回“否”"
-            result = self.ask_english_teacher_local_llm(q,model_name=LOCAL_MODEL_NAME)
+            result = self.ask_english_teacher_local_llm(q,model_name=LOCAL_MODEL_NAME,stop="yes_no")
             logging.info("提问："+q+"\n回答：\n"+result+"\n")
             print("提问："+q+"\n回答：\n"+result+"\n")
             result = find_yes_or_no(result)
@@ -201,7 +268,7 @@ class LaunageAI:
                 return score
 
             q = f"在{en_str}这句话中{most_hard_word}这个单词是不存在的错误单词或拼写错误吗？如果是错误的直接返回“是”，否则返回“否”"
-            result = self.ask_english_teacher_local_llm(q,model_name=LOCAL_MODEL_NAME)
+            result = self.ask_english_teacher_local_llm(q,model_name=LOCAL_MODEL_NAME,stop="yes_no")
             logging.info("提问："+q+"\n回答：\n"+result+"\n")
             print("提问："+q+"\n回答：\n"+result+"\n")
             result = find_yes_or_no(result)
@@ -211,7 +278,7 @@ class LaunageAI:
 
 
             q = f"在{en_str}这句话中{most_hard_word}是名字吗,回答“是”或者“否”"
-            result = self.ask_english_teacher_local_llm(q,model_name=LOCAL_MODEL_NAME)
+            result = self.ask_english_teacher_local_llm(q,model_name=LOCAL_MODEL_NAME,stop="yes_no")
             logging.info("提问："+q+"\n回答：\n"+result+"\n")
             print("提问："+q+"\n回答：\n"+result+"\n")
             result = find_yes_or_no(result)
@@ -220,7 +287,7 @@ class LaunageAI:
                 return score
             
             q = f"在{en_str}这句话中{most_hard_word}是专有名词吗,回答“是”或者“否”"
-            result = self.ask_english_teacher_local_llm(q,model_name=LOCAL_MODEL_NAME)
+            result = self.ask_english_teacher_local_llm(q,model_name=LOCAL_MODEL_NAME,stop="yes_no")
             logging.info("提问："+q+"\n回答：\n"+result+"\n")
             print("提问："+q+"\n回答：\n"+result+"\n")
             result = find_yes_or_no(result)
@@ -233,13 +300,55 @@ class LaunageAI:
             logging.info(f"单词{most_hard_word}得分 {score} 存入self.hard_word_score_map中")
             print(f"单词{most_hard_word}得分 {score} 存入self.hard_word_score_map中")
 
+    def score_words(self,words,en_str,filter_score):
+        """
+        一次提问给一行字幕中的所有单词打分：每个单词的难度分数以及“是否在句子中、是否拼写错误、是否名字、是否专有名词”
+        都在同一个 JSON 回答中，每行只请求一次模型（score_for_word 每个单词最多五次）。
+
+        回答中解析失败或者缺少的单词用 score_for_word 逐个打分。
+
+        :return: {单词: 得分}，规则与 score_for_word 相同
+        """
+        words = list(dict.fromkeys(word.lower() for word in words))
+        scores = {}
+        pending = []
+        for word in words:
+            if word in self.hard_word_score_map:
+                scores[word] = self.hard_word_score_map[word]
+            else:
+                pending.append(word)
+        if not pending:
+            return scores
+
+        q = (
+            f"句子：“{en_str}”\n单词：{json.dumps(pending, ensure_ascii=False)}\n"
+            "对每个单词给出判断，只返回 JSON，不要返回其他内容，格式为："
+            '{"words": [{"word": "单词", "score": 难度分数(0到10的整数), "in_sentence": 句子中是否存在这个单词(true/false), '
+            '"misspelled": 是否是不存在的错误单词或拼写错误(true/false), "is_name": 是否是名字(true/false), '
+            '"proper_noun": 是否是专有名词(true/false)}]}'
+        )
+        reply = self.ask_english_teacher_local_llm(q,model_name=LOCAL_MODEL_NAME,response_format="json",stream=False)
+        logging.info("提问："+q+"\n回答：\n"+reply+"\n")
+        judgements = parse_word_judgements(reply, pending)
+
+        for word in pending:
+            judgement = judgements.get(word)
+            if judgement is None:
+                logging.info(f"score_words-批量打分没有{word}的有效结果，单独打分 en_str:{en_str}")
+                scores[word] = self.score_for_word(word,en_str,filter_score)
+                continue
+            scores[word] = judgement_score(judgement, filter_score)
+            self.hard_word_score_map[word] = scores[word]
+            logging.info(f"单词{word}得分 {scores[word]} 判断:{judgement} 存入self.hard_word_score_map中")
+        return scores
+
     def explain_words(self,most_hard_word):
         replys = []
         en_cn = {}
         for word in most_hard_word:
             first_line = word + "\n"
             q = f"这个单词：{word}的中文翻译，直接回复翻译结果不要回复其他内容，如果有多个翻译结果用分号隔开，如果这样的单词不存在或拼写错误直接返回“单词错误”"
-            reply = self.ask_english_teacher_local_llm(q,model_name=LOCAL_MODEL_NAME)
+            reply = self.ask_english_teacher_local_llm(q,model_name=LOCAL_MODEL_NAME,stream=False)
             logging.info("提问："+q+"\n回答：\n"+reply+"\n")
             print("提问："+q+"\n回答：\n"+reply+"\n")
             if reply.strip() == "单词错误":
@@ -269,14 +378,55 @@ class LaunageAI:
 
 
 
+    def score_lines(self,lines,filter_score=FILTER_SCORE,explain=False,workers=None):
+        """
+        多行字幕同时打分（get_hard_word_scores），explain 为 True 时同时解释难词（explain_words）。
+
+        每一行在自己的线程中提问，同时发给本地模型的请求数由 self.llm_client 限制。
+
+        :param lines: [(中文, 英文), ...]
+        :return: 与 lines 顺序相同的列表，出错的行为 None；
+                 explain 为 False 时每一项是 get_hard_word_scores 的结果，
+                 explain 为 True 时每一项是 (get_hard_word_scores 的结果, 解释, 例句中英对照)，没有难词时解释和对照为 None
+        """
+        def score_line(cn_content, en_content):
+            try:
+                scores = self.get_hard_word_scores(cn_content,en_content,filter_score)
+                if not explain:
+                    return scores
+                if scores is None:
+                    return scores, None, None
+                explanation, en_cn_translations = self.explain_words(scores)
+                return scores, explanation, en_cn_translations
+            except Exception as e:
+                logging.error(f"score_lines-打分出错 en_content:{en_content} e:{e}")
+                return None
+
+        workers = workers or config.LLM_LINE_WORKERS
+        if workers <= 1 or len(lines) <= 1:
+            return [score_line(cn_content, en_content) for cn_content, en_content in lines]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(lambda line: score_line(*line), lines))
+
     # 句子和最难的单词低于指定分数返回空，否则返回所有高于指定分数的最难的单词
     def get_hard_word_scores(self,cn_content,en_content,filter_score=FILTER_SCORE):
+        prefilter = self.hard_word_prefilter
+        if prefilter is not None and not prefilter.check_line(en_content):
+            logging.info(f"get_hard_word_scores-跳过-没有少见的单词 en_content:{en_content}")
+            return None
         most_hard_words = self.get_most_hard_words(cn_content,en_content)
+        if prefilter is not None and most_hard_words:
+            # 大模型找出的常用词不再打分
+            most_hard_words = prefilter.filter_words(most_hard_words)
         if most_hard_words is not None and len(most_hard_words) > 0:
             most_hard_word_score = {}
+            batch_scores = {}
+            if config.HARD_WORD_BATCH_SCORING:
+                # 所有单词一次提问打分
+                batch_scores = self.score_words(most_hard_words,en_content,filter_score)
             # 找出最难得单词的得分
             for hard_word in most_hard_words:
-                s = self.score_for_word(hard_word,en_content,filter_score)
+                s = batch_scores[hard_word] if hard_word in batch_scores else self.score_for_word(hard_word,en_content,filter_score)
                 if s > filter_score:
                     most_hard_word_score[hard_word] = s
                 else:
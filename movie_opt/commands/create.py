@@ -1,9 +1,29 @@
+import os
+
+
 def create(args):
     print(f"创建电脑视频: 处理文件路径 {args.path}")
 
 
+def create_videos(args, renditions):
+    path = args.path if args.path else os.getcwd()
+    if not os.path.exists(path):
+        print(f"路径不存在: {path}")
+        return
+
+    # picture 依赖 PIL 等较慢的模块，只在真正执行时导入
+    from movie_opt.commands.picture import convert_orientation_batch
+
+    # --both 时同一次解码同时输出横屏和竖屏视频
+    if getattr(args, "both", False):
+        renditions = ["pc", "crop"]
+    return convert_orientation_batch(path, renditions, text=getattr(args, "text", None), workers=getattr(args, "workers", None))
+
+
 def create_pc(args):
     print(f"创建电脑视频: 处理文件路径 {args.path}")
+    return create_videos(args, ["pc"])
 
 def create_phone(args):
-    print(f"创建手机视频: 处理文件路径 {args.path}")
\ No newline at end of file
+    print(f"创建手机视频: 处理文件路径 {args.path}")
+    return create_videos(args, ["crop"])
@@ -10,6 +10,8 @@ import re
 from movie_opt.utils import *
 from movie_opt.commands.merge import delete_folders_except_merge
 from movie_opt.config import FILTER_MORE_COUNT
+from movie_opt import config
+from movie_opt import timeline
 from movie_opt.handle import Executor
 from movie_opt.qwen_utils import QwenPlusAssistant
 from movie_opt.config import REMOTE_MODEL_NAME
@@ -84,7 +86,10 @@ def custom1(args,executor):
                 video_name = os.path.basename(v)
                 subtitle_video_path = os.path.join(args.path,subdir, f"subtitle_{video_name}")
                 
-                if not os.path.exists(subtitle_video_path):
+                # 融合模式不生成整部带字幕的视频，截取视频片段时同时烧录字幕
+                segment_ass = ass if config.FUSED_SUBTITLE else None
+
+                if segment_ass is None and not os.path.exists(subtitle_video_path):
                     print("给视频添加ass字幕")
                     cargs = args
                     cargs = argparse.Namespace(path=subdir_path)
@@ -92,7 +97,7 @@ def custom1(args,executor):
 
                 # 如果变量v不是以subtitle_开头，则将视频文件名改为subtitle_+视频文件名
                 v_basename = os.path.basename(v)
-                if not str.startswith(v_basename, "subtitle_"):
+                if segment_ass is None and not str.startswith(v_basename, "subtitle_"):
                     v = os.path.join(subdir_path,"subtitle_"+v_basename)
 
 
@@ -113,7 +118,7 @@ def custom1(args,executor):
                     video_extension = get_file_extension(v)
                     srt_segment_folder = os.path.join(subdir_path,"srt分段")
                     cargs = args
-                    cargs = argparse.Namespace(srt_path=srt_segment_folder,video_path=v)
+                    cargs = argparse.Namespace(srt_path=srt_segment_folder,video_path=v,ass_path=segment_ass)
                     executor.pictureOperater.video_segment(cargs)
                 
 
@@ -293,7 +298,10 @@ def custom3(args,executor):
                 video_name = os.path.basename(v)
                 subtitle_video_path = os.path.join(args.path,subdir, f"subtitle_{video_name}")
                 
-                if not os.path.exists(subtitle_video_path):
+                # 融合模式不生成整部带字幕的视频，截取视频片段时同时烧录字幕
+                segment_ass = ass if config.FUSED_SUBTITLE else None
+
+                if segment_ass is None and not os.path.exists(subtitle_video_path):
                     print("给视频添加ass字幕")
                     cargs = args
                     cargs = argparse.Namespace(path=subdir_path)
@@ -301,7 +309,7 @@ def custom3(args,executor):
 
                 # 如果变量v不是以subtitle_开头，则将视频文件名改为subtitle_+视频文件名
                 v_basename = os.path.basename(v)
-                if not str.startswith(v_basename, "subtitle_"):
+                if segment_ass is None and not str.startswith(v_basename, "subtitle_"):
                     v = os.path.join(subdir_path,"subtitle_"+v_basename)
 
 
@@ -322,7 +330,7 @@ def custom3(args,executor):
                     video_extension = get_file_extension(v)
                     srt_segment_folder = os.path.join(subdir_path,"srt分段")
                     cargs = args
-                    cargs = argparse.Namespace(srt_path=srt_segment_folder,video_path=v)
+                    cargs = argparse.Namespace(srt_path=srt_segment_folder,video_path=v,ass_path=segment_ass)
                     executor.pictureOperater.video_segment(cargs)
                 
 
@@ -363,18 +371,27 @@ def custom3(args,executor):
                         traceback.print_exc()
                         continue
                                 
-                # 逐行拼接“1中英文对照 2跟读 3磨耳朵”视频
-                logging.info(f"逐行拼接“1中英文对照 2跟读 3磨耳朵”视频\n{'-'*22}")
-                cargs = args
-                cargs = SimpleNamespace(path=video_segment_folder)
-                executor.mergeOperater.merge1(cargs)
-                
-                #将摸耳朵的mp4转换为mp3
-                ear_folder = os.path.join(video_segment_folder,"合并视频-磨耳朵-1")
-                #找到ear_folder下的mp4文件的绝对路径
-                mp4_files = find_video_files(ear_folder)
-                mp3_path = mp4_2_mp3(mp4_files[0])
-                print(f"录制MP4音频保存为mp3 {mp3_path}")    
+                audio_only = getattr(args, "audio_only", False)
+                has_timeline = len(timeline.find_manifests(video_segment_folder)) > 0
+                if not (audio_only and has_timeline):
+                    # 逐行拼接“1中英文对照 2跟读 3磨耳朵”视频
+                    logging.info(f"逐行拼接“1中英文对照 2跟读 3磨耳朵”视频\n{'-'*22}")
+                    cargs = args
+                    cargs = SimpleNamespace(path=video_segment_folder)
+                    executor.mergeOperater.merge1(cargs)
+
+                if has_timeline:
+                    # 磨耳朵音频直接由时间线拼接（原视频片段音频 + 配音），不编码视频，也不从视频中提取音轨
+                    audio_format = getattr(args, "audio_format", None) or config.LESSON_AUDIO_FORMAT
+                    results = timeline.render_timeline_audios(video_segment_folder, ["磨耳朵"], audio_format)
+                    print(f"磨耳朵音频保存为{audio_format} {results['磨耳朵']}")
+                else:
+                    #将摸耳朵的mp4转换为mp3
+                    ear_folder = os.path.join(video_segment_folder,"合并视频-磨耳朵-1")
+                    #找到ear_folder下的mp4文件的绝对路径
+                    mp4_files = find_video_files(ear_folder)
+                    mp3_path = mp4_2_mp3(mp4_files[0])
+                    print(f"录制MP4音频保存为mp3 {mp3_path}")    
 
                 # # 删除txt（拼接文件）
                 # delete_txt_files(video_segment_folder)
@@ -1,12 +1,22 @@
 import os
 import subprocess
-import torch
 import re
 from movie_opt.utils import *
 from pkg_resources import resource_filename
 import logging
 import shutil
-from movie_opt.commands.ai import LaunageAI
+import tempfile
+from movie_opt.assets import header_video
+from movie_opt.encoder import video_encode_args
+from movie_opt.clip_spec import clips_conform
+from movie_opt import config
+from movie_opt import timeline
+from movie_opt import clip_catalog
+from movie_opt import concat_plan
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    # 只用于类型标注，ai 模块在第一次使用大模型时才导入（见 movie_opt.handle.LazyProxy）
+    from movie_opt.commands.ai import LaunageAI
 
 
 def delete_folders_except_merge(folder_path):
@@ -40,61 +50,6 @@ def delete_folders_except_merge(folder_path):
                 logging.error(f"无法删除文件 {item_path}: {e}")
 
 
-def sort_paths_by_last_number(paths):
-    """
-    根据文件名最后一个“-”后的数字对路径列表进行排序。
-    将数字从字符串转换为整数以进行比较，正序排列。
-
-    :param paths: 包含绝对路径的列表。
-    :return: 排序后的列表。
-    """
-    def extract_last_number(path):
-        """
-        从路径的文件名中提取最后一个“-”后的数字并返回其整数值。
-        """
-        file_name = os.path.basename(path)  # 提取文件名
-        if "-" in file_name:
-            try:
-                number_part = file_name.split("-")[-1]  # 获取最后一个“-”后的部分
-                number = int(os.path.splitext(number_part)[0])  # 去掉扩展名并转为整数
-                return number
-            except ValueError:
-                pass  # 如果无法转换为整数，忽略此文件名中的数字部分
-        return float('inf')  # 如果无数字，放在排序的末尾
-
-    # 按提取的数字排序
-    return sorted(paths, key=extract_last_number)
-
-
-
-def find_videos_in_special_folders(directory,dir_suffix="-中英对照"):
-    """
-    查找指定文件夹下所有子文件夹，子文件夹名字以“合并视频-”开头并以“-中英对照”结尾。
-    如果这些子文件夹下有视频文件，则将这些视频文件的绝对路径放入数组并返回。
-
-    :param directory: 指定的文件夹路径。
-    :return: 包含符合条件的视频文件绝对路径的数组。
-    """
-    video_extensions = {".mp4", ".mkv", ".avi", ".mov", ".flv"}  # 常见视频文件扩展名
-    video_paths = []
-
-    # 遍历指定目录下的所有子文件夹
-    for root, dirs, files in os.walk(directory):
-        for dir_name in dirs:
-            # 检查子文件夹名字是否符合条件
-            if dir_name.startswith("合并视频-") and dir_name.endswith(dir_suffix):
-                folder_path = os.path.join(root, dir_name)
-                
-                # 遍历该子文件夹下的所有文件
-                for file_name in os.listdir(folder_path):
-                    file_path = os.path.join(folder_path, file_name)
-                    
-                    # 检查文件是否为视频文件
-                    if os.path.isfile(file_path) and os.path.splitext(file_name)[1].lower() in video_extensions:
-                        video_paths.append(os.path.abspath(file_path))
-    
-    return video_paths
-
 def extract_parts(file_path: str):
     """
     提取路径中最后一个 `-` 后的数字和最后一级文件夹中第一个 `-` 前的内容。
@@ -157,21 +112,16 @@ def filter_videos1(same_folder_index_videos: list):
     return result
 
 
-def get_file_by_suffix_number(file_paths, target_number):
+def merged_videos(dir_path, video_type):
     """
-    从文件路径列表中找到文件名包含特定后缀的文件绝对路径。
+    从片段目录中查询某种合并视频（合并视频-{类型}-{序号} 文件夹中的视频）。
 
-    :param file_paths: list 文件绝对路径列表
-    :param target_number: int 目标数字，用于匹配文件名中的 -<数字>
-    :return: str 匹配的文件绝对路径，若无匹配则返回 None
+    :return: {序号: 视频绝对路径}
     """
-    target_suffix = f"-{target_number}"
-    for file_path in file_paths:
-        # 获取文件名（不带路径）
-        file_name_without_extension = get_filename_without_extension(file_path)
-        if file_name_without_extension.endswith(target_suffix):
-            return file_path
-    return None
+    catalog = clip_catalog.open_catalog(dir_path)
+    catalog.sync()
+    return {segment: row["path"] for segment, row in catalog.merged(f"合并视频-{video_type}").items()}
+
 
 def merge_same_type(args,dir_suffix="-中英对照"):
     dir_path = args.path
@@ -180,7 +130,7 @@ def merge_same_type(args,dir_suffix="-中英对照"):
     if not os.path.exists(video_output_dir):
         os.makedirs(video_output_dir, exist_ok=True)
     merge_list_path = os.path.join(video_output_dir , f"merge_list.txt")
-    videos = sort_paths_by_last_number(find_videos_in_special_folders(dir_path,dir_suffix))
+    videos = [v for _, v in sorted(merged_videos(dir_path, video_name).items())]
     if videos == None or len(videos) <= 0:
         print(f"没有找到视频: {dir_path}")
         logging.info(f"没有找到视频: {dir_path}")
@@ -215,38 +165,11 @@ def merge_same_type(args,dir_suffix="-中英对照"):
         logging.error(f"merge3 合并失败: {output_video} 错误信息: {e}")
     
 def merge_diff_type(args,type):
-    if type == 1:
-        folder_types = [
-            "每行完整视频",
-            "每行中文视频",
-            "每行儿童发音视频",
-        ]
-        return merge_mp4(args, folder_types,"中英对照")
-
-    if type == 2:
-        folder_types = [
-            "每行分段视频",
-            "每行跟读视频"
-        ]
-        return merge_mp4(args, folder_types,"跟读")
-
-    if type == 3:
-        folder_types = [
-            "每行分段视频",
-            "每行发音视频",
-            "每行发音视频2",
-            "每行儿童发音视频"
-        ]
-        return merge_mp4(args, folder_types,"磨耳朵")
-
-    
-    if type == 5:
-        folder_types = [
-            "每行完整视频",
-            "每行发音视频",
-            "每行发音视频2"
-        ]
-        return merge_mp4(args, folder_types,"无儿童磨耳朵")
+    # 每种合并视频的组成和时间线共用同一份定义
+    lessons = {1: "中英对照", 2: "跟读", 3: "磨耳朵", 5: "无儿童磨耳朵"}
+    if type in lessons:
+        results = merge_lessons(args, [lessons[type]])
+        return results[lessons[type]] if results is not None else None
 
     # 合并视频-最终
     if type == 4:
@@ -263,22 +186,21 @@ def merge_diff_type(args,type):
         #     return
         
 
-        file_extension = get_file_extension(args.cnen_c[0])
+        file_extension = get_file_extension(next(iter(args.cnen_c.values())))
 
-        cnen_h = os.path.join(os.path.dirname(resource_filename(__name__,".")),'static', "中英对照横屏"+file_extension)
-        ear_h = os.path.join(os.path.dirname(resource_filename(__name__,".")),'static', "磨耳朵横屏"+file_extension)
+        # 片头使用缓存文件夹中已经统一过 timescale 和音频参数的副本，不修改包内的静态文件
+        cnen_h = header_video("中英对照横屏"+file_extension)
+        ear_h = header_video("磨耳朵横屏"+file_extension)
         # follow_h = os.path.join(os.path.dirname(resource_filename(__name__,".")),'static', "跟读横屏"+file_extension)
         
         output_dir = os.path.join(args.path, "合并视频-最终")
         os.makedirs(output_dir, exist_ok=True)
 
 
-        for v in args.cnen_c:
-            video_index = int(get_filename_without_extension(v).split("-")[-1])
-            
-            ear_c = get_file_by_suffix_number(args.ear_c,video_index)
-            # follow_c = get_file_by_suffix_number(args.follow_c,video_index)
-            cnen_c = get_file_by_suffix_number(args.cnen_c,video_index)
+        for video_index in sorted(args.cnen_c):
+            ear_c = args.ear_c.get(video_index)
+            # follow_c = args.follow_c.get(video_index)
+            cnen_c = args.cnen_c.get(video_index)
             
             if cnen_c is None or len(cnen_c) <= 0:
                 print(f"视频索引:{video_index} 中英对照内容不能为空!")
@@ -309,12 +231,12 @@ def merge_diff_type(args,type):
                 for mv in merge_video:
                     merge_list.write(f"file '{mv}'\n")
 
-            # TODO
-            # 修改视频的时间戳timescale，保证视频拼接后不卡顿
-            for video in merge_video:
-                change_timescale(video,file_extension=video_extension)
-            # 统一音频编码和参数，保证视频拼接后有声音
-            normalize_audio(merge_video)
+            if not clips_conform(merge_video):
+                # 修改视频的时间戳timescale，保证视频拼接后不卡顿（片头已经处理过）
+                for video in [cnen_c, ear_c]:
+                    change_timescale(video,file_extension=video_extension)
+                # 统一音频编码和参数，保证视频拼接后有声音
+                normalize_audio([cnen_c, ear_c])
 
             # 使用 ffmpeg 拼接视频
             output_video = os.path.join(video_output_dir, f"{video_index}{video_extension}")
@@ -338,8 +260,37 @@ def merge_diff_type(args,type):
                 logging.error(f"merge2 合并失败: {output_video} 错误信息: {e}")
                 continue
 
-def merge_mp4(args, folder_types, video_type):
-    r_paths = []
+def concat_videos(merge_list_path, videos, codec_args, output_video):
+    """用 concat 复用器按顺序拼接 videos，codec_args 为 ["-c", "copy"] 时不重新编码"""
+    with open(merge_list_path, "w", encoding="utf-8") as merge_list:
+        for video in videos:
+            merge_list.write(f"file '{video}'\n")
+    command = [
+            "ffmpeg", "-y",
+            "-f", "concat",
+            "-safe", "0",
+            "-i", merge_list_path,
+            *codec_args,
+            output_video
+        ]
+    print(" ".join(command))
+    subprocess.run(
+        command,
+        check=True
+    )
+
+
+def merge_lessons(args, video_types):
+    """
+    逐行拼接几种合并视频（中英对照、磨耳朵等），一起规划：
+
+    - 每个每行视频最多统一格式一次（不满足统一格式时），不会每种合并视频各处理一次
+    - 需要重新编码时，几种合并视频中共同的连续片段（例如磨耳朵和无儿童磨耳朵中每一行的 发音视频+发音视频2）
+      只复制拼接一次作为中间结果，每种合并视频再由中间结果和剩下的片段拼接（见 concat_plan.plan_shared_runs）
+
+    :param video_types: 合并视频类型列表，组成见 timeline.LESSON_FOLDER_TYPES
+    :return: {类型: [生成的视频路径, ...]}，路径不存在时返回 None
+    """
     # 如果路径为空，则使用当前目录
     path = args.path if args.path else os.getcwd()
 
@@ -347,155 +298,85 @@ def merge_mp4(args, folder_types, video_type):
     if not os.path.exists(path):
         print(f"路径不存在: {path}")
         return
-    
-
-    all_video = []
 
-    # 遍历目录及其子目录
-    for root, dirs, files in os.walk(path):
-        for file in files:
-            if file.lower().endswith(".mp4") or file.lower().endswith(".mkv") :
-                # 获取文件的绝对路径
-                full_path = os.path.abspath(os.path.join(root, file))
-                all_video.append(full_path)
+    # 每行视频由生成它的代码登记在片段目录中，旧版本生成的文件在第一次使用时补登记
+    catalog = clip_catalog.open_catalog(path)
+    catalog.sync()
 
-    print(f"{path} 找到 {len(all_video)} 个 视频 文件：")
-    for video in all_video:
-        print(video)
-
-    # 子文件夹类型按顺序
-    
-
-    folder_indexs = set()
+    # 电影名与旧版本的输出文件名保持一致（文件夹名 {类型}-{电影名}-{序号}）
     movie_name = ""
-
-    # 遍历文件夹
     for subdir in os.listdir(path):
-        subdir_path = os.path.join(path, subdir)
-        if not os.path.isdir(subdir_path):
-            continue
-
-        # 提取电影名和文件夹序号
         match = re.match(r"^(.*)-(.*)-(\d+)$", subdir)
-        if not match:
-            continue
-
-        movie_name = match.group(2)
-        folder_index = match.group(3)
-
-        folder_indexs.add(folder_index)
-
-    for folder_index in sorted(folder_indexs):
-        # 创建目标输出目录
-        output_dir = os.path.join(path, f"合并视频-{video_type}-{folder_index}")
-        os.makedirs(output_dir, exist_ok=True)
-        
-        # 定义正则表达式模式
-        pattern = re.compile(rf"\\[^\\]*-(.*?)-{folder_index}\\.*\..*$")
-
-        # 过滤文件路径
-        same_folder_index_videos = [
-            path for path in all_video if pattern.search(path)
-        ]
-
-        print(f"排序前的需要合并的视频列表：")
-        for video in same_folder_index_videos:
-            print(f"{video}")
-
-        if same_folder_index_videos is None or len(same_folder_index_videos) <= 0:
-            print(f"没有找到文件夹序号为{folder_index}的文件夹")
-            continue
-
-        
-        # 排序后的文件列表
-        sorted_videos = []
-
-        # 定义正则表达式提取文件夹类型和视频序号
-        pattern = re.compile(r".*\\(.*?)-.*\\.*-(\d+)\..*$")
-
-        # 如果 video 不在 folder_types 范围中，删除该元素
-        filtered_videos = []
-        for v in same_folder_index_videos:
-            match = pattern.search(v)
-            if match:
-                folder_type, _ = match.groups()
-                if folder_type in folder_types:
-                    filtered_videos.append(v)
-        same_folder_index_videos = filtered_videos
-        
-        # 提取信息并排序
-        def extract_key(video):
-            match = pattern.search(video)
-            if match:
-                folder_type, video_index = match.groups()
-                folder_priority = folder_types.index(folder_type) if folder_type in folder_types else float('inf')
-                return (int(video_index), folder_priority)
-            return (float('inf'), float('inf'))  # 不匹配的项排在最后
-
-        # 排序后的结果
-        sorted_videos = sorted(same_folder_index_videos, key=extract_key)
-
-        # 打印结果
-        print("排序后的文件列表:")
-        for video in sorted_videos:
-            print(video)
-
-        # 如果同一视频 ID 同时出现在 '每行完整视频' 和 '每行分段视频' 中，则删除 '每行分段视频' 的项。
-        sorted_videos = filter_videos1(sorted_videos)
-        
-        # 打印结果
-        print("删除不必要的元素后的文件列表:")
-        for video in sorted_videos:
-            print(video)
-
-
-        # 生成合并列表文件
-        merge_list_path = os.path.join(output_dir, "merge_list.txt")
-        with open(merge_list_path, "w", encoding="utf-8") as merge_list:
+        if match and os.path.isdir(os.path.join(path, subdir)):
+            movie_name = match.group(2)
+
+    # {(类型, 序号): 按 (行号, 文件夹类型的顺序) 排序后的每行视频}
+    sequences = {}
+    for video_type in video_types:
+        folder_types = timeline.LESSON_FOLDER_TYPES[video_type]
+        for folder_index in catalog.segments(folder_types):
+            sorted_videos = [row["path"] for row in catalog.lines(folder_types, folder_index)]
+            # 如果同一视频 ID 同时出现在 '每行完整视频' 和 '每行分段视频' 中，则删除 '每行分段视频' 的项。
+            sorted_videos = filter_videos1(sorted_videos)
+            if len(sorted_videos) <= 0:
+                print(f"没有找到文件夹序号为{folder_index}的文件夹")
+                logging.info(f"没有找到文件夹序号为{folder_index}的文件夹")
+                continue
+            print(f"{video_type}-{folder_index} 拼接的文件列表:")
             for video in sorted_videos:
-                merge_list.write(f"file '{video}'\n")
-
-        if len(sorted_videos) <= 0:
-            print(f"没有找到文件夹序号为{folder_index}的文件夹")
-            logging.info(f"没有找到文件夹序号为{folder_index}的文件夹")
-            continue
+                print(video)
+            sequences[(video_type, folder_index)] = sorted_videos
+
+    results = {video_type: [] for video_type in video_types}
+    if not sequences:
+        return results
+
+    all_videos = list(dict.fromkeys(video for videos in sequences.values() for video in videos))
+    if clips_conform(all_videos):
+        # 所有片段都是统一格式，直接复制拼接；共同片段的中间结果只会多读写一遍，不生成
+        codec_args = ["-c", "copy"]
+        runs, plans = concat_plan.plan_shared_runs(sequences, 0)
+    else:
+        # 修改视频的时间戳timescale，保证视频拼接后不卡顿；统一音频编码和参数，保证视频拼接后有声音
+        # 每个片段只处理一次；拼接时重新编码视频，共同的连续片段先复制拼接为一个中间结果，各个输出读取的文件更少
+        for video in all_videos:
+            change_timescale(video)
+        normalize_audio(all_videos)
+        codec_args = [*video_encode_args(), "-c:a", "copy"]
+        runs, plans = concat_plan.plan_shared_runs(sequences, config.MERGE_SHARED_RUN_MIN_CLIPS)
 
-        video_extension = get_file_extension(sorted_videos[0])
+    workspace = tempfile.mkdtemp(prefix=".merge-", dir=path)
+    try:
+        run_paths = []
+        for run_index, run in enumerate(runs):
+            run_path = os.path.join(workspace, f"run-{run_index}{get_file_extension(run[0])}")
+            concat_videos(os.path.join(workspace, f"run-{run_index}.txt"), run, ["-c", "copy"], run_path)
+            run_paths.append(run_path)
+        entries_before = sum(len(videos) for videos in sequences.values())
+        entries_after = sum(len(plan) for plan in plans.values())
+        logging.info(f"拼接规划 {path} 输出数:{len(sequences)} 共同片段数:{len(runs)} 拼接条目:{entries_before}->{entries_after}")
+
+        for (video_type, folder_index), plan in plans.items():
+            # 创建目标输出目录
+            output_dir = os.path.join(path, f"合并视频-{video_type}-{folder_index}")
+            os.makedirs(output_dir, exist_ok=True)
+            pieces = [run_paths[value] if kind == "run" else value for kind, value in plan]
+            video_extension = get_file_extension(sequences[(video_type, folder_index)][0])
 
-        # 修改视频的时间戳timescale，保证视频拼接后不卡顿
-        for video in sorted_videos:
-            change_timescale(video)
-        # 统一音频编码和参数，保证视频拼接后有声音
-        normalize_audio(sorted_videos)
-
-        # 使用 ffmpeg 拼接视频
-        output_video = os.path.join(output_dir, f"{movie_name}-{folder_index}{video_extension}")
-        try:
-            if torch.cuda.is_available():
-                video_codec = "h264_nvenc"
-            else:
-                video_codec = "libx264"
-            command = [
-                    "ffmpeg",
-                    "-f", "concat",
-                    "-safe", "0",
-                    "-i", merge_list_path,
-                    "-c:v", video_codec,
-                    "-c:a", "copy",
-                    output_video
-                ]
-            print(" ".join(command))
-            subprocess.run(
-                command,
-                check=True
-            )
-            print(f"合并每行完成: {output_video}")
-        except subprocess.CalledProcessError as e:
-            print(f"合并失败: {output_video}")
-            print(f"错误信息: {e}")
-        
-        r_paths.append(output_video)
-    return r_paths
+            # 使用 ffmpeg 拼接视频
+            output_video = os.path.join(output_dir, f"{movie_name}-{folder_index}{video_extension}")
+            try:
+                concat_videos(os.path.join(output_dir, "merge_list.txt"), pieces, codec_args, output_video)
+                if os.path.exists(output_video):
+                    print(f"合并每行完成: {output_video}")
+                    clip_catalog.register_clip(output_video, kind=f"合并视频-{video_type}")
+                    results[video_type].append(output_video)
+            except subprocess.CalledProcessError as e:
+                print(f"合并失败: {output_video}")
+                print(f"错误信息: {e}")
+    finally:
+        shutil.rmtree(workspace, ignore_errors=True)
+    return results
 
 
 class MergeOperater:
@@ -504,29 +385,44 @@ class MergeOperater:
 
 
     def merge1(self,args):
-        cnen_c = merge_diff_type(args,1)
-        logging.info(f"merge1:逐行拼接“中英文对照”视频完成 {cnen_c}")
-
-        # follow_c = merge_diff_type(args,2)
-        # logging.info(f"merge1:逐行拼接“跟读”视频完成 {follow_c}")
-        
-        ear_c = merge_diff_type(args,3)
-        logging.info(f"merge1:逐行拼接“磨耳朵”视频完成 {args.path}\n{ear_c}")
+        path = args.path if args.path else os.getcwd()
+        if config.TIMELINE_RENDER and timeline.find_manifests(path):
+            # split_video 保存了时间线，每种合并视频直接一次编码生成，不拼接每行视频
+            results = timeline.render_timelines(path, ["中英对照", "磨耳朵", "无儿童磨耳朵"])
+            logging.info(f"merge1:由时间线生成合并视频完成 {path}\n{results}")
+            return
 
-        
-        ear_without_children_c = merge_diff_type(args,5)
-        logging.info(f"merge1:逐行拼接“无儿童磨耳朵”视频完成 {args.path}\n{ear_without_children_c}")
+        # 三种合并视频一起规划，共同的每行视频只处理、拼接一次（不生成“跟读”）
+        results = merge_lessons(args, ["中英对照", "磨耳朵", "无儿童磨耳朵"])
+        logging.info(f"merge1:逐行拼接“中英文对照”“磨耳朵”“无儿童磨耳朵”视频完成 {args.path}\n{results}")
 
         
 
     def merge2(self,args):
         dir_path = args.path
-        args.cnen_c = sort_paths_by_last_number(find_videos_in_special_folders(dir_path,"-中英对照"))
-        # args.follow_c = sort_paths_by_last_number(find_videos_in_special_folders(dir_path,"-跟读"))
-        args.ear_c = sort_paths_by_last_number(find_videos_in_special_folders(dir_path,"-磨耳朵"))
+        # {序号: 合并视频路径}，相同序号的视频拼接在一起
+        args.cnen_c = merged_videos(dir_path,"中英对照")
+        # args.follow_c = merged_videos(dir_path,"跟读")
+        args.ear_c = merged_videos(dir_path,"磨耳朵")
         merge_diff_type(args,4)
         logging.info(f"merge2:相同编号的“1中英文对照 2跟读 3磨耳朵”视频拼接起来完成 {args.path}")
 
+    def timeline(self,args):
+        """由 split_video 保存的时间线生成合并视频（不需要每行视频）"""
+        path = args.path if args.path else os.getcwd()
+        lessons = args.types.split(",") if getattr(args, "types", None) else ["中英对照", "磨耳朵", "无儿童磨耳朵"]
+        results = timeline.render_timelines(path, lessons)
+        logging.info(f"timeline:由时间线生成合并视频完成 {path}\n{results}")
+        return results
+
+    def audio(self,args):
+        """由时间线只生成合并视频的音频（mp3、opus），不编码视频"""
+        path = args.path if args.path else os.getcwd()
+        lessons = args.types.split(",") if getattr(args, "types", None) else ["磨耳朵"]
+        results = timeline.render_timeline_audios(path, lessons, getattr(args, "format", None))
+        logging.info(f"audio:由时间线生成合并音频完成 {path}\n{results}")
+        return results
+
     def merge3(self,args):
         merge_same_type(args,"-中英对照")
         # merge_same_type(args,"-跟读")
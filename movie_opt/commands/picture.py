@@ -1,21 +1,31 @@
-import argparse
 import os
 import random
 import traceback
 from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+import shutil
+import tempfile
 from pkg_resources import resource_filename
 import subprocess
 import sys
 import re
-import torch
 from movie_opt.utils import *
 import logging
-import os
-from PIL import Image, ImageDraw, ImageFont,ImageChops
-from movie_opt.commands.voice import VoiceOperater
-from movie_opt.commands.ai import LaunageAI
 from movie_opt import config
-from movie_opt.config import FILTER_COUNT, COMPOSITE_IMAGE_COUNT
+from movie_opt import audio_pcm
+from movie_opt import assets
+from movie_opt.encoder import video_encode_args, encode_slots, encoder_slot_count, threads_per_encoder, smart_cut_head_args, smart_cut_keyframe, smart_cut_parts
+from movie_opt.chunked_encode import encode_chunked
+from movie_opt import clip_spec
+from movie_opt import timeline
+from movie_opt import clip_catalog
+from movie_opt.media_probe import probe_media, keyframe_times
+from movie_opt.config import FILTER_COUNT, COMPOSITE_IMAGE_COUNT, COVER_IMAGE_SIZE, COMPLETE_VIDEO_MIN_PIECE_SECOND, FRAGMENT_BATCH_SIZE
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    # 只用于类型标注，voice/ai 模块在第一次使用时才导入（见 movie_opt.handle）
+    from movie_opt.commands.voice import VoiceOperater
+    from movie_opt.commands.ai import LaunageAI
 
 
 def add_glowing_border_with_rounded_corners(image_path: str, radius: int = 20, border_width: int = 1, border_color: str = "#FFFFFF"):
@@ -32,6 +42,10 @@ def add_glowing_border_with_rounded_corners(image_path: str, radius: int = 20, b
       border_width: 边框宽度，默认5px
       border_color: 边框颜色，默认荧光绿色 "#39FF14"
     """
+    from PIL import Image, ImageDraw, ImageChops
+    # 提高 Pillow 允许的最大像素数
+    Image.MAX_IMAGE_PIXELS = None
+
     if not os.path.exists(image_path):
         raise FileNotFoundError(f"图片路径 '{image_path}' 不存在！")
     
@@ -97,13 +111,47 @@ def extract_subtitle_info_from_srt(srt_path):
                 split_endtime_json_list.append(info)
     return split_endtime_json_list
     
-def split_fragment_video(split_endtime_json_list,video_name,video_extension,video_split_dir,video):
+def cut_fragment_clip(video, start_seconds, end_seconds, output_path, ass_path=None):
+    """
+    使用单独的 ffmpeg 进程截取一个按行分段视频
+
+    :param ass_path: 可选，同时烧录的 ASS 字幕（时间相对于 video）
+    """
+    workspace = None
+    filter_args = []
+    if ass_path:
+        # -ss 在 -i 后面，滤镜看到的是原视频的时间戳，字幕不需要平移
+        workspace = tempfile.mkdtemp(prefix=".subtitle-", dir=os.path.dirname(os.path.abspath(output_path)))
+        filter_args = ["-vf", burn_subtitle_filter(ass_path, 0, None, workspace)]
+    command = [
+        "ffmpeg", "-y",
+        "-accurate_seek",
+        "-i", os.path.abspath(video),
+        "-ss", f"{start_seconds:.3f}",
+        "-to", f"{end_seconds:.3f}",
+        *clip_spec.map_args(),  # 只保留第一个视频流和音频流
+        *filter_args,
+        "-map_metadata", "-1",  # 清除全局元信息
+        *video_encode_args(),  # 强制重新编码视频
+        *clip_spec.output_args(),  # 统一的片段格式，拼接时可以直接复制
+        "-movflags", "use_metadata_tags",  # 生成符合新元信息标准的文件
+        os.path.abspath(output_path)
+    ]
+    logging.info(f"按行分段保存 {output_path} video:{video} command:{' '.join(command)}")
+    try:
+        subprocess.run(command, check=True, cwd=workspace)
+    finally:
+        if workspace is not None:
+            shutil.rmtree(workspace, ignore_errors=True)
+
+
+def split_fragment_video(split_endtime_json_list,video_name,video_extension,video_split_dir,video,ass_path=None):
     id_counter = 0
+    video_totle_second = get_mp4_duration_ffmpeg(video)
     for info in split_endtime_json_list:
         id_counter += 1
         start_time = info["st"]
         end_time = info["et"]
-        cn_content = info["cn"]
         en_content = info["en"]
 
         split_name = f"{video_name}-{id_counter}{video_extension}"
@@ -112,34 +160,461 @@ def split_fragment_video(split_endtime_json_list,video_name,video_extension,vide
         start_seconds = timestamp_convert_to_seconds(start_time)
         end_seconds = timestamp_convert_to_seconds(end_time)+0.1
 
-        video_totle_second = get_mp4_duration_ffmpeg(video)
         if end_seconds > video_totle_second:
             end_seconds = video_totle_second
 
-        if torch.cuda.is_available():
-            video_codec = "h264_nvenc"
+        logging.info(f"按行分段保存 id:{id_counter} en_content:{en_content}")
+        cut_fragment_clip(video, start_seconds, end_seconds, output_path, ass_path)
+        clip_catalog.register_clip(output_path, media=clip_spec.clip_media(end_seconds - start_seconds))
+
+
+def build_trim_filter_script(ranges, with_audio, video_prefilter=None):
+    """
+    生成一个“一次解码，多路输出”的 filter_complex 脚本。
+
+    输入视频流先 split 成 len(ranges) 路，每一路用 trim 截取自己的时间段并把时间戳归零。
+
+    :param ranges: [(start_seconds, end_seconds), ...]，相对于输入文件的时间
+    :param with_audio: 是否同时截取音频
+    :param video_prefilter: 可选，split 之前对视频流执行的滤镜（例如 ass=...）
+    :return: (filter 脚本内容, [(视频标签, 音频标签或None), ...])
+    """
+    count = len(ranges)
+    video_source = "[0:v:0]"
+    if video_prefilter:
+        video_source = f"[0:v:0]{video_prefilter},"
+    video_split_labels = "".join(f"[vs{i}]" for i in range(count))
+    lines = [f"{video_source}split={count}{video_split_labels}" if count > 1 else f"{video_source}null[vs0]"]
+    if with_audio:
+        audio_split_labels = "".join(f"[as{i}]" for i in range(count))
+        lines.append(f"[0:a:0]asplit={count}{audio_split_labels}" if count > 1 else "[0:a:0]anull[as0]")
+
+    labels = []
+    for i, (start_seconds, end_seconds) in enumerate(ranges):
+        lines.append(f"[vs{i}]trim=start={start_seconds:.3f}:end={end_seconds:.3f},setpts=PTS-STARTPTS[v{i}]")
+        if with_audio:
+            lines.append(f"[as{i}]atrim=start={start_seconds:.3f}:end={end_seconds:.3f},asetpts=PTS-STARTPTS[a{i}]")
+            labels.append((f"[v{i}]", f"[a{i}]"))
         else:
-            video_codec = "libx264"
+            labels.append((f"[v{i}]", None))
+    return ";\n".join(lines), labels
+
+
+def split_fragment_video_batch(split_endtime_json_list,video_name,video_extension,video_split_dir,video,batch_size=FRAGMENT_BATCH_SIZE,ass_path=None):
+    """
+    按行分段原视频的批量版本：一个 ffmpeg 进程解码一次，通过一个 N 路输出的滤镜图生成所有每行分段视频。
+
+    每一批最多 batch_size 行，输入使用 -ss 直接跳到这一批的开始位置。
+    某一批失败或者某个片段没有生成时，只对这些片段单独重试，不会中断整批。
+    ass_path 不为空时在 split 之前烧录字幕（按这一批的开始位置平移）。
+
+    :return: 每个片段的结果列表 [{"id", "path", "ok", "error"}, ...]
+    """
+    report = []
+    video_totle_second = get_mp4_duration_ffmpeg(video)
+    if video_totle_second is None:
+        raise RuntimeError(f"无法获取视频时长: {video}")
+    with_audio = has_audio_stream(video)
+
+    # 先检查每一行的时间，错误的行只记录到报告中
+    clips = []
+    id_counter = 0
+    for info in split_endtime_json_list:
+        id_counter += 1
+        output_path = os.path.join(video_split_dir, f"{video_name}-{id_counter}{video_extension}")
+        try:
+            start_seconds = timestamp_convert_to_seconds(info["st"])
+            end_seconds = min(timestamp_convert_to_seconds(info["et"]) + 0.1, video_totle_second)
+        except Exception as e:
+            report.append({"id": id_counter, "path": output_path, "ok": False, "error": f"时间格式错误: {e}"})
+            continue
+        if start_seconds >= end_seconds:
+            report.append({"id": id_counter, "path": output_path, "ok": False, "error": f"开始时间不小于结束时间 st:{info['st']} et:{info['et']}"})
+            continue
+        clips.append((id_counter, start_seconds, end_seconds, output_path))
+
+    for batch_index in range(0, len(clips), batch_size):
+        batch = clips[batch_index:batch_index + batch_size]
+        batch_start = min(clip[1] for clip in batch)
+        ranges = [(start_seconds - batch_start, end_seconds - batch_start) for _, start_seconds, end_seconds, _ in batch]
+        workspace = None
+        video_prefilter = None
+        if ass_path:
+            workspace = tempfile.mkdtemp(prefix=".subtitle-", dir=os.path.abspath(video_split_dir))
+            video_prefilter = burn_subtitle_filter(ass_path, batch_start, max(end for _, end in ranges), workspace)
+        filter_script, labels = build_trim_filter_script(ranges, with_audio, video_prefilter)
+        filter_script_path = os.path.abspath(os.path.join(video_split_dir, f"{video_name}-filter-{batch_index}.txt"))
+        with open(filter_script_path, "w", encoding="utf-8") as f:
+            f.write(filter_script)
 
         command = [
-            "ffmpeg",
-            "-accurate_seek",
+            "ffmpeg", "-y",
+            "-ss", f"{batch_start:.3f}",  # 输入跳转到这一批的开始位置
+            "-i", os.path.abspath(video),
+            "-filter_complex_script", filter_script_path,
+        ]
+        for (clip_id, _, _, output_path), (video_label, audio_label) in zip(batch, labels):
+            command.extend(["-map", video_label])
+            if audio_label is not None:
+                command.extend(["-map", audio_label])
+            command.extend([
+                "-map_metadata", "-1",  # 清除全局元信息
+                *video_encode_args(),
+                *clip_spec.output_args(),  # 统一的片段格式
+                "-movflags", "use_metadata_tags",  # 生成符合新元信息标准的文件
+                os.path.abspath(output_path)
+            ])
+
+        logging.info(f"按行批量分段保存 video:{video} 行:{batch[0][0]}-{batch[-1][0]} command:{' '.join(command)}")
+        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, encoding="utf-8", errors="ignore", cwd=workspace)
+        safe_remove(filter_script_path, "删除滤镜脚本")
+        if workspace is not None:
+            shutil.rmtree(workspace, ignore_errors=True)
+        if result.returncode != 0:
+            logging.error(f"按行批量分段失败，逐个重试 video:{video} stderr:{result.stderr[-2000:]}")
+
+        for clip_id, start_seconds, end_seconds, output_path in batch:
+            if result.returncode == 0 and os.path.exists(output_path) and os.path.getsize(output_path) > 0:
+                report.append({"id": clip_id, "path": output_path, "ok": True, "error": None})
+                continue
+            # 只重试失败的片段
+            try:
+                cut_fragment_clip(video, start_seconds, end_seconds, output_path, ass_path)
+                report.append({"id": clip_id, "path": output_path, "ok": True, "error": None})
+            except Exception as e:
+                report.append({"id": clip_id, "path": output_path, "ok": False, "error": str(e)})
+
+    report.sort(key=lambda r: r["id"])
+    durations = {clip_id: end_seconds - start_seconds for clip_id, start_seconds, end_seconds, _ in clips}
+    for r in report:
+        if r["ok"]:
+            clip_catalog.register_clip(r["path"], media=clip_spec.clip_media(durations[r["id"]]))
+    failed = [r for r in report if not r["ok"]]
+    logging.info(f"按行批量分段完成 video:{video} 成功:{len(report) - len(failed)} 失败:{len(failed)}")
+    for r in failed:
+        logging.error(f"按行分段失败 id:{r['id']} path:{r['path']} error:{r['error']}")
+        print(f"按行分段失败 id:{r['id']} path:{r['path']} error:{r['error']}")
+    return report
+
+
+def encode_still_track(image_path, duration, output_path):
+    """
+    把一张图片编码成只有视频流的静态画面视频，供多个音频复用。
+
+    使用 -tune stillimage 和较低的帧率（config.STILL_CLIP_FPS），编码量只和最长的时长有关。
+    """
+    command = [
+        "ffmpeg", "-y",
+        "-loop", "1", "-framerate", str(config.STILL_CLIP_FPS), "-i", image_path,  # 输入图片
+        "-t", f"{duration:.3f}",           # 最长的视频持续时间
+        *video_encode_args(tune="stillimage"),  # 针对静态画面的编码参数
+        *clip_spec.video_output_args(),   # 统一的帧率、像素格式和 timescale
+        "-an",
+        output_path
+    ]
+    logging.info(f"编码静态画面视频 image_path:{image_path} command:{' '.join(command)}")
+    subprocess.run(command, check=True)
+
+
+def mux_still_track_command(still_track, audio_input_args, duration, output_path, shortest=True):
+    """
+    生成“静态画面视频 + 音频”的复用命令：视频流直接复制，只编码音频，并截取到 duration 秒。
+
+    :param audio_input_args: 音频输入参数，例如 ["-i", "a.mp3"] 或 audio_pcm.input_args()
+    """
+    command = [
+        "ffmpeg", "-y",
+        "-i", still_track,                 # 已编码的静态画面
+        *audio_input_args,                 # 输入音频
+        "-map", "0:v:0", "-map", "1:a:0",
+        "-c:v", "copy",                    # 视频流不重新编码
+        *clip_spec.timescale_args(),
+        *clip_spec.audio_output_args(),    # 音频统一为 aac 44.1kHz 双声道
+        "-t", f"{duration:.3f}",           # 视频持续时间
+    ]
+    if shortest:
+        command.append("-shortest")  # 保证输出长度与最短流（音频或视频）匹配
+    command.append(output_path)
+    return command
+
+
+def cut_segment(video, start_seconds, end_seconds, output_path, ass_path=None):
+    """
+    精确截取一段视频（重新编码）。
+
+    -ss 放在 -i 前面：ffmpeg 先跳到 start 之前的关键帧，只解码关键帧到 start 之间的画面，
+    不会像 -i 后面的 -ss 那样从影片开头一直解码。
+
+    :param ass_path: 可选，整部视频的 ASS 字幕，平移到片段开头后在同一次编码中烧录
+    """
+    workspace = None
+    filter_args = []
+    if ass_path:
+        workspace = tempfile.mkdtemp(prefix=".subtitle-", dir=os.path.dirname(os.path.abspath(output_path)))
+        filter_args = ["-vf", burn_subtitle_filter(ass_path, start_seconds, end_seconds - start_seconds, workspace)]
+    command = [
+        "ffmpeg", "-y",
+        "-ss", f"{start_seconds:.3f}",
+        "-i", os.path.abspath(video),
+        "-t", f"{end_seconds - start_seconds:.3f}",
+        "-map", "0",  # 保留所有轨道
+        *filter_args,
+        "-map_metadata", "-1",  # 清除全局元信息
+        *video_encode_args(),  # 强制重新编码视频
+        "-c:a", "aac",  # 强制重新编码音频
+        "-movflags", "use_metadata_tags",  # 生成符合新元信息标准的文件
+        os.path.abspath(output_path)
+    ]
+    print(f"执行命令: {' '.join(command)}")
+    logging.info(f"截取视频片段 {' '.join(command)}")
+    try:
+        subprocess.run(command, check=True, cwd=workspace)
+    finally:
+        if workspace is not None:
+            shutil.rmtree(workspace, ignore_errors=True)
+
+
+def smart_cut_segment(video, start_seconds, end_seconds, output_path, ass_path=None):
+    """
+    “智能剪切”：只重新编码 start 到下一个关键帧之间的画面，之后的 GOP 直接复制。
+
+    视频分成“开头（重新编码）+ 其余部分（流复制）”两段，音频整段重新编码为 aac 后复用。
+    两段的 SPS/PPS 不同，MP4 的 avcC 只能保存一组，所以两段都先写成 MPEG-TS（Annex-B，每个关键帧前带参数集，
+    复制的部分用 h264_mp4toannexb 补上），拼接后以 avc3 写入 MP4，参数集保留在码流中。
+    开头按原视频的 profile/level/像素格式编码（smart_cut_head_args），无法匹配时退回到 cut_segment。
+    需要烧录字幕（ass_path）时每一帧都要重新编码，也退回到 cut_segment。
+    """
+    if ass_path:
+        return cut_segment(video, start_seconds, end_seconds, output_path, ass_path)
+
+    info = probe_media(video)
+    head_args, reason = smart_cut_head_args(info)
+    if head_args is None:
+        logging.info(f"{reason}，不使用智能剪切: {video}")
+        return cut_segment(video, start_seconds, end_seconds, output_path)
+
+    keyframe = smart_cut_keyframe(keyframe_times(video), start_seconds, end_seconds)
+    if keyframe is None:
+        # 片段内没有关键帧，只能整段重新编码
+        return cut_segment(video, start_seconds, end_seconds, output_path)
+
+    workspace = tempfile.mkdtemp(prefix=".smartcut-", dir=os.path.dirname(os.path.abspath(output_path)))
+    try:
+        plan = smart_cut_parts(keyframe, start_seconds, end_seconds)
+        parts = []
+        if plan["head"] is not None:
+            head_seek, head_duration = plan["head"]
+            head = os.path.join(workspace, "head.ts")
+            subprocess.run([
+                "ffmpeg", "-y",
+                "-ss", f"{head_seek:.6f}",
+                "-i", video,
+                "-t", f"{head_duration:.6f}",
+                "-map", "0:v:0", "-an",
+                *head_args,
+                "-f", "mpegts",
+                head
+            ], check=True)
+            parts.append(head)
+
+        tail_seek, tail_duration = plan["tail"]
+        tail = os.path.join(workspace, "tail.ts")
+        subprocess.run([
+            "ffmpeg", "-y",
+            "-ss", f"{tail_seek:.6f}",
             "-i", video,
-            "-ss", f"{start_seconds:.3f}",
-            "-to", f"{end_seconds:.3f}",
-            "-map", "0",  # 保留所有轨道
+            "-t", f"{tail_duration:.6f}",
+            "-map", "0:v:0", "-an",
+            "-c", "copy",  # 从关键帧开始直接复制
+            "-bsf:v", "h264_mp4toannexb",  # 原视频的参数集写入码流
+            "-f", "mpegts",
+            tail
+        ], check=True)
+        parts.append(tail)
+
+        concat_list = os.path.join(workspace, "concat.txt")
+        with open(concat_list, "w", encoding="utf-8") as f:
+            for part in parts:
+                f.write(f"file '{part}'\n")
+
+        command = ["ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", concat_list]
+        if info.has_audio:
+            audio = os.path.join(workspace, "audio.m4a")
+            subprocess.run([
+                "ffmpeg", "-y",
+                "-ss", f"{start_seconds:.6f}",
+                "-i", video,
+                "-t", f"{end_seconds - start_seconds:.6f}",
+                "-map", "0:a:0", "-vn",
+                "-c:a", "aac",
+                audio
+            ], check=True)
+            command.extend(["-i", audio, "-map", "0:v:0", "-map", "1:a:0"])
+        command.extend([
+            "-c", "copy",
+            "-tag:v", "avc3",  # 参数集在码流中，开头和其余部分各自使用自己的 SPS/PPS
             "-map_metadata", "-1",  # 清除全局元信息
-            "-c:v", video_codec,  # 强制重新编码视频
-            "-c:a", "aac",  # 强制重新编码音频
             "-movflags", "use_metadata_tags",  # 生成符合新元信息标准的文件
             output_path
+        ])
+        logging.info(f"智能剪切拼接 {' '.join(command)}")
+        subprocess.run(command, check=True)
+    finally:
+        shutil.rmtree(workspace, ignore_errors=True)
+
+
+def line_screenshot_seconds(info):
+    # 每行截图取这一行字幕结束前0.4秒的画面
+    return max(0.0, timestamp_convert_to_seconds(info["et"]) - 0.4)
+
+
+def extract_line_screenshot(video, seconds, screenshot_path):
+    """逐行截图：只截取一张，失败抛出 CalledProcessError"""
+    command = [
+        "ffmpeg", "-y", "-i", video, "-ss", str(seconds), "-vframes", "1","-q:v", "2", screenshot_path
+    ]
+    logging.info(f"创建每行截图 video:{video} screenshot_path:{screenshot_path} command:{' '.join(command)}")
+    subprocess.run(command, check=True)
+
+
+def extract_line_screenshots(split_endtime_json_list,video_name,video,screenshots_dir,ids=None,batch_size=FRAGMENT_BATCH_SIZE):
+    """
+    批量生成每行截图：把所有截图时间排序后，一个 ffmpeg 进程向前解码一次截取所有画面。
+
+    原来的做法每一行都从视频开头解码到截图位置（-ss 放在 -i 后面），总耗时随行数平方增长。
+    每一批最多 batch_size 张，输入使用 -ss 跳到这一批的第一张，批量失败的截图再逐张重试。
+
+    :param ids: 只截取这些行（从1开始），None 表示所有行
+    :return: {行id: 截图路径}，只包含成功生成的截图
+    """
+    shots = []
+    id_counter = 0
+    for info in split_endtime_json_list:
+        id_counter += 1
+        if ids is not None and id_counter not in ids:
+            continue
+        screenshot_path = os.path.join(screenshots_dir, f"{video_name}-{id_counter}.jpg")
+        try:
+            shots.append((line_screenshot_seconds(info), id_counter, screenshot_path))
+        except Exception as e:
+            logging.error(f"截图时间格式错误 id:{id_counter} et:{info.get('et')} {e}")
+    shots.sort()
+
+    screenshots = {}
+    for batch_index in range(0, len(shots), batch_size):
+        batch = shots[batch_index:batch_index + batch_size]
+        batch_start = batch[0][0]
+        # 每一路只需要第一帧，trim 的结束时间只是为了让这一路尽早结束
+        ranges = [(seconds - batch_start, seconds - batch_start + 1.0) for seconds, _, _ in batch]
+        filter_script, labels = build_trim_filter_script(ranges, with_audio=False)
+        filter_script_path = os.path.join(screenshots_dir, f"{video_name}-screenshot-filter-{batch_index}.txt")
+        with open(filter_script_path, "w", encoding="utf-8") as f:
+            f.write(filter_script)
+
+        command = [
+            "ffmpeg", "-y",
+            "-ss", f"{batch_start:.3f}",  # 输入跳转到这一批的第一张截图
+            "-i", video,
+            "-filter_complex_script", filter_script_path,
         ]
+        for (_, _, screenshot_path), (video_label, _) in zip(batch, labels):
+            command.extend(["-map", video_label, "-frames:v", "1", "-q:v", "2", screenshot_path])
+
+        logging.info(f"批量创建每行截图 video:{video} 数量:{len(batch)} command:{' '.join(command)}")
+        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, encoding="utf-8", errors="ignore")
+        safe_remove(filter_script_path, "删除滤镜脚本")
+        if result.returncode != 0:
+            logging.error(f"批量截图失败，逐张重试 video:{video} stderr:{result.stderr[-2000:]}")
+
+        for seconds, id_counter, screenshot_path in batch:
+            if result.returncode == 0 and os.path.exists(screenshot_path) and os.path.getsize(screenshot_path) > 0:
+                screenshots[id_counter] = screenshot_path
+                continue
+            try:
+                extract_line_screenshot(video, seconds, screenshot_path)
+                screenshots[id_counter] = screenshot_path
+            except Exception as e:
+                logging.error(f"创建每行截图失败 id:{id_counter} video:{video} {e}")
 
-        logging.info(f"按行分段保存 {output_path} video:{video} command:{' '.join(command)} en_content:{en_content}")
-        subprocess.run(command, check=True)
+    logging.info(f"批量创建每行截图完成 video:{video} 成功:{len(screenshots)} 总数:{len(shots)}")
+    return screenshots
+
+
+def sample_video_frames(video_file, timestamps, frame_size=None):
+    """
+    从同一个视频读取器中截取多张画面，返回内存中的 RGB 数组（numpy）。
+
+    时间戳先排序，再按顺序跳转（cv2 的跳转会先定位到关键帧，再解码到目标位置），
+    不需要为每一张截图启动一个 ffmpeg 进程，也不需要把截图写入磁盘再读回来。
+
+    :param timestamps: 截图时间（秒）列表
+    :param frame_size: 可选 (宽, 高)，截图后直接缩放到这个尺寸
+    :return: 成功截取的画面列表（按时间排序）
+    """
+    import cv2
+    capture = cv2.VideoCapture(video_file)
+    if not capture.isOpened():
+        raise RuntimeError(f"无法打开视频: {video_file}")
+    frames = []
+    try:
+        for timestamp in sorted(timestamps):
+            capture.set(cv2.CAP_PROP_POS_MSEC, timestamp * 1000)
+            ok, frame = capture.read()
+            if not ok or frame is None:
+                logging.error(f"截图失败 video_file:{video_file} timestamp:{timestamp}")
+                continue
+            if frame_size is not None:
+                frame = cv2.resize(frame, frame_size, interpolation=cv2.INTER_LANCZOS4)
+            frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    finally:
+        capture.release()
+    return frames
+
+
+# 封面合成子进程中共享的截图，由 init_cover_worker 设置
+_COVER_FRAMES = None
+
+
+def init_cover_worker(frames):
+    global _COVER_FRAMES
+    _COVER_FRAMES = frames
+
+
+def build_cover_image(job):
+    """
+    在子进程中把 3 张截图从上到下拼接成一张封面并保存为 JPG。
+
+    :param job: (截图序号列表, 输出路径)
+    :return: 输出路径
+    """
+    from PIL import Image
+
+    frame_indexes, output_image_path = job
+    image_objects = [Image.fromarray(_COVER_FRAMES[i]) for i in frame_indexes]
+
+    # 获取最大宽度和总高度
+    widths, heights = zip(*(img.size for img in image_objects))
+    max_width = max(widths)
+    total_height = sum(heights)
+
+    # 逐张拼接
+    combined_image = Image.new("RGB", (max_width, total_height))
+    y_offset = 0
+    for img in image_objects:
+        combined_image.paste(img, (0, y_offset))
+        y_offset += img.height
+
+    # 拉伸或压缩到封面尺寸
+    if combined_image.size != COVER_IMAGE_SIZE:
+        combined_image = combined_image.resize(COVER_IMAGE_SIZE, Image.Resampling.LANCZOS)
+    combined_image.save(output_image_path, format="JPEG")
+    return output_image_path
 
 
 def add_titles_to_images(video_path, folder_path):
+    from PIL import Image, ImageDraw, ImageFont
+    Image.MAX_IMAGE_PIXELS = None
+
     font_path = os.path.join(os.path.dirname(__file__), 'static', "AlibabaPuHuiTi-3-115-Black.ttf")
     video_name = os.path.splitext(os.path.basename(video_path))[0]
 
@@ -229,17 +704,164 @@ def crop_to_portrait(video_path, output_path, target_resolution=(720, 1280)):
     crop_width = int(height * target_resolution[0] / target_resolution[1])
     crop_x = (width - crop_width) // 2
 
-    # 使用ffmpeg裁剪视频
-    command = [
-        'ffmpeg', '-i', video_path,
-        '-vf', f'crop={crop_width}:{height}:{crop_x}:0',
-        '-c:a', 'copy', output_path
-    ]
-    subprocess.run(command)
+    # 使用ffmpeg裁剪视频（分段并行编码）
+    try:
+        encode_chunked(video_path, output_path, video_filter=f'crop={crop_width}:{height}:{crop_x}:0')
+    except subprocess.CalledProcessError as e:
+        print(f"裁剪失败: {video_path} 错误: {e}")
+        return
     print(f"已裁剪并保存: {output_path}")
 
 
+# 批量转换横屏/竖屏时输出文件名的前缀：pc 横屏，crop 竖屏居中裁剪，pad 竖屏缩放后上下补黑边
+RENDITION_PREFIXES = {"pc": "pc_", "crop": "cropped_", "pad": "scaled_"}
+TEXT_PREFIX = "text_"
+
+
+def rendition_filter(rendition, width, height, phone_resolution=None):
+    """
+    一种输出画面的滤镜。
+
+    pc：横屏视频保持原分辨率，竖屏视频补黑边为 16:9；
+    crop：居中裁剪为 9:16，保持原视频的高度（和 crop_to_portrait 相同）；
+    pad：整个画面缩放到手机分辨率以内，上下补黑边。
+
+    画面不需要改变（横屏视频的 pc、竖屏视频的 crop）时返回 "null"。
+    """
+    phone_width, phone_height = phone_resolution or config.PHONE_RESOLUTION
+    if rendition == "pc":
+        if width >= height:
+            return "null"
+        pc_width = (height * 16 // 9) // 2 * 2
+        return f"pad={pc_width}:{height}:(ow-iw)/2:0,setsar=1"
+    if rendition == "crop":
+        crop_width = int(height * phone_width / phone_height) // 2 * 2
+        if is_portrait_video(width, height) or crop_width >= width:
+            return "null"
+        crop_x = (width - crop_width) // 2
+        return f"crop={crop_width}:{height}:{crop_x}:0"
+    if rendition == "pad":
+        return (f"scale={phone_width}:{phone_height}:force_original_aspect_ratio=decrease,"
+                f"pad={phone_width}:{phone_height}:(ow-iw)/2:(oh-ih)/2,setsar=1")
+    raise ValueError(f"不存在的输出类型: {rendition}，可选: {', '.join(RENDITION_PREFIXES)}")
+
+
+def rendition_path(video_path, rendition, text=None):
+    prefix = RENDITION_PREFIXES[rendition]
+    if text:
+        prefix = TEXT_PREFIX + prefix
+    return os.path.join(os.path.dirname(video_path), prefix + os.path.basename(video_path))
+
+
+def is_up_to_date(source_path, output_path):
+    """输出文件存在、不为空并且比原视频新"""
+    try:
+        output_stat = os.stat(output_path)
+    except OSError:
+        return False
+    return output_stat.st_size > 0 and output_stat.st_mtime_ns >= os.stat(source_path).st_mtime_ns
+
+
+def convert_orientation(video_path, renditions, text=None, threads=None):
+    """
+    原视频只解码一次，用 split 滤镜同时输出多种画面（横屏、竖屏裁剪、竖屏补边），音频直接复制。
+
+    已经是最新的输出会跳过；先写到临时文件，成功后再替换，失败不会留下不完整的文件。
+
+    :param renditions: 输出类型列表，见 RENDITION_PREFIXES
+    :param text: 可选，画面中间添加的文字（所有输出都添加）
+    :param threads: 每个 x264 进程的线程数
+    :return: 新生成的文件列表
+    """
+    pending = [(r, rendition_path(video_path, r, text)) for r in renditions]
+    pending = [(r, output_path) for r, output_path in pending if not is_up_to_date(video_path, output_path)]
+    if not pending:
+        print(f"输出已经是最新，跳过: {video_path}")
+        return []
+
+    info = probe_media(video_path)
+    if not text:
+        # 和 crop_to_portrait 相同：画面不需要改变的输出（横屏视频的 pc、竖屏视频的 crop）不重新编码，直接跳过
+        for rendition, _ in pending:
+            if rendition_filter(rendition, info.width, info.height) == "null":
+                print(f"{video_path} 已经是{'横屏' if rendition == 'pc' else '竖屏'}视频，跳过 {rendition}")
+        pending = [(r, output_path) for r, output_path in pending if rendition_filter(r, info.width, info.height) != "null"]
+        if not pending:
+            return []
+
+    source = "[0:v:0]"
+    if text:
+        source += drawtext_filter(text) + ","
+    split_labels = "".join(f"[s{i}]" for i in range(len(pending)))
+    filter_lines = [f"{source}split={len(pending)}{split_labels}" if len(pending) > 1 else f"{source}null[s0]"]
+    output_args = []
+    temp_paths = []
+    for i, (rendition, output_path) in enumerate(pending):
+        filter_lines.append(f"[s{i}]{rendition_filter(rendition, info.width, info.height)}[o{i}]")
+        temp_path = f"{output_path}.temp{os.path.splitext(output_path)[1]}"
+        temp_paths.append(temp_path)
+        output_args.extend([
+            "-map", f"[o{i}]", "-map", "0:a:0?",
+            *video_encode_args(threads=threads),
+            "-c:a", "copy",  # 保留原始音频
+            temp_path
+        ])
+    command = ["ffmpeg", "-y", "-i", video_path, "-filter_complex", ";".join(filter_lines), *output_args]
+
+    logging.info(f"转换横屏/竖屏 {video_path} 输出:{[r for r, _ in pending]} command:{' '.join(command)}")
+    try:
+        with encode_slots():
+            subprocess.run(command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        for temp_path, (_, output_path) in zip(temp_paths, pending):
+            os.replace(temp_path, output_path)
+    finally:
+        for temp_path in temp_paths:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+    return [output_path for _, output_path in pending]
+
+
+def convert_orientation_batch(path, renditions, text=None, workers=None):
+    """
+    转换文件夹（包括子文件夹）中的所有视频，多个视频同时处理，同时编码的进程数受全局编码预算限制。
+
+    已经生成的输出文件（带 pc_/cropped_/scaled_/text_ 前缀）不作为输入。
+
+    :return: 新生成的文件列表
+    """
+    workers = workers or encoder_slot_count()
+    prefixes = tuple(RENDITION_PREFIXES.values()) + (TEXT_PREFIX,)
+    videos = []
+    for root, dirs, files in os.walk(path):
+        for file in sorted(files):
+            if file.endswith(('.mp4', '.mkv', '.avi', '.mov')) and not file.startswith(prefixes) and ".temp" not in file:
+                videos.append(os.path.join(root, file))
+    logging.info(f"批量转换横屏/竖屏 path:{path} 视频数:{len(videos)} 输出:{renditions} workers:{workers}")
+
+    outputs = []
+    threads = threads_per_encoder(workers)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(convert_orientation, video, renditions, text, threads): video for video in videos}
+        for future in as_completed(futures):
+            try:
+                created = future.result()
+                outputs.extend(created)
+                for output_path in created:
+                    print(f"已保存: {output_path}")
+            except subprocess.CalledProcessError as e:
+                print(f"转换失败: {futures[future]} 错误: {e}")
+                logging.error(f"转换横屏/竖屏失败: {futures[future]} stderr:{e.stderr.decode('utf-8', errors='ignore')[-2000:] if e.stderr else ''}")
+            except Exception as e:
+                # 一个视频失败（无法读取、没有视频流等）不影响其他视频
+                print(f"转换失败: {futures[future]} 错误: {e}")
+                logging.error(f"转换横屏/竖屏失败: {futures[future]} 错误: {e}")
+    return outputs
+
+
 def add_info_text_to_images(video_path, folder_path, srt_path):
+    from PIL import Image, ImageDraw, ImageFont
+    Image.MAX_IMAGE_PIXELS = None
+
     # 字体路径
     font_path = os.path.join(os.path.dirname(resource_filename(__name__,".")),'static', "AlibabaPuHuiTi-3-115-Black.ttf")
     font_size = 99
@@ -305,9 +927,11 @@ def add_info_text_to_images(video_path, folder_path, srt_path):
                 print(f"处理图片 {file_path} 时出错: {e}")
 
 
-def split_complete_video(split_endtime_json_list,video_name,video_extension,video_split_complete_dir,video):
+def split_complete_video(split_endtime_json_list,video_name,video_extension,video_split_complete_dir,video,ass_path=None):
     # 按照行分段原视频-完整视频(上一行字幕的结束到这一行字幕的开始)
         st = "00:00:00,000"
+        # 视频总时长只获取一次，不在每一行里重复调用ffprobe
+        video_totle_second = get_mp4_duration_ffmpeg(video)
         # 将字典的键值对转换为列表
         id_counter = 0
         for info in split_endtime_json_list:
@@ -328,36 +952,177 @@ def split_complete_video(split_endtime_json_list,video_name,video_extension,vide
             output_path = os.path.join(video_split_complete_dir, split_name)
 
             start_seconds = timestamp_convert_to_seconds(st)
-            video_totle_second = get_mp4_duration_ffmpeg(video)
 
             if end_time is None:
-                end_seconds = get_mp4_duration_ffmpeg(video)
+                end_seconds = video_totle_second
             else:
                 end_seconds = timestamp_convert_to_seconds(end_time)
                 if end_seconds > video_totle_second:
                     end_seconds = video_totle_second
 
-            command = [
-                "ffmpeg",
-                "-accurate_seek",
-                "-i", video,
-                "-ss", f"{start_seconds:.3f}",
-                "-to", f"{end_seconds:.3f}",
-                "-map", "0",  # 保留所有轨道
-                "-map_metadata", "-1",  # 清除全局元信息
-                "-c:v", "libx264",  # 强制重新编码视频
-                "-c:a", "aac",  # 强制重新编码音频
-                "-movflags", "use_metadata_tags",  # 生成符合新元信息标准的文件
-                output_path
-            ]
-
-            logging.info(f"按行完整保存 {output_path} video:{video} command:{' '.join(command)} en_content:{en_content} cn_content:{cn_content}")
-            subprocess.run(command, check=True)
+            # 与每行分段视频的截取命令相同
+            logging.info(f"按行完整保存 {output_path} video:{video} en_content:{en_content} cn_content:{cn_content}")
+            cut_fragment_clip(video, start_seconds, end_seconds, output_path, ass_path)
+            clip_catalog.register_clip(output_path, media=clip_spec.clip_media(end_seconds - start_seconds))
             
             # st = subtract_one_millisecond(end_time)
             st = add_one_millisecond(end_time)
 
 
+def complete_video_boundaries(split_endtime_json_list, video_totle_second, video=None):
+    """
+    每行完整视频的切点（秒）。
+
+    最后一行一直到视频结尾，所以切点只有前 n-1 行的结束时间。
+    切点必须严格递增（至少相差 COMPLETE_VIDEO_MIN_PIECE_SECOND）并且在视频时长之内，
+    超出视频时长的切点从后往前压缩到视频结尾之前，保证每一行都有完整视频。
+    """
+    boundaries = []
+    previous = 0
+    for info in split_endtime_json_list[:-1]:
+        boundary = timestamp_convert_to_seconds(info["et"])
+        boundary = max(boundary, previous + COMPLETE_VIDEO_MIN_PIECE_SECOND)
+        boundaries.append(boundary)
+        previous = boundary
+
+    # 从后往前压缩：最后一个切点离视频结尾至少 COMPLETE_VIDEO_MIN_PIECE_SECOND，前面的切点依次相差同样的距离
+    limit = video_totle_second - COMPLETE_VIDEO_MIN_PIECE_SECOND
+    clamped = 0
+    for index in range(len(boundaries) - 1, -1, -1):
+        if boundaries[index] > limit:
+            boundaries[index] = limit
+            clamped += 1
+        limit = boundaries[index] - COMPLETE_VIDEO_MIN_PIECE_SECOND
+    if clamped:
+        logging.warning(f"每行完整视频切点超过视频时长，压缩到视频结尾之前 切点数:{clamped} video_totle_second:{video_totle_second} video:{video}")
+
+    # 视频太短，放不下所有的行时，只切分前面放得下的行，后面的行没有完整视频
+    too_short = sum(1 for b in boundaries if b < COMPLETE_VIDEO_MIN_PIECE_SECOND - 1e-6)
+    if too_short:
+        logging.warning(f"视频太短，最后{too_short}行没有完整视频 video_totle_second:{video_totle_second} video:{video}")
+        return complete_video_boundaries(split_endtime_json_list[:len(boundaries) - too_short + 1], video_totle_second, video)
+    return boundaries
+
+
+def timeline_lines(split_endtime_json_list, video, line_outputs):
+    """
+    生成时间线文件中每一行的内容（见 movie_opt.timeline.write_manifest）。
+
+    每行分段视频和每行完整视频只记录原视频中的时间段，与 split_fragment_video/split_complete_video_single_pass 的切法相同。
+
+    :param line_outputs: {行号: render_line 返回的结果}
+    """
+    video_totle_second = get_mp4_duration_ffmpeg(video)
+    if video_totle_second is None:
+        raise RuntimeError(f"无法获取视频时长: {video}")
+    boundaries = complete_video_boundaries(split_endtime_json_list, video_totle_second, video)
+
+    lines = []
+    for id_counter, info in enumerate(split_endtime_json_list, start=1):
+        start_seconds = timestamp_convert_to_seconds(info["st"])
+        end_seconds = min(timestamp_convert_to_seconds(info["et"]) + 0.1, video_totle_second)
+        fragment = [start_seconds, end_seconds] if start_seconds < end_seconds else None
+
+        complete = None
+        if id_counter <= len(boundaries) + 1:
+            complete_start = boundaries[id_counter - 2] if id_counter > 1 else 0
+            complete_end = boundaries[id_counter - 1] if id_counter <= len(boundaries) else video_totle_second
+            complete = [complete_start, complete_end]
+
+        outputs = line_outputs.get(id_counter) or {}
+        lines.append({
+            "id": id_counter,
+            "fragment": fragment,
+            "complete": complete,
+            "screenshot": outputs.get("screenshots"),
+            "audio": {kind.split(":", 1)[1]: path for kind, path in outputs.items() if kind.startswith("audio:")},
+        })
+    return lines
+
+
+def split_complete_video_single_pass(split_endtime_json_list,video_name,video_extension,video_split_complete_dir,video,ass_path=None):
+    """
+    按照行分段原视频-完整视频的单次编码版本。
+
+    每行完整视频是连续的（上一行字幕的结束到这一行字幕的结束），所以整条时间线只需要编码一次：
+    在每一行的结束时间强制插入关键帧，再由 segment 复用器在这些关键帧处直接切成每行的片段（流复制），
+    总编码量只和视频长度有关，与字幕行数无关。
+
+    :param split_endtime_json_list: extract_subtitle_info_from_srt 返回的字幕行列表
+    :param video_name: 视频名（不带后缀）
+    :param video_extension: 视频后缀（带 .）
+    :param video_split_complete_dir: 保存每行完整视频的文件夹
+    :param video: 输入视频路径
+    :param ass_path: 可选，同时烧录的 ASS 字幕（时间相对于 video）
+    :return: 生成的片段路径列表（按行号排序）
+    """
+    if split_endtime_json_list is None or len(split_endtime_json_list) <= 0:
+        return []
+
+    video_totle_second = get_mp4_duration_ffmpeg(video)
+    if video_totle_second is None:
+        raise RuntimeError(f"无法获取视频时长: {video}")
+
+    boundaries = complete_video_boundaries(split_endtime_json_list, video_totle_second, video)
+
+    segment_times = ",".join(f"{b:.3f}" for b in boundaries)
+    # segment 复用器的文件名是 printf 格式，需要转义路径里的 %
+    video_split_complete_dir = os.path.abspath(video_split_complete_dir)
+    output_pattern = os.path.join(video_split_complete_dir.replace("%", "%%"), video_name.replace("%", "%%") + "-%d" + video_extension)
+    segment_list = os.path.join(video_split_complete_dir, f"{video_name}-segments.csv")
+
+    workspace = None
+    filter_args = []
+    if ass_path:
+        workspace = tempfile.mkdtemp(prefix=".subtitle-", dir=video_split_complete_dir)
+        filter_args = ["-vf", burn_subtitle_filter(ass_path, 0, None, workspace)]
+
+    command = [
+        "ffmpeg", "-y",
+        "-i", os.path.abspath(video),
+        *clip_spec.map_args(),  # 只保留第一个视频流和音频流
+        *filter_args,
+        "-map_metadata", "-1",  # 清除全局元信息
+        *video_encode_args(),  # 整条时间线只编码一次
+        "-r", str(clip_spec.FPS),
+        "-pix_fmt", clip_spec.PIX_FMT,
+        *clip_spec.audio_output_args(),
+    ]
+    if segment_times:
+        command.extend(["-force_key_frames", segment_times])  # 在每个切点强制关键帧
+    command.extend([
+        "-f", "segment",
+        "-segment_times", segment_times if segment_times else f"{video_totle_second:.3f}",
+        "-segment_start_number", "1",  # 与行号一致，从1开始
+        "-reset_timestamps", "1",  # 每个片段的时间戳从0开始
+        "-segment_list", segment_list,
+        "-segment_list_type", "csv",
+    ])
+    if video_extension.lower() in (".mp4", ".mov", ".m4v"):
+        # 生成符合新元信息标准的文件，timescale 由每个片段的 mp4 复用器设置（mkv 的 timescale 固定为 1/1000）
+        command.extend(["-segment_format_options", f"movflags=use_metadata_tags:video_track_timescale={clip_spec.TIMESCALE}"])
+    command.append(output_pattern)
+
+    logging.info(f"按行完整保存(单次编码) video:{video} 行数:{len(split_endtime_json_list)} 切点数:{len(boundaries)} command:{' '.join(command)}")
+    try:
+        subprocess.run(command, check=True, cwd=workspace)
+    finally:
+        if workspace is not None:
+            shutil.rmtree(workspace, ignore_errors=True)
+
+    outputs = []
+    cut_points = [0] + boundaries + [video_totle_second]
+    for id_counter in range(1, len(boundaries) + 2):
+        output_path = os.path.join(video_split_complete_dir, f"{video_name}-{id_counter}{video_extension}")
+        if os.path.exists(output_path):
+            outputs.append(output_path)
+            clip_catalog.register_clip(output_path, media=clip_spec.clip_media(cut_points[id_counter] - cut_points[id_counter - 1]))
+        else:
+            logging.error(f"每行完整视频缺失 id:{id_counter} output_path:{output_path}")
+    safe_remove(segment_list, "删除切分列表")
+    return outputs
+
+
 class PictureOperater:
     def __init__(self,launageAI,voiceOperater):
         self.launageAI:LaunageAI = launageAI
@@ -375,24 +1140,42 @@ class PictureOperater:
             print(f"路径不存在: {path}")
             return
         
-        print(f"视频文件夹路径: {args.path}")
+        print(f"视频文件夹路径: {path}")
 
-        # 遍历文件夹中的所有视频文件
-        for root, dirs, files in os.walk(args.path):
-            for file in files:
-                if file.endswith(('.mp4', '.mkv', '.avi', '.mov')):
-                    video_path = os.path.join(root, file)
-                    output_path = os.path.join(root, f"cropped_{file}")
-                    
-                    crop_to_portrait(video_path, output_path)
+        # 遍历文件夹中的所有视频文件，居中裁剪为竖屏（--pc 时同一次解码同时输出横屏视频）
+        renditions = ["crop", "pc"] if getattr(args, "pc", False) else ["crop"]
+        return convert_orientation_batch(path, renditions, workers=getattr(args, "workers", None))
 
 
     def scale_pc2phone(self,args):
-        print(f"srt路径 {args.path}")
+        path = args.path if args.path else os.getcwd()
+        if not os.path.exists(path):
+            print(f"路径不存在: {path}")
+            return
+
+        print(f"视频文件夹路径: {path}")
+
+        # 整个画面缩放为竖屏，上下补黑边（--pc 时同一次解码同时输出横屏视频）
+        renditions = ["pad", "pc"] if getattr(args, "pc", False) else ["pad"]
+        return convert_orientation_batch(path, renditions, workers=getattr(args, "workers", None))
 
 
     def add_text(self,args):
-        pass
+        path = args.path if args.path else os.getcwd()
+        if not os.path.exists(path):
+            print(f"路径不存在: {path}")
+            return
+
+        text = getattr(args, "text", None)
+        if not text:
+            print("缺少要添加的文字: --text")
+            return
+
+        # 画面中间添加文字，输出横屏视频，--phone 时同一次解码同时输出竖屏视频
+        renditions = ["pc"]
+        if getattr(args, "phone", None):
+            renditions.append(args.phone)
+        return convert_orientation_batch(path, renditions, text=text, workers=getattr(args, "workers", None))
 
 
     def video_segment(self,args):
@@ -460,38 +1243,38 @@ class PictureOperater:
 
         logging.info("segment_json:\n%s\n", segment_json)
 
-        # 对 segment_json 中的每个片段处理视频
+        workers = getattr(args, "workers", None) or config.SEGMENT_WORKERS
+        smart_cut = bool(getattr(args, "smart_cut", False)) or config.SEGMENT_SMART_CUT
+        # 截取片段时同时烧录字幕，不需要先用 addass 生成整部带字幕的视频
+        ass_path = getattr(args, "ass_path", None)
+
+        # 对 segment_json 中的每个片段处理视频，各个片段互不依赖，可以同时截取
+        jobs = []
         for segment in segment_json:
             output_filename = os.path.join(output_dir, f"{segment['filename']}." + video_extend)
             print(f"准备处理视频片段: {output_filename}")
+            if os.path.exists(output_filename):
+                continue
+            start_seconds = timestamp_convert_to_seconds(segment['start'])
+            end_seconds = timestamp_convert_to_seconds(segment['end'])
+            jobs.append((start_seconds, end_seconds, output_filename))
 
-            if not os.path.exists(output_filename):
-                start_seconds = timestamp_convert_to_seconds(segment['start'])
-                end_seconds = timestamp_convert_to_seconds(segment['end'])
-
-                print(f"输出片段文件: {output_filename}")
-
-                # 使用 ffmpeg 截取视频片段（这种方案结尾的位置准确 但是开始位置会提前）
-                try:
-                    command = [
-                        "ffmpeg",
-                        "-accurate_seek",
-                        "-i", video,
-                        "-ss", f"{start_seconds:.3f}",
-                        "-to", f"{end_seconds:.3f}",
-                        "-map", "0",  # 保留所有轨道
-                        "-map_metadata", "-1",  # 清除全局元信息
-                        "-c:v", "libx264",  # 强制重新编码视频
-                        "-c:a", "aac",  # 强制重新编码音频
-                        "-movflags", "use_metadata_tags",  # 生成符合新元信息标准的文件
-                        output_filename
-                    ]
-                    
-                    print(f"执行命令: {' '.join(command)}")
-                    subprocess.run(command, check=True)
-                    print(f"成功截取片段: {output_filename}")
-                except subprocess.CalledProcessError as e:
-                    print(f"截取片段失败: {output_filename}, 错误: {e}")
+        def cut(job):
+            start_seconds, end_seconds, output_filename = job
+            print(f"输出片段文件: {output_filename}")
+            try:
+                if smart_cut:
+                    smart_cut_segment(video, start_seconds, end_seconds, output_filename, ass_path)
+                else:
+                    cut_segment(video, start_seconds, end_seconds, output_filename, ass_path)
+                print(f"成功截取片段: {output_filename}")
+            except subprocess.CalledProcessError as e:
+                print(f"截取片段失败: {output_filename}, 错误: {e}")
+                logging.error(f"截取片段失败: {output_filename}, 错误: {e}")
+
+        logging.info(f"截取视频片段 数量:{len(jobs)} workers:{workers} smart_cut:{smart_cut} ass_path:{ass_path}")
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            list(pool.map(cut, jobs))
         
 
     def split_video(self,args):
@@ -531,33 +1314,22 @@ class PictureOperater:
             logging.info(f"创建文件夹:{explain_dir}")
             
 
-            video_clips_dir = os.path.join(os.path.dirname(video), "每行发音视频-"+video_name)
-            os.makedirs(video_clips_dir, exist_ok=True)
-            logging.info(f"创建文件夹:{video_clips_dir}")
+            audio_dir = os.path.join(os.path.dirname(video), "每行音频-"+video_name)
+            os.makedirs(audio_dir, exist_ok=True)
+            logging.info(f"创建文件夹:{audio_dir}")
 
+            video_clips_dir = os.path.join(os.path.dirname(video), "每行发音视频-"+video_name)
             video_clips_dir2 = os.path.join(os.path.dirname(video), "每行发音视频2-"+video_name)
-            os.makedirs(video_clips_dir2, exist_ok=True)
-            logging.info(f"创建文件夹:{video_clips_dir2}")
-
             video_child_dir = os.path.join(os.path.dirname(video), "每行儿童发音视频-"+video_name)
-            os.makedirs(video_child_dir, exist_ok=True)
-            logging.info(f"创建文件夹:{video_child_dir}")
-
             video_empty_dir = os.path.join(os.path.dirname(video), "每行跟读视频-"+video_name)
-            os.makedirs(video_empty_dir, exist_ok=True)
-            logging.info(f"创建文件夹:{video_empty_dir}")
-
             video_cn_dir = os.path.join(os.path.dirname(video), "每行中文视频-"+video_name)
-            os.makedirs(video_cn_dir, exist_ok=True)
-            logging.info(f"创建文件夹:{video_cn_dir}")
-
             video_split_dir = os.path.join(os.path.dirname(video), "每行分段视频-"+video_name)
-            os.makedirs(video_split_dir, exist_ok=True)
-            logging.info(f"创建文件夹:{video_split_dir}")
-
             video_split_complete_dir = os.path.join(os.path.dirname(video), "每行完整视频-"+video_name)
-            os.makedirs(video_split_complete_dir, exist_ok=True)
-            logging.info(f"创建文件夹:{video_split_complete_dir}")
+            if config.PER_LINE_CLIPS:
+                # 每行视频只在需要时生成，否则合并视频直接由时间线生成
+                for clip_dir in [video_clips_dir, video_clips_dir2, video_child_dir, video_empty_dir, video_cn_dir, video_split_dir, video_split_complete_dir]:
+                    os.makedirs(clip_dir, exist_ok=True)
+                    logging.info(f"创建文件夹:{clip_dir}")
 
             video_name, _ = os.path.splitext(os.path.basename(video))
             
@@ -567,14 +1339,27 @@ class PictureOperater:
             
             try:
 
-                # 按照行字幕-分段原视频
-                split_fragment_video(split_endtime_json_list,video_name,video_extension,video_split_dir,video)
+                # 视频还没有字幕时，每行分段/完整视频和时间线在同一次编码中烧录字幕
+                ass_path = getattr(args, "ass_path", None)
+
+                if config.PER_LINE_CLIPS:
+                    # 按照行字幕-分段原视频
+                    if config.FRAGMENT_VIDEO_BATCH:
+                        split_fragment_video_batch(split_endtime_json_list,video_name,video_extension,video_split_dir,video,ass_path=ass_path)
+                    else:
+                        split_fragment_video(split_endtime_json_list,video_name,video_extension,video_split_dir,video,ass_path=ass_path)
 
-                # 按照行字幕-分段原视频-完整视频(上一行字幕的结束到这一行字幕的开始)
-                split_complete_video(split_endtime_json_list,video_name,video_extension,video_split_complete_dir,video)
+                    # 按照行字幕-分段原视频-完整视频(上一行字幕的结束到这一行字幕的开始)
+                    if config.COMPLETE_VIDEO_SINGLE_PASS:
+                        split_complete_video_single_pass(split_endtime_json_list,video_name,video_extension,video_split_complete_dir,video,ass_path=ass_path)
+                    else:
+                        split_complete_video(split_endtime_json_list,video_name,video_extension,video_split_complete_dir,video,ass_path=ass_path)
 
                 # 按照行字幕-分段原视频-不同视频(上一行字幕的结束到这一行字幕的开始)
-                self.split_different_video(split_endtime_json_list,video_name,video_extension,video,explain_dir,screenshots_dir,video_child_dir,video_cn_dir,video_clips_dir,video_clips_dir2,video_empty_dir,filter_count,filter_score)
+                line_outputs = self.split_different_video(split_endtime_json_list,video_name,video_extension,video,explain_dir,screenshots_dir,video_child_dir,video_cn_dir,video_clips_dir,video_clips_dir2,video_empty_dir,filter_count,filter_score,workers=getattr(args, "workers", None),audio_dir=audio_dir)
+
+                # 保存时间线，merge1 由时间线直接生成合并视频
+                timeline.write_manifest(video,video_name,video_extension,timeline_lines(split_endtime_json_list,video,line_outputs),ass_path=ass_path)
             except Exception as e:
                 logging.error(f"split_video异常",exc_info=True)
                 traceback.print_exc()
@@ -597,65 +1382,28 @@ class PictureOperater:
 
         # 定义保存文件夹路径
         base_dir = os.path.dirname(video_file)
-        images_dir = os.path.join(base_dir, "images")
         pictures_dir = os.path.join(base_dir, "picture")
 
         # 创建文件夹
-        os.makedirs(images_dir, exist_ok=True)
         os.makedirs(pictures_dir, exist_ok=True)
 
-        # 随机截图
+        # 随机截图，截图只保存在内存中，不再写入 images 文件夹
         print(f"Starting to generate {COMPOSITE_IMAGE_COUNT} random screenshots...")
-        for i in range(COMPOSITE_IMAGE_COUNT):
-            output_image = os.path.join(images_dir, f"frame_{i + 1}.png")
-            print(f"创建{COMPOSITE_IMAGE_COUNT}张封面 output_image:{output_image}")
-            timestamp = random.uniform(0, video_duration)  # 随机时间戳
-            if os.path.exists(output_image):
-                os.remove(output_image)
-            # 如果 -ss 位于 -i 参数之前，ffmpeg 会直接跳转到目标时间戳进行截图，速度会显著提高。
-            ffmpeg_cmd = [
-                "ffmpeg",
-                "-ss", f"{timestamp}",
-                "-i", video_file,
-                "-frames:v", "1",
-                output_image
-            ]
-            logging.info(f"创建{COMPOSITE_IMAGE_COUNT}张封面 {' '.join(ffmpeg_cmd)}")
-            subprocess.run(ffmpeg_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, encoding="utf-8")
-            print(f"Generated screenshot: {output_image}")
-
-        # 获取生成的图片路径
-        saved_images = [os.path.join(images_dir, img) for img in os.listdir(images_dir) if img.endswith(".png")]
-        print(f"Total screenshots saved: {len(saved_images)}")
-
-        # 生成合成图片
-        print(f"Starting to generate {COMPOSITE_IMAGE_COUNT} combined images...")
-        for i in range(COMPOSITE_IMAGE_COUNT):
-            # 随机选取 3 张图片
-            selected_images = random.sample(saved_images, 3)
-            image_objects = [Image.open(img) for img in selected_images]
-
-            # 获取最大宽度和总高度
-            widths, heights = zip(*(img.size for img in image_objects))
-            max_width = max(widths)
-            total_height = sum(heights)
-
-            # 创建合成图片
-            combined_image = Image.new("RGB", (max_width, total_height))
+        timestamps = [random.uniform(0, video_duration) for _ in range(COMPOSITE_IMAGE_COUNT)]
+        frames = sample_video_frames(video_file, timestamps, frame_size=(COVER_IMAGE_SIZE[0], COVER_IMAGE_SIZE[1] // 3))
+        print(f"Total screenshots sampled: {len(frames)}")
+        if len(frames) < 3:
+            raise RuntimeError(f"截图数量不足3张，无法生成封面 video_file:{video_file}")
 
-            # 逐张拼接
-            y_offset = 0
-            for img in image_objects:
-                combined_image.paste(img, (0, y_offset))
-                y_offset += img.height
-
-            # 拉伸或压缩到 1080x1920
-            combined_image_resized = combined_image.resize((1080, 1920), Image.Resampling.LANCZOS)
-
-            # 保存为 JPG 格式
-            output_image_path = os.path.join(pictures_dir, f"picture_{i + 1}.jpg")
-            combined_image_resized.save(output_image_path, format="JPEG")
-            print(f"Generated combined image: {output_image_path}")
+        # 生成合成图片，每张随机选取 3 张截图
+        print(f"Starting to generate {COMPOSITE_IMAGE_COUNT} combined images...")
+        jobs = [
+            (random.sample(range(len(frames)), 3), os.path.join(pictures_dir, f"picture_{i + 1}.jpg"))
+            for i in range(COMPOSITE_IMAGE_COUNT)
+        ]
+        with ProcessPoolExecutor(max_workers=config.COVER_WORKERS, initializer=init_cover_worker, initargs=(frames,)) as pool:
+            for output_image_path in pool.map(build_cover_image, jobs, chunksize=8):
+                print(f"Generated combined image: {output_image_path}")
 
         # 获取影片信息
         srts = find_srt_files(os.path.dirname(video_file))
@@ -670,325 +1418,289 @@ class PictureOperater:
 
 
     
-    def split_different_video(self,split_endtime_json_list,video_name,video_extension,video,explain_dir,screenshots_dir,video_child_dir,video_cn_dir,video_clips_dir,video_clips_dir2,video_empty_dir,filter_count,filter_score):
-        # 创建各种视频
-        id_counter = 0
-        for info in split_endtime_json_list:
-            id_counter += 1
-            start_time = info["st"]
-            end_time = info["et"]
-            cn_content = info["cn"]
-            en_content = info["en"]
-            
-            set_word_count = count_set_en_word(en_content)
-
-            # 若该行字幕少于filter_count个字符不生成跟读视频
-            if set_word_count < filter_count:
-                logging.info(f"英文字幕数少于{filter_count}个字符不生成跟读视频 {en_content} id:{id_counter}")
-                continue
-            
-            explain_path = None
-            try:
-                # 句子和最难的单词分数低于filter_score分不生解释图片，如果报错就直接跳过后面的视频生成代码
-                most_hard_words = self.launageAI.get_hard_word_scores(cn_content,en_content,filter_score)
-                # 解释每个有难度的单词
-                if most_hard_words is not None:
-                    logging.info(f"解释单词 {most_hard_words} id:{id_counter}")
-                    explain,en_cn_translations= self.launageAI.explain_words(most_hard_words)
-                    if explain != None:
-                        explain_name = f"{video_name}-{id_counter}.png"
-                        explain_path = os.path.join(explain_dir, explain_name)
-                        logging.info(f"生成解释图片：{explain_path} 解释单词的内容：{explain}")
-                        colors_exs = None
-                        if en_cn_translations is not None and len(en_cn_translations.items())>0:
-                            colors_exs = {}
-                            colors_exs["例句："] = "green"
-                            for en,cn in en_cn_translations.items():
-                                colors_exs[en] = "#f7cd05"
-                                colors_exs[cn] = "white"
-                        logging.info(f"解释单词作色：{colors_exs} id:{id_counter} en_content:{en_content}")
-                        if len(most_hard_words) == 2:
-                            font_size = 38
-                        elif len(most_hard_words) > 2:
-                            font_size = 33
-                        else:
-                            font_size = 43
-                        create_png_with_text_width_scalable(explain,explain_path,background_alpha=95,font_size=font_size,colors_ex=colors_exs)    
-                        logging.info(f"PNG 图片已保存: {explain_path} colors_ex={colors_exs}")
-                        add_glowing_border_with_rounded_corners(explain_path)
-                        logging.info(f"修改解释图片的边框和圆角: {explain_path}")
-                else:
-                    logging.info(f"没有需要解释的单词 {en_content} id:{id_counter}")
-            except Exception as e:
-                logging.error(f"本地模型单词评分发送异常",exc_info=True)
-                traceback.print_exc()
-                continue
+    def split_different_video(self,split_endtime_json_list,video_name,video_extension,video,explain_dir,screenshots_dir,video_child_dir,video_cn_dir,video_clips_dir,video_clips_dir2,video_empty_dir,filter_count,filter_score,workers=None,audio_dir=None):
+        """
+        创建每行的截图、解释图、每行音频和每行视频（config.PER_LINE_CLIPS 为 True 时）。
+
+        :return: {行号: render_line 返回的结果}，跳过或失败的行不在其中
+        """
+        if workers is None or workers <= 0:
+            workers = config.SPLIT_VIDEO_WORKERS
+        output_dirs = SimpleNamespace(
+            explain=explain_dir,
+            screenshots=screenshots_dir,
+            child=video_child_dir,
+            cn=video_cn_dir,
+            clips=video_clips_dir,
+            clips2=video_clips_dir2,
+            empty=video_empty_dir,
+            audio=audio_dir if audio_dir is not None else os.path.join(os.path.dirname(video), "每行音频-"+video_name),
+        )
+        os.makedirs(output_dirs.audio, exist_ok=True)
+        lines = list(enumerate(split_endtime_json_list, start=1))
+        logging.info(f"生成每行视频 video:{video} 行数:{len(lines)} workers:{workers}")
+
+        # 需要生成每行视频的行，截图一次性批量生成
+        screenshots = {}
+        if config.SCREENSHOT_BATCH:
+            ids = {id_counter for id_counter, info in lines if count_set_en_word(info["en"]) >= filter_count}
+            screenshots = extract_line_screenshots(split_endtime_json_list,video_name,video,screenshots_dir,ids=ids)
+
+        # 所有行的难词打分和解释先同时提问，生成每一行时直接使用结果（出错的行生成时重新提问）
+        scored_lines = [(id_counter, info) for id_counter, info in lines if count_set_en_word(info["en"]) >= filter_count]
+        line_scores = {}
+        results = self.launageAI.score_lines([(info["cn"], info["en"]) for _, info in scored_lines], filter_score, explain=True)
+        for (id_counter, _), result in zip(scored_lines, results):
+            if result is not None:
+                line_scores[id_counter] = result
+
+        line_outputs = {}
+        if workers <= 1:
+            for id_counter, info in lines:
+                result = self.render_line(id_counter,info,video_name,video_extension,video,output_dirs,filter_count,filter_score,screenshots.get(id_counter),line_scores.get(id_counter))
+                if result:
+                    line_outputs[id_counter] = result
+            return line_outputs
+
+        # 每一行都有自己的临时工作目录，所以不同的行可以并行生成
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(self.render_line,id_counter,info,video_name,video_extension,video,output_dirs,filter_count,filter_score,screenshots.get(id_counter),line_scores.get(id_counter)): id_counter
+                for id_counter, info in lines
+            }
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                    if result:
+                        line_outputs[futures[future]] = result
+                except Exception as e:
+                    logging.error(f"生成每行视频异常 id:{futures[future]} video:{video}",exc_info=True)
+                    traceback.print_exc()
+        return line_outputs
 
-                
-            screenshot_name = f"{video_name}-{id_counter}.jpg"
-            screenshot_path = os.path.join(screenshots_dir, screenshot_name)
-            
-            #edge-tts生成中文mp3
-            cn_voice = os.path.join(os.path.dirname(video),"cn_temp.mp3")
-            self.voiceOperater.edge_tts_voice(SimpleNamespace(content=cn_content,save_path=cn_voice,language="zh-cn",voice=None))
 
-            #edge-tts生成儿童发音mp3
-            child_voice = os.path.join(os.path.dirname(video),"child_temp.mp3")
-            self.voiceOperater.edge_tts_voice(SimpleNamespace(content=en_content,save_path=child_voice,language="en-child",voice=None))
-            
+    def render_line(self,id_counter,info,video_name,video_extension,video,output_dirs,filter_count,filter_score,screenshot=None,scored=None):
+        """
+        生成一行字幕的截图、解释图、五种每行音频和五种每行视频（config.PER_LINE_CLIPS 为 True 时）。
 
-            #edge-tts生成英国英语女发音mp3
-            content_voice = os.path.join(os.path.dirname(video),"temp.mp3")
-            print(f"File saved to: {content_voice}")
-            self.voiceOperater.edge_tts_voice(SimpleNamespace(content=en_content,save_path=content_voice,language=None,voice="en-GB-SoniaNeural"))
-            
+        screenshot 是已经批量生成好的截图（见 extract_line_screenshots），为 None 时这一行自己截图。
+        scored 是已经得到的难词打分和解释（见 LaunageAI.score_lines 的 explain 模式），为 None 时这一行自己提问。
 
-            #edge-tts生成美国英语男发音mp3
-            content_voice2 = os.path.join(os.path.dirname(video),"temp2.mp3")
-            self.voiceOperater.edge_tts_voice(SimpleNamespace(content=en_content,save_path=content_voice2,language=None,voice="en-US-AndrewMultilingualNeural"))
-            
+        所有中间文件（配音mp3、静音wav、截图等）都写在这一行自己的临时工作目录中，
+        全部生成成功后再用 os.replace 移动到各个“每行…”文件夹，失败的行不会留下不完整的文件。
 
-            #拼接音频“1s空白”和“中文内容”
-            cn_voice_duration = 0
-            if os.path.exists(cn_voice):
-                e = os.path.join(os.path.dirname(resource_filename(__name__,".")),'static', "empty1s.mp3")
-                merge_mp3_files(e , cn_voice)
-                cn_voice_duration = get_mp3_duration_tinytag(cn_voice)
-                print(f"voice_duration: {cn_voice_duration}")
-                if cn_voice_duration is None:
-                    continue
-
-                if cn_voice_duration <= 0:
-                    continue
-            else:
-                logging.error(f"创建音频失败 {cn_voice}")
-                continue
+        :return: 成功返回 {输出类型: 最终文件路径}，跳过或失败返回 None
+        """
+        en_content = info["en"]
+        set_word_count = count_set_en_word(en_content)
+
+        # 若该行字幕少于filter_count个字符不生成跟读视频
+        if set_word_count < filter_count:
+            logging.info(f"英文字幕数少于{filter_count}个字符不生成跟读视频 {en_content} id:{id_counter}")
+            return None
+
+        workspace = tempfile.mkdtemp(prefix=f".line-{id_counter}-", dir=os.path.dirname(os.path.abspath(video)))
+        try:
+            outputs = self.render_line_in_workspace(id_counter,info,video_name,video_extension,video,workspace,filter_score,screenshot,scored)
+            if outputs is None:
+                return None
+
+            # 提交：把工作目录中的结果移动到最终的文件夹（“audio:中文”等每行音频都放在 audio 文件夹）
+            committed = {}
+            for kind, workspace_path in outputs.items():
+                final_path = os.path.join(getattr(output_dirs, kind.split(":", 1)[0]), os.path.basename(workspace_path))
+                os.replace(workspace_path, final_path)
+                committed[kind] = final_path
+                logging.info(f"提交每行结果 id:{id_counter} {final_path}")
+                if clip_catalog.parse_clip_path(final_path) is not None:
+                    # 每行视频登记到片段目录，合并时直接查询（统一的片段格式，不需要再读取媒体信息）
+                    clip_catalog.register_clip(final_path, media=clip_spec.clip_media())
+            return committed
+        finally:
+            shutil.rmtree(workspace, ignore_errors=True)
+
+
+    def render_line_in_workspace(self,id_counter,info,video_name,video_extension,video,workspace,filter_score,screenshot=None,scored=None):
+        """
+        在临时工作目录 workspace 中生成一行字幕的所有结果。
+
+        :return: {输出类型: 工作目录中的文件路径}，每行音频的类型是 "audio:视频类型"，需要跳过这一行时返回 None
+        """
+        cn_content = info["cn"]
+        en_content = info["en"]
+        outputs = {}
 
-            #拼接音频“1s空白”和“儿童内容”
-            child_voice_duration = 0
-            if os.path.exists(child_voice):
-                e = os.path.join(os.path.dirname(resource_filename(__name__,".")),'static', "empty1s.mp3")
-                merge_mp3_files(e , child_voice)
-                child_voice_duration = get_mp3_duration_tinytag(child_voice)
-                print(f"voice_duration: {child_voice_duration}")
-                if child_voice_duration is None:
-                    continue
-
-                if child_voice_duration <= 0:
-                    continue
+        explain_path = None
+        try:
+            # 句子和最难的单词分数低于filter_score分不生解释图片，如果报错就直接跳过后面的视频生成代码
+            if scored is not None:
+                most_hard_words, explain, en_cn_translations = scored
             else:
-                logging.error(f"创建音频失败 {child_voice}")
-                continue
-
-            #拼接音频“慢速”和“内容”
-            voice_duration = 0
-            if os.path.exists(content_voice):
-                ding = os.path.join(os.path.dirname(resource_filename(__name__,".")),'static', "ding.mp3")
-                merge_mp3_files(ding , content_voice)
-                voice_duration = get_mp3_duration_tinytag(content_voice)
-                print(f"voice_duration: {voice_duration}")
-                if voice_duration is None:
-                    continue
-
-                if voice_duration <= 0:
-                    continue
+                most_hard_words = self.launageAI.get_hard_word_scores(cn_content,en_content,filter_score)
+            # 解释每个有难度的单词
+            if most_hard_words is not None:
+                logging.info(f"解释单词 {most_hard_words} id:{id_counter}")
+                if scored is None:
+                    explain,en_cn_translations= self.launageAI.explain_words(most_hard_words)
+                if explain != None:
+                    explain_name = f"{video_name}-{id_counter}.png"
+                    explain_path = os.path.join(workspace, explain_name)
+                    logging.info(f"生成解释图片：{explain_path} 解释单词的内容：{explain}")
+                    colors_exs = None
+                    if en_cn_translations is not None and len(en_cn_translations.items())>0:
+                        colors_exs = {}
+                        colors_exs["例句："] = "green"
+                        for en,cn in en_cn_translations.items():
+                            colors_exs[en] = "#f7cd05"
+                            colors_exs[cn] = "white"
+                    logging.info(f"解释单词作色：{colors_exs} id:{id_counter} en_content:{en_content}")
+                    if len(most_hard_words) == 2:
+                        font_size = 38
+                    elif len(most_hard_words) > 2:
+                        font_size = 33
+                    else:
+                        font_size = 43
+                    create_png_with_text_width_scalable(explain,explain_path,background_alpha=95,font_size=font_size,colors_ex=colors_exs)    
+                    logging.info(f"PNG 图片已保存: {explain_path} colors_ex={colors_exs}")
+                    add_glowing_border_with_rounded_corners(explain_path)
+                    logging.info(f"修改解释图片的边框和圆角: {explain_path}")
+                    outputs["explain"] = explain_path
             else:
-                logging.error(f"创建音频失败 {content_voice}")
-                continue
+                logging.info(f"没有需要解释的单词 {en_content} id:{id_counter}")
+        except Exception as e:
+            logging.error(f"本地模型单词评分发送异常",exc_info=True)
+            traceback.print_exc()
+            return None
+
+        screenshot_name = f"{video_name}-{id_counter}.jpg"
+        screenshot_path = os.path.join(workspace, screenshot_name)
+
+        #edge-tts生成中文mp3
+        cn_voice = os.path.join(workspace,"cn_temp.mp3")
+        self.voiceOperater.edge_tts_voice(SimpleNamespace(content=cn_content,save_path=cn_voice,language="zh-cn",voice=None))
+
+        #edge-tts生成儿童发音mp3
+        child_voice = os.path.join(workspace,"child_temp.mp3")
+        self.voiceOperater.edge_tts_voice(SimpleNamespace(content=en_content,save_path=child_voice,language="en-child",voice=None))
+
+        #edge-tts生成英国英语女发音mp3
+        content_voice = os.path.join(workspace,"temp.mp3")
+        self.voiceOperater.edge_tts_voice(SimpleNamespace(content=en_content,save_path=content_voice,language=None,voice="en-GB-SoniaNeural"))
+
+        #edge-tts生成美国英语男发音mp3
+        content_voice2 = os.path.join(workspace,"temp2.mp3")
+        self.voiceOperater.edge_tts_voice(SimpleNamespace(content=en_content,save_path=content_voice2,language=None,voice="en-US-AndrewMultilingualNeural"))
+
+        # 所有拼接都在内存中的 PCM 上完成，时长由采样数计算，只在最后复用进视频时编码一次
+        def prepend_audio(prefix_pcm, voice_path):
+            # 拼接音频“前缀”和“内容”，返回拼接后的 PCM，失败返回 None
+            if not os.path.exists(voice_path):
+                logging.error(f"创建音频失败 {voice_path}")
+                return None
+            pcm = audio_pcm.concat(prefix_pcm, audio_pcm.decode_audio(voice_path))
+            print(f"voice_duration: {audio_pcm.duration(pcm)}")
+            if len(pcm) <= len(prefix_pcm):
+                return None
+            return pcm
+
+        # 静态音频每个进程只解码一次
+        empty_pcm = assets.audio_asset("empty1s.mp3")
+        ding_pcm = assets.audio_asset("ding.mp3")
+
+        #拼接音频“1s空白”和“中文内容”
+        cn_pcm = prepend_audio(empty_pcm, cn_voice)
+        if cn_pcm is None:
+            return None
+
+        #拼接音频“1s空白”和“儿童内容”
+        child_pcm = prepend_audio(empty_pcm, child_voice)
+        if child_pcm is None:
+            return None
+
+        #拼接音频“慢速”和“内容”
+        voice_pcm = prepend_audio(ding_pcm, content_voice)
+        if voice_pcm is None:
+            return None
+
+        #拼接音频“1s空白”和“内容”（美音）
+        voice2_pcm = prepend_audio(empty_pcm, content_voice2)
+        if voice2_pcm is None:
+            return None
+
+        cn_voice_duration = audio_pcm.duration(cn_pcm)
+        child_voice_duration = audio_pcm.duration(child_pcm)
+        voice_duration = audio_pcm.duration(voice_pcm)
+
+        #创建每行所需要的截图
+        if screenshot is not None and os.path.exists(screenshot):
+            # 批量截图已经生成，复制到工作目录后再叠加解释图
+            shutil.copyfile(screenshot, screenshot_path)
+        else:
+            extract_line_screenshot(video, line_screenshot_seconds(info), screenshot_path)
+        print(f"生成截图: {screenshot_path}")
+
+        # 带有有解释图片的截图
+        if explain_path is not None and os.path.exists(explain_path) and os.path.exists(screenshot_path):
+            logging.info(f"通过解释图片和截图生成带有有解释图片的截图: {explain_path}")
+            print(f"通过解释图片和截图生成带有有解释图片的截图: {explain_path} {screenshot_path}")
+            overlay_image(screenshot_path,explain_path)
+        outputs["screenshots"] = screenshot_path
+
+        #跟读音频：“ding”后面填充静音，和发音音频一样长
+        silence_samples = len(voice_pcm) - len(ding_pcm)
+        if silence_samples > 0:
+            follow_pcm = audio_pcm.concat(ding_pcm, audio_pcm.silence_samples(silence_samples))
+        else:
+            follow_pcm = assets.audio_asset("follow.mp3")
+
+        clip_name = f"{video_name}-{id_counter}{video_extension}"
+        # (输出文件夹类型, 音频PCM, 视频持续时间, 是否 -shortest, 说明)
+        variants = [
+            ("child", child_pcm, child_voice_duration, True, "创建儿童发音视频"),
+            ("cn", cn_pcm, cn_voice_duration, True, "创建每行中文视频"),
+            ("clips", voice_pcm, voice_duration, True, "创建每行发音视频"),
+            ("clips2", voice2_pcm, voice_duration, True, "创建每行发音视频2"),
+            ("empty", follow_pcm, voice_duration, False, "创建跟读视频"),
+        ]
 
-            #拼接音频“1s空白”和“内容”（美音）
-            voice_duration2 = 0
-            if os.path.exists(content_voice2):
-                empty = os.path.join(os.path.dirname(resource_filename(__name__,".")),'static', "empty1s.mp3")
-                merge_mp3_files(empty , content_voice2)
-                voice_duration2 = get_mp3_duration_tinytag(content_voice2)
-                print(f"voice_duration: {voice_duration2}")
-                if voice_duration2 is None:
-                    continue
-                if voice_duration2 <= 0:
-                    continue
+        # 每行音频按视频的实际时长截取或补静音后保存，时间线直接使用这些音频，不需要每行视频
+        for kind, pcm, duration, shortest, description in variants:
+            samples = int(round(duration * audio_pcm.SAMPLE_RATE))
+            line_pcm = pcm[:samples] if shortest else audio_pcm.fit(pcm, samples)
+            wav_path = os.path.join(workspace, f"{video_name}-{id_counter}-{kind}.wav")
+            audio_pcm.write_wav(line_pcm, wav_path)
+            outputs[f"audio:{kind}"] = wav_path
+
+        if not config.PER_LINE_CLIPS:
+            return outputs
+
+        still_track = None
+        if config.STILL_CLIP_CACHE:
+            # 截图只编码一次（按最长的时长），五种视频都从这条视频流复制
+            still_track = os.path.join(workspace, f"still{video_extension}")
+            encode_still_track(screenshot_path, max(v[2] for v in variants), still_track)
+
+        for kind, pcm, duration, shortest, description in variants:
+            clip_path = os.path.join(workspace, kind, clip_name)
+            os.makedirs(os.path.dirname(clip_path), exist_ok=True)
+            # 音频 PCM 通过标准输入直接送进复用命令
+            if still_track is not None:
+                command = mux_still_track_command(still_track, audio_pcm.input_args(), duration, clip_path, shortest)
             else:
-                logging.error(f"创建音频失败 {content_voice2}")
-                continue
-
-
-            #创建每行所需要的截图
-            end_seconds = timestamp_convert_to_seconds(info["et"])
-            # ffmpeg -y -i "C:\Users\luoruofeng\Desktop\test\视频片段\Lion King 2 1998-en@cn-3.mkv" -ss 5 -vframes 1 -vf scale=320:-1 -q:v 2 "C:\Users\luoruofeng\Desktop\test\视频片段\每行截图\Lion King 2 1998-en@cn-3-1.jpg"
-            command = [
-                "ffmpeg", "-y", "-i", video, "-ss", str(end_seconds-0.4), "-vframes", "1","-q:v", "2", screenshot_path
-            ]
-            logging.info(f"创建每行截图 video:{video} screenshot_path:{screenshot_path} command:{' '.join(command)}")
-            subprocess.run(command)
-
-            print(f"生成截图: {screenshot_path}")
-
-            # 带有有解释图片的截图
-
-            if explain_path is not None and screenshot_path is not None and os.path.exists(explain_path) and os.path.exists(screenshot_path):
-                logging.info(f"通过解释图片和截图生成带有有解释图片的截图: {explain_path}")
-                print(f"通过解释图片和截图生成带有有解释图片的截图: {explain_path} {screenshot_path}")
-                overlay_image(screenshot_path,explain_path)
-
-
-            #创建每行儿童发音视频
-            child_name = f"{video_name}-{id_counter}{video_extension}"
-            child_path = os.path.join(video_child_dir, child_name)
-
-            command = [
-                "ffmpeg", "-y", 
-                "-loop", "1", "-i", screenshot_path,  # 输入图片
-                "-i", child_voice,                  # 输入音频
-                "-c:v", "libx264",                    # 视频编码器
-                "-t",  str(child_voice_duration),        # 视频持续时间
-                "-pix_fmt", "yuv420p",                # 像素格式，确保兼容性
-                "-c:a", "aac",                        # 音频编码器
-                "-shortest",                          # 保证输出长度与最短流（音频或视频）匹配
-                child_path                             # 输出文件路径
-            ]
-
-            logging.info(f"创建儿童发音视频 child_path:{child_path} command:{' '.join(command)}")
-            subprocess.run(command)
-
-            print(f"生成视频片段: {child_path}")
-            # #添加大字体 “宝宝慢速” 到视频
-            # add_text_to_video(child_path,"宝宝慢速")
-            # logging.info(f"创建行视频-宝宝慢速 {child_path} {' '.join(command)}")
-            
-
-            #创建每行中文视频
-            cn_name = f"{video_name}-{id_counter}{video_extension}"
-            cn_path = os.path.join(video_cn_dir, cn_name)
-
-            command = [
-                "ffmpeg", "-y", 
-                "-loop", "1", "-i", screenshot_path,  # 输入图片
-                "-i", cn_voice,                  # 输入音频
-                "-c:v", "libx264",                    # 视频编码器
-                "-t",  str(cn_voice_duration),        # 视频持续时间
-                "-pix_fmt", "yuv420p",                # 像素格式，确保兼容性
-                "-c:a", "aac",                        # 音频编码器
-                "-shortest",                          # 保证输出长度与最短流（音频或视频）匹配
-                cn_path                             # 输出文件路径
-            ]
-
-            logging.info(f"创建每行中文视频: cn_path:{cn_path} command:{' '.join(command)}")
-            subprocess.run(command)
-            print(f"生成视频片段: {cn_path}")
-            # #添加 “中文” 到视频
-            # add_text_to_video(cn_path,"中文")
-            # logging.info(f"创建行视频-中文 {cn_path} {' '.join(command)}")
-
-
-
-            #创建每行发音视频
-            clip_name = f"{video_name}-{id_counter}{video_extension}"
-            clip_path = os.path.join(video_clips_dir, clip_name)
-
-            command = [
-                "ffmpeg", "-y", 
-                "-loop", "1", "-i", screenshot_path,  # 输入图片
-                "-i", content_voice,                  # 输入音频
-                "-c:v", "libx264",                    # 视频编码器
-                "-t",  str(voice_duration),        # 视频持续时间
-                "-pix_fmt", "yuv420p",                # 像素格式，确保兼容性
-                "-c:a", "aac",                        # 音频编码器
-                "-shortest",                          # 保证输出长度与最短流（音频或视频）匹配
-                clip_path                             # 输出文件路径
-            ]
-
-            logging.info(f"创建每行发音视频: clip_path:{clip_path} command:{' '.join(command)}")
-            subprocess.run(command)
+                command = [
+                    "ffmpeg", "-y", 
+                    "-loop", "1", "-i", screenshot_path,  # 输入图片
+                    *audio_pcm.input_args(),              # 输入音频
+                    *video_encode_args(tune="stillimage"),  # 视频编码器
+                    "-t",  str(duration),        # 视频持续时间
+                    *clip_spec.output_args(),             # 统一的片段格式
+                ]
+                if shortest:
+                    command.append("-shortest")  # 保证输出长度与最短流（音频或视频）匹配
+                command.append(clip_path)
+            logging.info(f"{description}: clip_path:{clip_path} command:{' '.join(command)}")
+            subprocess.run(command, input=pcm.tobytes(), check=True)
             print(f"生成视频片段: {clip_path}")
-            # #添加 “美音慢速” 到视频
-            # add_text_to_video(clip_path,"英音慢速")
-            # logging.info(f"创建行视频-英音慢速 {clip_path} {' '.join(command)}")
-
-
-            #创建每行发音视频2
-            clip_name = f"{video_name}-{id_counter}{video_extension}"
-            clip_path2 = os.path.join(video_clips_dir2, clip_name)
-
-            command = [
-                "ffmpeg", "-y", 
-                "-loop", "1", "-i", screenshot_path,  # 输入图片
-                "-i", content_voice2,                  # 输入音频
-                "-c:v", "libx264",                    # 视频编码器
-                "-t",  str(voice_duration),        # 视频持续时间
-                "-pix_fmt", "yuv420p",                # 像素格式，确保兼容性
-                "-c:a", "aac",                        # 音频编码器
-                "-shortest",                          # 保证输出长度与最短流（音频或视频）匹配
-                clip_path2                             # 输出文件路径
-            ]
-
-            print(f"执行命令 创建每行发音视频2: clip_path2:{clip_path2} command:{' '.join(command)}")
-            subprocess.run(command)
-
-            print(f"生成视频片段: {clip_path2}")
-            # #添加 “美音慢速” 到视频
-            # add_text_to_video(clip_path2,"美音慢速")
-            # logging.info(f"创建行视频-美音慢速 {clip_path2} {' '.join(command)}")
-            
-            
+            outputs[kind] = clip_path
 
-            #创建每行跟读视频
-            empty_name = f"{video_name}-{id_counter}{video_extension}"
-            empty_path = os.path.join(video_empty_dir, empty_name)
-            
-            follow = os.path.join(os.path.dirname(resource_filename(__name__,".")),'static', "follow.mp3")
-            
-            #计算跟读后的静音时长
-            # 获取音频时长
-            audio_duration = float(subprocess.check_output(
-                ["ffprobe", "-i", ding, "-show_entries", "format=duration", "-v", "quiet", "-of", "csv=p=0"]
-            ).strip())
-
-            silence_duration = max(0, voice_duration - audio_duration)
-
-            #填充静音并生成完整音频
-            silent_audio = "silent.wav"
-            combined_audio = "combined.wav"
-            if silence_duration > 0:
-                safe_remove(silent_audio, "删除音频")
-                subprocess.run([
-                    "ffmpeg", "-y",
-                    "-f", "lavfi", "-i", f"anullsrc=r=44100:cl=stereo",  # 生成静音
-                    "-t", str(silence_duration), silent_audio
-                ])
-                safe_remove(combined_audio, "删除音频")
-                subprocess.run([
-                    "ffmpeg", "-y",
-                    "-i", ding, "-i", silent_audio, 
-                    "-filter_complex", "[0:0][1:0]concat=n=2:v=0:a=1[out]", "-map", "[out]", combined_audio
-                ])
-                follow = combined_audio  # 更新音频路径
-
-
-
-            command = [
-                "ffmpeg", "-y", 
-                "-loop", "1", "-i", screenshot_path,  # 输入图片
-                "-i", follow,                  # 输入音频
-                "-c:v", "libx264",                    # 视频编码器
-                "-t",  str(voice_duration),        # 视频持续时间
-                "-pix_fmt", "yuv420p",                # 像素格式，确保兼容性
-                "-c:a", "aac",                        # 音频编码器
-                empty_path                             # 输出文件路径
-            ]
-
-            print(f"创建跟读视频: empty_path:{empty_path} command:{' '.join(command)}")
-            subprocess.run(command)
-            print(f"生成视频 {empty_path}")
-            # #添加 “跟读” 到视频
-            # add_text_to_video(empty_path,"跟读")
-            # logging.info(f"创建行视频-跟读 {empty_path} {' '.join(command)}")
-
-            #删除句子朗读
-            safe_remove(content_voice, "生成视频片段")
-            safe_remove(content_voice2, "删除音频")
-            safe_remove(cn_voice, "删除音频")
-            safe_remove(child_voice, "删除音频")
-            safe_remove(child_voice, "删除音频")
-            safe_remove(combined_audio, "删除音频")
-            safe_remove(silent_audio, "删除音频")
-            
\ No newline at end of file
+        return outputs
@@ -2,10 +2,10 @@ import os
 import subprocess
 import traceback
 import re
-import torch
-from movie_opt.commands.ai import LaunageAI
 from movie_opt.config import LOCAL_MODEL_NAME, FILTER_COUNT, REMOTE_MODEL_NAME
 from movie_opt.utils import *
+from movie_opt.encoder import video_encode_args
+from movie_opt.chunked_encode import encode_chunked
 import shutil
 from datetime import timedelta
 from movie_opt.qwen_utils import QwenPlusAssistant
@@ -14,6 +14,10 @@ import srt
 from datetime import timedelta
 import chardet
 from enum import Enum
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    # 只用于类型标注，ai 模块在第一次使用大模型时才导入（见 movie_opt.handle.LazyProxy）
+    from movie_opt.commands.ai import LaunageAI
 
 
 class PUNCTUATION_MARK(Enum):
@@ -379,6 +383,21 @@ class SubtitleOperater:
         if args.avg_en_word_count is not None and args.avg_en_word_count > 0:
             filter_count = args.avg_en_word_count
         
+        # 需要打分的中英文配对，所有行同时提问（同时发给本地模型的请求数由 LLM_CLIENT 限制）
+        pending = []
+        for i in range(0, len(dialogue_lines) - 1, 2):
+            ch_line = dialogue_lines[i]
+            en_line = dialogue_lines[i + 1]
+            if 'Chinese' in ch_line and 'English' in en_line:
+                ch_text = ch_line.split(',', 9)[-1].strip()
+                en_text = en_line.split(',', 9)[-1].strip()
+                if count_set_en_word(en_text) >= filter_count:
+                    pending.append((i, ch_text, en_text))
+        line_scores = dict(zip(
+            (i for i, _, _ in pending),
+            self.launageAI.score_lines([(ch_text, en_text) for _, ch_text, en_text in pending])
+        ))
+
         for i in range(0, len(dialogue_lines) - 1, 2):
             ch_line = dialogue_lines[i]
             en_line = dialogue_lines[i + 1]
@@ -392,16 +411,15 @@ class SubtitleOperater:
                 print(f"English: {en_text}")
 
                 try:
-                    set_word_count = count_set_en_word(en_text)
                     # 若该行字幕少于filter_count个字符不生成跟读视频
-                    if set_word_count < filter_count:
+                    if i not in line_scores:
                         print(f"英文字幕数少于{filter_count}个字符不生成跟读视频 {en_text}")
                         modified_dialogues.append(ch_line)
                         modified_dialogues.append(en_line)
                         continue
 
 
-                    most_hard_word_score = self.launageAI.get_hard_word_scores(ch_text,en_text)
+                    most_hard_word_score = line_scores[i]
                     if most_hard_word_score is not None and len(most_hard_word_score) > 0:
                         for word, score in most_hard_word_score.items():
                             if word in en_text:
@@ -487,34 +505,22 @@ class SubtitleOperater:
         video_extension = os.path.splitext(video_path)[1]
         output_path = os.path.join(path, f"subtitle_{video_name}")
 
-        # 将路径标准化为相对路径
-        relative_ass_path = os.path.relpath(ass_path, start=path)
-        relative_video_path = os.path.relpath(video_path, start=path)
-        relative_output_path = os.path.relpath(output_path, start=path)
-        
-        if torch.cuda.is_available():
-            video_codec = "h264_nvenc"
-        else:
-            video_codec = "libx264"
-
-        command = [
-            'ffmpeg',
-            '-i', relative_video_path,         # 输入视频文件
-            '-vf', f"ass={relative_ass_path}",  # 应用字幕滤镜
-            '-c:v', video_codec,                 # 对视频流重新编码
-            '-preset', 'p1',             # 快速编码
-            '-map', '0:v:0',                   # 只保留第一个视频流 (Stream #0:0)
-            '-map', '0:a:0',                   # 只保留第一个音频流 (Stream #0:1，英语)
-            '-c:a', 'aac',                     # 使用AAC编码器重新编码音频
-            '-b:a', '192k',                    # 设置音频比特率 (例如 192k)
-            '-ac', '2',                        # 设置输出音频为立体声（可选，根据需要调整）
-            '-map_metadata', '-1',             # 清除全局元信息
-            '-movflags', 'use_metadata_tags',  # 确保写入新的元信息
-            relative_output_path             # 输出文件路径
-        ]
-
+        # 整部视频分段并行编码，每一段的字幕按段开头平移后烧录
         try:
-            subprocess.run(command, check=True, cwd=path)  # 指定 cwd 为 path，确保相对路径正确
+            encode_chunked(
+                video_path,
+                output_path,
+                video_filter=lambda start, duration, workspace: burn_subtitle_filter(ass_path, start, duration, workspace),
+                audio_args=[
+                    '-c:a', 'aac',                     # 使用AAC编码器重新编码音频
+                    '-b:a', '192k',                    # 设置音频比特率 (例如 192k)
+                    '-ac', '2',                        # 设置输出音频为立体声（可选，根据需要调整）
+                ],
+                extra_args=[
+                    '-map_metadata', '-1',             # 清除全局元信息
+                    '-movflags', 'use_metadata_tags',  # 确保写入新的元信息
+                ],
+            )
             print(f"已为视频 {video_name} 添加字幕，保存为 {output_path}")
         except subprocess.CalledProcessError as e:
             print(f"添加字幕失败: {e}")
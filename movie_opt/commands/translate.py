@@ -1,6 +1,5 @@
 import sqlite3
 import json
-from google.cloud import translate_v2 as translate
 import os
 
 def google_translate_demo(text, target_language="zh"):
@@ -14,6 +13,8 @@ def google_translate_demo(text, target_language="zh"):
     Returns:
         str: Translated text.
     """
+    from google.cloud import translate_v2 as translate
+
     # Initialize the Google Translate client
     translate_client = translate.Client()
 
@@ -1,17 +1,17 @@
 import os
 import time
 import traceback
-import torch
-from pydub import AudioSegment
 import requests
-from TTS.api import TTS
 from pkg_resources import resource_filename
-from gtts import gTTS
 import asyncio
 import logging
 import edge_tts
 
-from movie_opt.commands.ai import LaunageAI
+from movie_opt.utils import cuda_available
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    # 只用于类型标注，ai 模块在第一次使用大模型时才导入（见 movie_opt.handle.LazyProxy）
+    from movie_opt.commands.ai import LaunageAI
 
 
 def change_4_edge_tts_voice(content):
@@ -38,7 +38,11 @@ def change_4_edge_tts_voice(content):
 class VoiceOperater:
     def __init__(self,launageAI):
         self.launageAI:LaunageAI = launageAI
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+
+    @property
+    def device(self):
+        # 只有克隆声音才需要，避免初始化时导入 torch
+        return "cuda" if cuda_available() else "cpu"
 
 
     def edge_tts_voice(self, args):
@@ -132,6 +136,8 @@ class VoiceOperater:
         if not content:
             raise ValueError("Content cannot be empty")
 
+        from gtts import gTTS
+
         # 调用 gTTS 进行语音合成
         try:
             tts = gTTS(text=content, lang=language, slow=slow)
@@ -195,6 +201,9 @@ class VoiceOperater:
 
         language = args.language
 
+        from TTS.api import TTS
+        from pydub import AudioSegment
+
         # Initialize TTS model
         print("Initializing TTS model...")
         tts = TTS("tts_models/multilingual/multi-dataset/xtts_v2").to(self.device)
@@ -215,6 +224,9 @@ class VoiceOperater:
 
 
     def clone_voice_conversion(self,args):
+        from TTS.api import TTS
+        from pydub import AudioSegment
+
         # Initialize TTS model
         print("Initializing TTS model...")
         tts = TTS(model_name="voice_conversion_models/multilingual/vctk/freevc24",progress_bar=False).to(self.device)
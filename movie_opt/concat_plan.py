@@ -0,0 +1,57 @@
+from collections import Counter, defaultdict
+
+
+def plan_shared_runs(sequences, min_clips=2):
+    """
+    找出多个拼接列表中共同的连续片段（例如“磨耳朵”和“无儿童磨耳朵”中每一行的 发音视频+发音视频2），
+    每个共同的连续片段只拼接一次，各个列表再由这些中间结果和剩下的单个片段拼接。
+
+    相邻两个片段在所有列表中出现的位置（列表名的多重集合）相同时连在一起，
+    连起来的片段至少 min_clips 个并且出现不止一次才作为共同片段。
+
+    :param sequences: {输出名: [片段路径, ...]}
+    :param min_clips: 共同片段最少包含的片段数，小于 2 时不合并任何片段
+    :return: (共同片段列表 [(片段路径, ...), ...], {输出名: [("clip", 片段路径) 或 ("run", 共同片段序号), ...]})
+    """
+    # 每一对相邻片段出现在哪些列表中
+    pair_places = defaultdict(list)
+    for name, items in sequences.items():
+        for pair in zip(items, items[1:]):
+            pair_places[pair].append(name)
+    signatures = {pair: tuple(sorted(names)) for pair, names in pair_places.items()}
+
+    chunked = {}
+    for name, items in sequences.items():
+        chunks = []
+        current = []
+        previous_signature = None
+        for index, item in enumerate(items):
+            if current:
+                signature = signatures[(items[index - 1], item)]
+                if len(signature) >= 2 and (len(current) == 1 or signature == previous_signature):
+                    current.append(item)
+                    previous_signature = signature
+                    continue
+                chunks.append(tuple(current))
+            current = [item]
+            previous_signature = None
+        if current:
+            chunks.append(tuple(current))
+        chunked[name] = chunks
+
+    counts = Counter(chunk for chunks in chunked.values() for chunk in chunks)
+    runs = []
+    run_index = {}
+    plans = {}
+    for name, chunks in chunked.items():
+        plan = []
+        for chunk in chunks:
+            if min_clips >= 2 and len(chunk) >= min_clips and counts[chunk] >= 2:
+                if chunk not in run_index:
+                    run_index[chunk] = len(runs)
+                    runs.append(chunk)
+                plan.append(("run", run_index[chunk]))
+            else:
+                plan.extend(("clip", item) for item in chunk)
+        plans[name] = plan
+    return runs, plans
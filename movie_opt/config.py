@@ -1,4 +1,5 @@
 # config.py
+import os
 
 # The local model name for the AI.使用的本地ai模型
 LOCAL_MODEL_NAME = "qwen2.5:14b"
@@ -15,5 +16,130 @@ FILTER_COUNT = 11
 #过滤超过了平均长度+FILTER_MORE_COUNT单词数量的字幕
 FILTER_MORE_COUNT = 4
 
+# 一行字幕的所有难词是否一次提问打分（JSON 回答），False 时每个单词单独提问（最多五次）
+HARD_WORD_BATCH_SCORING = True
+
+# 提问大模型之前用本地词库（movie_opt/db 中的 english_data.db 和 common_words.txt）预筛选难词：
+# 整行都是常用词时不提问，大模型找出的难词中的常用词不打分
+LEXICAL_PREFILTER = True
+
+# english_data.db 中词频排名（frq/bnc）在前多少名的单词当作常用词
+LEXICAL_COMMON_RANK = 2000
+
+# 本地 Ollama 服务地址
+LLM_LOCAL_URL = "http://localhost:11434"
+
+# 同时发给本地 Ollama 的请求数上限（与 Ollama 的 OLLAMA_NUM_PARALLEL 一致），超过的请求按优先级排队
+LLM_MAX_IN_FLIGHT = 4
+
+# 请求本地 Ollama 的超时秒数
+LLM_TIMEOUT = 300
+
+# 给字幕行打分（change_ass_hard_word_style、split_video）时同时处理的行数
+LLM_LINE_WORKERS = 8
+
 # The number of composite images to generate.生成图片数量
-COMPOSITE_IMAGE_COUNT = 111
\ No newline at end of file
+COMPOSITE_IMAGE_COUNT = 111
+
+# 封面图片的尺寸（宽, 高），每张封面由3张截图从上到下拼接
+COVER_IMAGE_SIZE = (1080, 1920)
+
+# 合成封面的进程数，None 为 CPU 核数
+COVER_WORKERS = None
+
+# 每行完整视频是否整条时间线只编码一次，再用segment复用器切成每行片段
+COMPLETE_VIDEO_SINGLE_PASS = True
+
+# 每行完整视频的最短片段秒数，保证切点严格递增
+COMPLETE_VIDEO_MIN_PIECE_SECOND = 0.05
+
+# 每行分段视频是否一个ffmpeg进程批量生成（一次解码，多路输出）
+FRAGMENT_VIDEO_BATCH = True
+
+# 每行分段视频每个ffmpeg进程最多输出的片段数
+FRAGMENT_BATCH_SIZE = 64
+
+# 本地缓存文件夹（媒体信息、编码器能力、大模型回答等），可以通过环境变量 MOVIE_OPT_CACHE_DIR 修改
+CACHE_DIR = os.environ.get("MOVIE_OPT_CACHE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "movie_opt")
+
+# 大模型（Ollama、DashScope）的回答是否缓存到 CACHE_DIR/llm_cache.db，重新运行时相同的提问直接使用缓存
+LLM_CACHE_ENABLED = True
+
+# 大模型回答缓存的有效天数，0 为永久有效
+LLM_CACHE_TTL_DAYS = 90
+
+# 大模型回答缓存最多保存的条数，超过时删除最久没有使用的回答，0 为不限制
+LLM_CACHE_MAX_ENTRIES = 200000
+
+
+# split_video 同时生成多少行的每行视频，1 为逐行生成
+SPLIT_VIDEO_WORKERS = 1
+
+# 每行截图一次性批量生成（一个 ffmpeg 进程解码一次），False 时每一行单独截图
+SCREENSHOT_BATCH = True
+
+# 每行的五种视频是否共用一条只编码一次的静态画面视频流
+STILL_CLIP_CACHE = True
+
+# 静态画面视频的帧率
+STILL_CLIP_FPS = 5
+
+# 视频编码配置，所有重新编码视频的 ffmpeg 命令都通过 movie_opt.encoder.video_encode_args 使用
+# preset/crf/threads/tune 是 libx264 的参数，nvenc_preset/nvenc_cq 是 h264_nvenc 的参数
+# hardware 为 True 时，如果机器上 h264_nvenc 可用就使用 nvenc
+ENCODER_PROFILES = {
+    # 预览、调试用，速度最快
+    "draft": {"preset": "ultrafast", "crf": 28, "threads": 0, "tune": None, "nvenc_preset": "p1", "nvenc_cq": 30, "hardware": True},
+    # 默认
+    "fast": {"preset": "veryfast", "crf": 23, "threads": 0, "tune": None, "nvenc_preset": "p4", "nvenc_cq": 23, "hardware": True},
+    # 最终成片，画质优先，只用 libx264
+    "archive": {"preset": "slow", "crf": 18, "threads": 0, "tune": None, "nvenc_preset": "p7", "nvenc_cq": 19, "hardware": False},
+}
+
+# 默认使用的编码配置，可以通过环境变量 MOVIE_OPT_ENCODER_PROFILE 修改
+ENCODER_PROFILE = os.environ.get("MOVIE_OPT_ENCODER_PROFILE") or "fast"
+
+
+# picture video_segment 同时截取的片段数量
+SEGMENT_WORKERS = 2
+
+# picture video_segment 默认是否使用智能剪切（只重新编码片段开头到下一个关键帧）
+SEGMENT_SMART_CUT = False
+
+# split_video 是否生成每行的中文/儿童发音/发音/发音2/跟读视频以及每行分段/完整视频（默认生成，与以前相同）
+# 改为 False 时只生成每行截图、解释图、每行音频和时间线文件（{视频名}-timeline.json），合并视频由 movie_opt.timeline 一次编码生成
+PER_LINE_CLIPS = True
+
+# merge1 存在时间线文件时是否用时间线一次生成合并视频（False 时拼接每行视频）
+TIMELINE_RENDER = True
+
+# 时间线每个 ffmpeg 进程最多处理的内容数（输入太多时分成几段编码，再直接复制拼接）
+TIMELINE_CHUNK_PIECES = 120
+
+# 拼接每行视频需要重新编码时，几种合并视频共同的连续片段（至少这么多个片段）先复制拼接一次作为中间结果，0 为不合并（直接复制拼接时不生成中间结果）
+MERGE_SHARED_RUN_MIN_CLIPS = 2
+
+# 只生成音频的合并视频（例如磨耳朵 mp3）的默认格式和编码参数，音频直接由时间线拼接，不编码视频
+LESSON_AUDIO_FORMAT = "mp3"
+LESSON_AUDIO_CODECS = {
+    "mp3": ["-c:a", "libmp3lame", "-q:a", "2"],
+    "opus": ["-c:a", "libopus", "-b:a", "64k"],
+}
+
+# custom1/custom3 不生成整部带字幕的 subtitle_ 视频，截取视频片段时同时烧录 ass 字幕（每一帧只编码一次）
+FUSED_SUBTITLE = True
+
+# 整部视频重新编码（addass、crop_to_portrait、resize_video）时是否在关键帧处分段，多个 ffmpeg 进程同时编码
+CHUNKED_ENCODE = True
+
+# 分段编码每一段的大约秒数
+CHUNK_ENCODE_SECONDS = 60
+
+# 分段编码同时编码的段数，None 为 CPU 核数的四分之一
+CHUNK_ENCODE_WORKERS = None
+
+# 批量转换横屏/竖屏视频时同时运行的编码 ffmpeg 进程数（全局预算），None 为 CPU 核数的四分之一
+ENCODER_SLOTS = None
+
+# 竖屏（手机）视频的分辨率
+PHONE_RESOLUTION = (720, 1280)
@@ -0,0 +1,244 @@
+import json
+import logging
+import os
+import shutil
+import subprocess
+import threading
+
+from movie_opt import config
+from movie_opt.config import CACHE_DIR
+
+
+# ffmpeg 能力的磁盘缓存
+CAPABILITIES_PATH = os.path.join(CACHE_DIR, "encoder_capabilities.json")
+
+_capabilities = None
+_lock = threading.Lock()
+
+
+def _ffmpeg_key():
+    # ffmpeg 可执行文件换了（升级、换路径）之后重新探测
+    path = shutil.which("ffmpeg") or "ffmpeg"
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except OSError:
+        mtime_ns = 0
+    return f"{path}:{mtime_ns}"
+
+
+def _run(command):
+    result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, encoding="utf-8", errors="ignore")
+    return result.returncode, result.stdout
+
+
+def _parse_encoders(output):
+    """解析 ffmpeg -encoders 的输出，返回编码器名称列表"""
+    encoders = []
+    started = False
+    for line in output.splitlines():
+        if line.strip().startswith("------"):
+            started = True
+            continue
+        parts = line.split()
+        if started and len(parts) >= 2:
+            encoders.append(parts[1])
+    return encoders
+
+
+def _parse_hwaccels(output):
+    """解析 ffmpeg -hwaccels 的输出，返回硬件加速方式列表"""
+    lines = [line.strip() for line in output.splitlines() if line.strip()]
+    if lines and lines[0].lower().startswith("hardware acceleration methods"):
+        lines = lines[1:]
+    return lines
+
+
+def _nvenc_works():
+    # 编译进 ffmpeg 不代表有可用的显卡，实际编码几帧确认
+    returncode, _ = _run([
+        "ffmpeg", "-hide_banner", "-v", "error",
+        "-f", "lavfi", "-i", "color=c=black:s=256x256:d=0.2",
+        "-c:v", "h264_nvenc", "-f", "null", "-"
+    ])
+    return returncode == 0
+
+
+def probe_capabilities():
+    """
+    探测 ffmpeg 支持的编码器和硬件加速方式。
+
+    每台机器只探测一次，结果保存在 CAPABILITIES_PATH，ffmpeg 可执行文件变化后重新探测。
+
+    :return: {"ffmpeg", "encoders", "hwaccels", "nvenc"}
+    """
+    global _capabilities
+    with _lock:
+        if _capabilities is not None:
+            return _capabilities
+
+        key = _ffmpeg_key()
+        try:
+            with open(CAPABILITIES_PATH, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+            if cached.get("ffmpeg") == key:
+                _capabilities = cached
+                return _capabilities
+        except (OSError, ValueError):
+            pass
+
+        _, encoders_output = _run(["ffmpeg", "-hide_banner", "-encoders"])
+        _, hwaccels_output = _run(["ffmpeg", "-hide_banner", "-hwaccels"])
+        encoders = _parse_encoders(encoders_output)
+        capabilities = {
+            "ffmpeg": key,
+            "encoders": encoders,
+            "hwaccels": _parse_hwaccels(hwaccels_output),
+            "nvenc": "h264_nvenc" in encoders and _nvenc_works(),
+        }
+        logging.info(f"探测ffmpeg编码能力: nvenc:{capabilities['nvenc']} hwaccels:{capabilities['hwaccels']}")
+        try:
+            os.makedirs(os.path.dirname(CAPABILITIES_PATH), exist_ok=True)
+            with open(CAPABILITIES_PATH, "w", encoding="utf-8") as f:
+                json.dump(capabilities, f, ensure_ascii=False)
+        except OSError as e:
+            logging.error(f"保存ffmpeg编码能力缓存失败: {e}")
+        _capabilities = capabilities
+        return _capabilities
+
+
+def get_profile(profile=None):
+    """返回编码配置（config.ENCODER_PROFILES 中的一项），profile 为 None 时使用 config.ENCODER_PROFILE"""
+    name = profile or config.ENCODER_PROFILE
+    if name not in config.ENCODER_PROFILES:
+        raise ValueError(f"不存在的编码配置: {name}，可选: {', '.join(config.ENCODER_PROFILES)}")
+    return config.ENCODER_PROFILES[name]
+
+
+def use_nvenc(profile=None):
+    """这个编码配置是否使用 h264_nvenc"""
+    return get_profile(profile)["hardware"] and probe_capabilities()["nvenc"]
+
+
+def video_codec(profile=None):
+    return "h264_nvenc" if use_nvenc(profile) else "libx264"
+
+
+def video_encode_args(profile=None, tune=None, threads=None):
+    """
+    视频编码参数，例如 ["-c:v", "libx264", "-preset", "veryfast", "-crf", "23", "-threads", "0"]。
+
+    :param profile: 编码配置名称（draft/fast/archive），None 使用 config.ENCODER_PROFILE
+    :param tune: 覆盖配置中的 x264 tune（例如 "stillimage"），nvenc 忽略
+    :param threads: 覆盖配置中的 x264 线程数（几个编码进程同时运行时平分 CPU），nvenc 忽略
+    """
+    settings = get_profile(profile)
+    if use_nvenc(profile):
+        return ["-c:v", "h264_nvenc", "-preset", settings["nvenc_preset"], "-cq", str(settings["nvenc_cq"])]
+
+    threads = threads if threads is not None else settings["threads"]
+    args = ["-c:v", "libx264", "-preset", settings["preset"], "-crf", str(settings["crf"]), "-threads", str(threads)]
+    tune = tune or settings.get("tune")
+    if tune:
+        args.extend(["-tune", tune])
+    return args
+
+
+# 智能剪切时开头部分可以按原视频重新编码的 h264 profile：ffprobe 的 profile 名 -> libx264 的 -profile:v
+SMART_CUT_PROFILES = {"Constrained Baseline": "baseline", "Baseline": "baseline", "Main": "main", "High": "high"}
+
+# 智能剪切支持的像素格式（libx264 8 位 4:2:0）
+SMART_CUT_PIX_FMTS = ("yuv420p", "yuvj420p")
+
+
+def smart_cut_head_args(info, profile=None):
+    """
+    智能剪切中重新编码开头部分（start 到下一个关键帧）的编码参数。
+
+    只用 libx264，profile、level、像素格式与原视频一致；nvenc 不能指定这些参数，所以不使用。
+    原视频不是 h264、profile 是 High 10/4:2:2/4:4:4、像素格式不是 8 位 4:2:0、隔行扫描或者 level 未知时无法匹配。
+
+    :param info: 原视频的 MediaInfo
+    :param profile: 编码配置名称（draft/fast/archive），None 使用 config.ENCODER_PROFILE
+    :return: (编码参数, None)，无法匹配时 (None, 原因)，调用方退回到整段重新编码
+    """
+    if info.video_codec != "h264":
+        return None, f"原视频不是h264（{info.video_codec}）"
+    x264_profile = SMART_CUT_PROFILES.get(info.video_profile)
+    if x264_profile is None:
+        return None, f"不支持的h264 profile（{info.video_profile}）"
+    if info.pix_fmt not in SMART_CUT_PIX_FMTS:
+        return None, f"不支持的像素格式（{info.pix_fmt}）"
+    if info.field_order not in (None, "unknown", "progressive"):
+        return None, f"隔行扫描视频（{info.field_order}）"
+    if info.video_level is None or info.video_level < 10:
+        return None, f"无法匹配的h264 level（{info.video_level}）"
+
+    settings = get_profile(profile)
+    return [
+        "-c:v", "libx264", "-preset", settings["preset"], "-crf", str(settings["crf"]), "-threads", str(settings["threads"]),
+        "-profile:v", x264_profile,
+        "-level:v", f"{info.video_level / 10:.1f}",
+        "-pix_fmt", info.pix_fmt,
+    ], None
+
+
+def smart_cut_keyframe(keyframes, start_seconds, end_seconds):
+    """
+    智能剪切从哪个关键帧开始流复制：start 之后（包括 start）的第一个关键帧，
+    片段内没有关键帧时返回 None（只能整段重新编码）。
+    """
+    keyframe = next((t for t in keyframes if t >= start_seconds - 0.001), None)
+    if keyframe is None or keyframe >= end_seconds:
+        return None
+    return keyframe
+
+
+# 智能剪切复制部分的 -ss 比关键帧晚的秒数：输入端 -ss 配合 -c copy 从 -ss 之前（包括）最近的关键帧开始复制，
+# 稍微晚一点保证落在这个关键帧上，不会因为时间的舍入落到上一个 GOP（必须小于一帧的时长）
+SMART_CUT_SEEK_EPSILON = 0.0005
+
+
+def smart_cut_parts(keyframe, start_seconds, end_seconds):
+    """
+    智能剪切的两部分：开头 [start, keyframe) 重新编码，其余 [keyframe, end) 从关键帧开始复制。
+
+    :return: {"head": (-ss, -t) 或 None（start 就是关键帧）, "tail": (-ss, -t)}，时间都是秒
+    """
+    head = None
+    if keyframe - start_seconds > 0.001:
+        head = (start_seconds, keyframe - start_seconds)
+    # -t 从实际开始复制的关键帧算起
+    tail = (keyframe + SMART_CUT_SEEK_EPSILON, end_seconds - keyframe)
+    return {"head": head, "tail": tail}
+
+
+def hwaccel_args(profile=None):
+    """解码使用 CUDA 并把画面留在显存中（配合 scale_cuda 等滤镜），不可用时返回 []"""
+    if use_nvenc(profile) and "cuda" in probe_capabilities()["hwaccels"]:
+        return ["-hwaccel", "cuda", "-hwaccel_output_format", "cuda"]
+    return []
+
+
+_encode_slots = None
+
+
+def encode_slots():
+    """
+    全局编码预算：批量处理时所有线程共用的信号量，同时运行的编码 ffmpeg 进程不超过 config.ENCODER_SLOTS 个。
+
+    用法: with encode_slots(): subprocess.run(...)
+    """
+    global _encode_slots
+    with _lock:
+        if _encode_slots is None:
+            _encode_slots = threading.BoundedSemaphore(encoder_slot_count())
+        return _encode_slots
+
+
+def encoder_slot_count():
+    return config.ENCODER_SLOTS or max(1, (os.cpu_count() or 1) // 4)
+
+
+def threads_per_encoder(workers):
+    """workers 个 x264 进程同时运行时每个进程使用的线程数"""
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
@@ -1,14 +1,66 @@
-from movie_opt.commands.ai import LaunageAI
-from movie_opt.commands.subtitle import SubtitleOperater
-from movie_opt.commands.picture import PictureOperater
-from movie_opt.commands.voice import VoiceOperater 
-from movie_opt.commands.merge import MergeOperater 
+class LazyProxy:
+    """
+    LaunageAI、VoiceOperater 等的代理：第一次调用它的方法时才导入对应的模块并创建对象，
+    只用到 srt2ass、merge、create 等不需要大模型或配音的子命令时不会导入 ai、voice。
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+
+    def __getattr__(self, name):
+        return getattr(self._factory(), name)
+
 
 class Executor:
+    """
+    各个 Operater 的容器。
+
+    Operater 在第一次使用时才创建（同时才导入对应的模块），
+    这样只用到 translate、subtitle 等轻量命令时不会导入 torch、TTS、cv2、dashscope。
+    """
+
     def __init__(self):
         print(f"初始化Executor\n{'-'*22}")
-        self.launageAI:LaunageAI = LaunageAI()
-        self.voiceOperater:VoiceOperater = VoiceOperater(self.launageAI)
-        self.subtitleOperater:SubtitleOperater = SubtitleOperater(self.launageAI)
-        self.pictureOperater:PictureOperater = PictureOperater(self.launageAI,self.voiceOperater)
-        self.mergeOperater:MergeOperater = MergeOperater(self.launageAI)
\ No newline at end of file
+        self._launageAI = None
+        # 传给各个 Operater 的是代理，Operater 创建时不初始化 LaunageAI、VoiceOperater
+        self._lazyLaunageAI = LazyProxy(lambda: self.launageAI)
+        self._lazyVoiceOperater = LazyProxy(lambda: self.voiceOperater)
+        self._voiceOperater = None
+        self._subtitleOperater = None
+        self._pictureOperater = None
+        self._mergeOperater = None
+
+    @property
+    def launageAI(self):
+        if self._launageAI is None:
+            from movie_opt.commands.ai import LaunageAI
+            self._launageAI = LaunageAI()
+        return self._launageAI
+
+    @property
+    def voiceOperater(self):
+        if self._voiceOperater is None:
+            from movie_opt.commands.voice import VoiceOperater
+            self._voiceOperater = VoiceOperater(self._lazyLaunageAI)
+        return self._voiceOperater
+
+    @property
+    def subtitleOperater(self):
+        if self._subtitleOperater is None:
+            from movie_opt.commands.subtitle import SubtitleOperater
+            self._subtitleOperater = SubtitleOperater(self._lazyLaunageAI)
+        return self._subtitleOperater
+
+    @property
+    def pictureOperater(self):
+        if self._pictureOperater is None:
+            from movie_opt.commands.picture import PictureOperater
+            self._pictureOperater = PictureOperater(self._lazyLaunageAI, self._lazyVoiceOperater)
+        return self._pictureOperater
+
+    @property
+    def mergeOperater(self):
+        if self._mergeOperater is None:
+            from movie_opt.commands.merge import MergeOperater
+            self._mergeOperater = MergeOperater(self._lazyLaunageAI)
+        return self._mergeOperater
@@ -0,0 +1,344 @@
+import logging
+import os
+import re
+import sqlite3
+import threading
+
+from movie_opt import config
+
+
+# 随包发布的词库文件夹（translate.find_db_word 使用同一个 english_data.db）
+DB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "db")
+ENGLISH_DB_PATH = os.path.join(DB_DIR, "english_data.db")
+COMMON_WORDS_PATH = os.path.join(DB_DIR, "common_words.txt")
+
+# 英文单词（包括 don't、John's 这类带撇号的单词）
+TOKEN_PATTERN = re.compile(r"[A-Za-z]+(?:['’][A-Za-z]+)*")
+
+# 两个单词之间出现这些符号时，后一个单词是句子（或对白）的开头
+SENTENCE_BREAK = re.compile(r"[.!?…:;\"“”\-—\n]")
+
+# 不规则变形：变形 -> 原形
+IRREGULAR_FORMS = dict(pair.split(":") for pair in """
+am:be is:be are:be was:be were:be been:be being:be has:have had:have did:do done:do does:do
+went:go gone:go goes:go saw:see seen:see took:take taken:take said:say made:make got:get gotten:get
+knew:know known:know thought:think came:come gave:give given:give found:find told:tell felt:feel
+left:leave kept:keep brought:bring bought:buy caught:catch taught:teach fought:fight began:begin
+begun:begin ran:run sat:sit stood:stand understood:understand wrote:write written:write spoke:speak
+spoken:speak broke:break chose:choose chosen:choose drove:drive driven:drive ate:eat eaten:eat
+fell:fall fallen:fall forgot:forget forgotten:forget forgave:forgive forgiven:forgive held:hold
+heard:hear hid:hide hidden:hide hung:hang led:lead lost:lose meant:mean met:meet paid:pay rode:ride
+ridden:ride rang:ring rung:ring rose:rise risen:rise sang:sing sung:sing sent:send shook:shake
+shot:shoot shown:show slept:sleep sold:sell spent:spend stole:steal stolen:steal swam:swim
+threw:throw thrown:throw wore:wear worn:wear won:win woke:wake woken:wake drank:drink drunk:drink
+flew:fly flown:fly grew:grow grown:grow built:build drew:draw drawn:draw froze:freeze frozen:freeze
+became:become bit:bite bitten:bite blew:blow blown:blow hit:hit hurt:hurt put:put cut:cut shut:shut
+fed:feed laid:lay stuck:stick tore:tear torn:tear bore:bear
+men:man women:woman children:child feet:foot teeth:tooth mice:mouse wives:wife knives:knife lives:life
+better:good best:good worse:bad worst:bad
+""".split())
+
+# 简单过去式不规则的动词：它们的 -ed 形式不是变形（例如 singed 不是 sing 的过去式）
+IRREGULAR_PAST_VERBS = frozenset("""
+be have do go see take say make get know think come give find tell feel leave keep bring buy catch teach
+fight begin run sit stand understand write speak break choose drive eat fall forget forgive hold hear hide
+hang lead lose mean meet pay ride ring rise sing send shake shoot sleep sell spend steal swim throw wear
+win wake drink fly grow build draw freeze become bite blow hit hurt put cut shut feed lay let set read
+bear beat stick tear cost
+""".split())
+
+# 规则变形：(后缀, 还原时替换成的内容, 原形需要的词性)，按顺序尝试
+# 词性 "noun_verb"：名词复数或动词第三人称，原形是任何常用词；"verb"：原形是 [verbs] 中的动词；
+# "past"：原形是 [verbs] 中过去式规则的动词；"adjective"：原形是 [adjectives] 中的形容词
+SUFFIX_RULES = (
+    ("ies", "y", "noun_verb"), ("ves", "f", "noun_verb"), ("ves", "fe", "noun_verb"),
+    ("es", "", "noun_verb"), ("s", "", "noun_verb"),
+    ("ied", "y", "past"), ("ed", "", "past"), ("ed", "e", "past"),
+    ("ing", "", "verb"), ("ing", "e", "verb"),
+    ("ier", "y", "adjective"), ("iest", "y", "adjective"), ("ily", "y", "adjective"),
+    ("er", "", "adjective"), ("er", "e", "adjective"), ("est", "", "adjective"), ("est", "e", "adjective"),
+    ("ly", "", "adjective"), ("ness", "", "adjective"),
+)
+
+
+def tokenize(en_text):
+    """
+    拆分英文句子。
+
+    :return: [(单词, 是否在句子开头), ...]
+    """
+    tokens = []
+    last_end = None
+    for match in TOKEN_PATTERN.finditer(en_text):
+        sentence_start = last_end is None or SENTENCE_BREAK.search(en_text[last_end:match.start()]) is not None
+        tokens.append((match.group(0).replace("’", "'"), sentence_start))
+        last_end = match.end()
+    return tokens
+
+
+def looks_like_name(token, sentence_start):
+    """句子中间首字母大写的单词（不是 I、I'm 这类，也不是全部大写的喊叫）大概率是人名、地名"""
+    if sentence_start or not token[0].isupper():
+        return False
+    base = token.split("'")[0]
+    return base != "I" and not base.isupper()
+
+
+def inflection_candidates(word):
+    """
+    按规则变形还原的原形，不检查原形是否存在。
+
+    :return: [(原形, 原形需要的词性), ...]，词性见 SUFFIX_RULES
+    """
+    candidates = []
+    for suffix, replacement, pos in SUFFIX_RULES:
+        if len(word) > len(suffix) + 1 and word.endswith(suffix):
+            stem = word[:-len(suffix)]
+            if suffix == "s" and stem.endswith(("s", "u", "i")):
+                # boss、thus、this 不是复数
+                continue
+            candidates.append((stem + replacement, pos))
+            if not replacement and len(stem) > 2 and stem[-1] == stem[-2] and stem[-1] not in "aeiouls":
+                # running -> run，bigger -> big
+                candidates.append((stem[:-1], pos))
+    return list(dict.fromkeys(candidates))
+
+
+def lemma_candidates(word):
+    """
+    单词可能的原形，按可能性排序，第一个是单词本身（小写）。
+
+    包括去掉 's、不规则变形表和规则变形（inflection_candidates），由调用方检查哪个原形在词库中、词性是否符合。
+    """
+    word = word.lower().replace("’", "'")
+    candidates = [word]
+    if "'" in word:
+        # John's -> john，nothing's -> nothing；don't 等缩写在常用词表中
+        word = word.split("'")[0]
+        candidates.append(word)
+    if word in IRREGULAR_FORMS:
+        candidates.append(IRREGULAR_FORMS[word])
+    candidates.extend(stem for stem, _ in inflection_candidates(word))
+    return list(dict.fromkeys(candidates))
+
+
+def load_word_lists(path=COMMON_WORDS_PATH):
+    """
+    读取常用词表：一行可以有多个单词，# 开头的行是注释，[words]、[verbs]、[adjectives] 开始对应的部分
+    （没有标题时是 [words]），动词和形容词同样是常用词。文件不存在时都是空集合。
+
+    :return: {"words": 所有常用词, "verbs": 动词原形, "adjectives": 形容词}
+    """
+    lists = {"words": set(), "verbs": set(), "adjectives": set()}
+    section = "words"
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line.startswith("#"):
+                    continue
+                if line.startswith("[") and line.endswith("]"):
+                    section = line[1:-1]
+                    lists.setdefault(section, set())
+                    continue
+                words = {word.lower() for word in line.split()}
+                lists[section].update(words)
+                lists["words"].update(words)
+    except OSError as e:
+        logging.error(f"读取常用词表失败 {path}: {e}")
+    return lists
+
+
+class LexicalPrefilter:
+    """
+    难词预筛选：提问大模型之前，用本地词库判断一行字幕中有没有真正少见的单词。
+
+    - 单词本身在常用词表（common_words.txt）中，或者在 english_data.db 中词频排名（frq/bnc）在前
+      config.LEXICAL_COMMON_RANK 名、属于牛津 3000 词（oxford）、柯林斯四星以上（collins）、中考词汇（tag 含 zk）时是常用词；
+      english_data.db 中有这个单词时只按它自己的记录和 exchange 中的原形判断
+    - 词库中没有的单词才按不规则变形表和规则变形还原，规则变形只在词性符合时有效
+      （-ed/-ing 的原形是动词，-er/-est/-ly 的原形是形容词），例如 earnest、homely、singed 不会被当作 earn、home、sing
+    - 句子中间首字母大写的单词当作名字，不算难词
+    - 两个字母以内的单词不算难词
+
+    english_data.db 不存在或者没有这些字段时只使用常用词表。
+
+    get_hard_word_scores 调用 check_line 和 filter_words，同时统计省下的大模型提问次数。
+    """
+
+    def __init__(self, db_path=None, common_words_path=None, common_rank=None):
+        self.db_path = db_path or ENGLISH_DB_PATH
+        self.common_words_path = common_words_path or COMMON_WORDS_PATH
+        self.common_rank = common_rank if common_rank is not None else config.LEXICAL_COMMON_RANK
+        self.lock = threading.Lock()
+        self.common_words = None
+        self.verbs = set()
+        self.adjectives = set()
+        self.conn = None
+        self.columns = set()
+        self.db_rows = {}
+        self.lines = 0
+        self.lines_skipped = 0
+        self.words_dropped = 0
+        self.names_skipped = 0
+        self.llm_calls_saved = 0
+
+    def _load(self):
+        if self.common_words is not None:
+            return
+        lists = load_word_lists(self.common_words_path)
+        self.common_words = lists["words"]
+        self.verbs = lists["verbs"]
+        self.adjectives = lists["adjectives"]
+        if not os.path.exists(self.db_path):
+            logging.info(f"没有找到词库 {self.db_path}，难词预筛选只使用常用词表")
+            return
+        try:
+            conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False)
+            self.columns = {row[1] for row in conn.execute("PRAGMA table_info(english_data)")}
+            if "word" not in self.columns:
+                logging.error(f"词库 {self.db_path} 中没有 english_data.word，难词预筛选只使用常用词表")
+                conn.close()
+                return
+            self.conn = conn
+        except sqlite3.Error as e:
+            logging.error(f"打开词库失败 {self.db_path}: {e}")
+
+    def _db_row(self, word):
+        """english_data 中单词的记录（只取判断难度用到的字段），没有返回 None"""
+        if self.conn is None:
+            return None
+        if word not in self.db_rows:
+            fields = [field for field in ("frq", "bnc", "oxford", "collins", "tag", "exchange") if field in self.columns]
+            row = None
+            try:
+                cursor = self.conn.execute(f"SELECT {', '.join(['word'] + fields)} FROM english_data WHERE word = ?", (word,))
+                found = cursor.fetchone()
+                if found is not None:
+                    row = dict(zip(["word"] + fields, found))
+            except sqlite3.Error as e:
+                logging.error(f"查询词库失败 {word}: {e}")
+            self.db_rows[word] = row
+        return self.db_rows[word]
+
+    def _db_common(self, row):
+        for field in ("frq", "bnc"):
+            rank = row.get(field)
+            if isinstance(rank, int) and 0 < rank <= self.common_rank:
+                return True
+        if row.get("oxford") == 1:
+            return True
+        if isinstance(row.get("collins"), int) and row["collins"] >= 4:
+            return True
+        return "zk" in (row.get("tag") or "").split()
+
+    def _db_lemma(self, row):
+        """ECDICT 格式的 exchange 字段中 0:原形"""
+        for part in (row.get("exchange") or "").split("/"):
+            if part.startswith("0:"):
+                return part[2:]
+        return None
+
+    def _known_common(self, word):
+        """单词本身是不是常用词：(是否常用, 是否在词库中)"""
+        if word in self.common_words:
+            return True, True
+        row = self._db_row(word)
+        if row is None:
+            return False, False
+        if self._db_common(row):
+            return True, True
+        lemma = self._db_lemma(row)
+        if lemma and lemma != word:
+            if lemma in self.common_words:
+                return True, True
+            lemma_row = self._db_row(lemma)
+            if lemma_row is not None and self._db_common(lemma_row):
+                return True, True
+        return False, True
+
+    def _pos_matches(self, stem, pos):
+        if pos == "verb":
+            return stem in self.verbs
+        if pos == "past":
+            return stem in self.verbs and stem not in IRREGULAR_PAST_VERBS
+        if pos == "adjective":
+            return stem in self.adjectives
+        return True
+
+    def is_common(self, word):
+        """单词是不是常用词（或者常用词的变形）"""
+        word = word.lower().replace("’", "'")
+        with self.lock:
+            self._load()
+            common, known = self._known_common(word)
+            if known:
+                # 词库中有这个单词时不再猜原形
+                return common
+            if "'" in word:
+                word = word.split("'")[0]
+                common, known = self._known_common(word)
+                if known:
+                    return common
+            if word in IRREGULAR_FORMS:
+                return self._known_common(IRREGULAR_FORMS[word])[0]
+            for stem, pos in inflection_candidates(word):
+                if self._pos_matches(stem, pos) and self._known_common(stem)[0]:
+                    return True
+            return False
+
+    def rare_words(self, en_text):
+        """一行英文中少见的单词（小写，去重，按出现顺序），不统计"""
+        rare = []
+        for token, sentence_start in tokenize(en_text):
+            if len(token) <= 2:
+                continue
+            if looks_like_name(token, sentence_start):
+                with self.lock:
+                    self.names_skipped += 1
+                continue
+            word = token.lower()
+            if word not in rare and not self.is_common(word):
+                rare.append(word)
+        return rare
+
+    def check_line(self, en_text):
+        """
+        一行字幕是否需要提问大模型（有少见的单词）。
+
+        不需要时省下 get_most_hard_words（远程）和至少一次打分（本地）两次提问。
+
+        :return: 少见的单词列表，空列表表示整行都是常用词
+        """
+        rare = self.rare_words(en_text)
+        with self.lock:
+            self.lines += 1
+            if not rare:
+                self.lines_skipped += 1
+                self.llm_calls_saved += 2
+        return rare
+
+    def filter_words(self, words):
+        """
+        去掉大模型找出的难词中的常用单词；多个单词的短语（例如 put up with）保留，由大模型判断。
+
+        逐个单词打分时每去掉一个单词至少省下一次提问，批量打分时全部去掉才省下一次提问。
+        """
+        kept = [word for word in words if " " in word.strip() or not self.is_common(word)]
+        dropped = len(words) - len(kept)
+        with self.lock:
+            self.words_dropped += dropped
+            if not config.HARD_WORD_BATCH_SCORING:
+                self.llm_calls_saved += dropped
+            elif dropped and not kept:
+                self.llm_calls_saved += 1
+        return kept
+
+    def stats(self):
+        return {
+            "lines": self.lines, "lines_skipped": self.lines_skipped, "words_dropped": self.words_dropped,
+            "names_skipped": self.names_skipped, "llm_calls_saved": self.llm_calls_saved,
+        }
+
+
+LEXICAL_PREFILTER = LexicalPrefilter()
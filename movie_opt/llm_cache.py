@@ -0,0 +1,113 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from movie_opt import config
+from movie_opt.config import CACHE_DIR
+
+
+def cache_key(backend, model, messages, options=None):
+    """(后端, 模型, 提问内容, 其他影响回答的参数) 的 sha256"""
+    content = json.dumps([backend, model, messages, options], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    大模型回答的 SQLite 缓存（WAL 模式，多个进程可以同时读写），进程退出后仍然有效。
+
+    key 是 (后端, 模型, 提问内容) 的哈希；超过 ttl 秒的回答失效，
+    条数超过 max_entries 时删除最久没有使用的回答。只缓存成功的回答，请求失败的错误信息不缓存。
+    """
+
+    def __init__(self, db_path=None, ttl=None, max_entries=None):
+        self.db_path = db_path or os.path.join(CACHE_DIR, "llm_cache.db")
+        self.ttl = ttl if ttl is not None else config.LLM_CACHE_TTL_DAYS * 24 * 3600
+        self.max_entries = max_entries if max_entries is not None else config.LLM_CACHE_MAX_ENTRIES
+        self.lock = threading.Lock()
+        self.conn = None
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+        self.puts = 0
+
+    def _connect(self):
+        if self.conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            self.conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, backend TEXT NOT NULL, model TEXT NOT NULL, reply TEXT NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_accessed_at ON llm_cache (accessed_at)")
+            self.conn.commit()
+        return self.conn
+
+    def get(self, backend, model, messages, options=None):
+        """返回缓存的回答，没有或者已经过期返回 None"""
+        if not config.LLM_CACHE_ENABLED:
+            return None
+        key = cache_key(backend, model, messages, options)
+        now = time.time()
+        with self.lock:
+            try:
+                conn = self._connect()
+                row = conn.execute("SELECT reply, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+                if row is not None and self.ttl > 0 and now - row[1] > self.ttl:
+                    conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    conn.commit()
+                    self.expired += 1
+                    row = None
+                if row is None:
+                    self.misses += 1
+                    return None
+                conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+                conn.commit()
+                self.hits += 1
+                return row[0]
+            except sqlite3.Error as e:
+                logging.error(f"读取大模型回答缓存失败: {e}")
+                self.misses += 1
+                return None
+
+    def put(self, backend, model, messages, reply, options=None):
+        """保存一个成功的回答（空回答不保存）"""
+        if not config.LLM_CACHE_ENABLED or not reply:
+            return
+        key = cache_key(backend, model, messages, options)
+        now = time.time()
+        with self.lock:
+            try:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, backend, model, reply, now, now)
+                )
+                self.puts += 1
+                # 每保存 100 个回答检查一次条数
+                if self.max_entries > 0 and self.puts % 100 == 1:
+                    overflow = conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] - self.max_entries
+                    if overflow > 0:
+                        # 删除最久没有使用的回答
+                        conn.execute(
+                            "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY accessed_at LIMIT ?)",
+                            (overflow,)
+                        )
+                        self.evicted += overflow
+                conn.commit()
+            except sqlite3.Error as e:
+                logging.error(f"写入大模型回答缓存失败: {e}")
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "expired": self.expired, "evicted": self.evicted}
+
+
+LLM_CACHE = LLMCache()
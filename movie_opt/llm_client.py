@@ -0,0 +1,233 @@
+import asyncio
+import heapq
+import itertools
+import json
+import queue
+import re
+import threading
+from concurrent.futures import Future
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from movie_opt import config
+
+
+# 优先级：数字越小越先发送
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 10
+PRIORITY_LOW = 20
+
+
+# 提前结束流式回答的条件：回答中已经出现第一个完整的数字（打分）或者第一个“是/否”（判断）
+STOP_PATTERNS = {
+    "number": re.compile(r"\d+(?=\D)"),
+    "yes_no": re.compile(r"不是|是|否"),
+}
+
+
+class ChatDecoder:
+    """
+    Ollama /api/chat 响应的增量解码：每收到一行 JSON（NDJSON 帧）就取出其中的内容，
+    收到 done 帧，或者 stop 指定的内容已经出现时结束，不需要等整个回答生成完。
+
+    stream 为 false 的响应是一个 done 为 true 的 JSON，同样用 feed_line 解码。
+    """
+
+    def __init__(self, stop=None):
+        if stop is not None and stop not in STOP_PATTERNS:
+            raise ValueError(f"不支持的提前结束条件: {stop}，可选: {', '.join(STOP_PATTERNS)}")
+        self.stop_pattern = STOP_PATTERNS[stop] if stop else None
+        self.parts = []
+        self.done = False
+        self.stopped = False
+
+    @property
+    def finished(self):
+        return self.done or self.stopped
+
+    def feed_line(self, line):
+        """
+        解码一帧。
+
+        :return: 是否已经可以结束（之后的帧不需要再读取）
+        :raises RuntimeError: Ollama 返回了错误帧
+        """
+        if self.finished or not line.strip():
+            return self.finished
+        frame = json.loads(line)
+        if frame.get("error"):
+            raise RuntimeError(f"Ollama 返回错误: {frame['error']}")
+        content = (frame.get("message") or {}).get("content")
+        if content:
+            self.parts.append(content)
+        if frame.get("done"):
+            self.done = True
+        elif content and self.stop_pattern is not None and self.stop_pattern.search(self.text()):
+            # 只有需要提前结束的短回答才在每一帧拼接一次
+            self.stopped = True
+        return self.finished
+
+    def text(self):
+        return "".join(self.parts)
+
+
+class PriorityExecutor:
+    """
+    固定数量工作线程的线程池，等待中的任务按 (优先级, 提交顺序) 执行。
+
+    submit 返回 concurrent.futures.Future，用法与 ThreadPoolExecutor 相同。
+    """
+
+    def __init__(self, max_workers, name="llm"):
+        self.max_workers = max_workers
+        self.name = name
+        self.tasks = queue.PriorityQueue()
+        self.counter = itertools.count()
+        self.threads = []
+        self.lock = threading.Lock()
+
+    def _start(self):
+        with self.lock:
+            while len(self.threads) < self.max_workers:
+                thread = threading.Thread(target=self._work, name=f"{self.name}-{len(self.threads)}", daemon=True)
+                thread.start()
+                self.threads.append(thread)
+
+    def _work(self):
+        while True:
+            _, _, future, fn, args, kwargs = self.tasks.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+
+    def submit(self, fn, *args, priority=PRIORITY_NORMAL, **kwargs):
+        self._start()
+        future = Future()
+        self.tasks.put((priority, next(self.counter), future, fn, args, kwargs))
+        return future
+
+
+class AsyncPriorityLimiter:
+    """asyncio 中限制同时进行的请求数，等待的请求按 (优先级, 到达顺序) 获得名额"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.active = 0
+        self.waiters = []
+        self.counter = itertools.count()
+
+    async def acquire(self, priority=PRIORITY_NORMAL):
+        if self.active < self.limit and not self.waiters:
+            self.active += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.waiters, (priority, next(self.counter), waiter))
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # 已经分到名额后被取消，把名额交给下一个
+                self.release()
+            raise
+
+    def release(self):
+        while self.waiters:
+            _, _, waiter = heapq.heappop(self.waiters)
+            if not waiter.done():
+                # 名额直接交给优先级最高的等待者
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+
+class LLMClient:
+    """
+    本地 Ollama 的 HTTP 客户端。
+
+    - 同步接口 chat / submit：共用一个 requests.Session（keep-alive 连接池），
+      请求在 config.LLM_MAX_IN_FLIGHT 个工作线程中执行，同时进行的请求数有上限，等待的请求按优先级发送
+    - 异步接口 achat：httpx.AsyncClient（keep-alive），同样的上限和优先级
+    """
+
+    def __init__(self, base_url=None, max_in_flight=None, timeout=None):
+        self.base_url = (base_url or config.LLM_LOCAL_URL).rstrip("/")
+        self.max_in_flight = max(1, max_in_flight or config.LLM_MAX_IN_FLIGHT)
+        self.timeout = timeout or config.LLM_TIMEOUT
+        self.executor = PriorityExecutor(self.max_in_flight)
+        self.session = None
+        self.session_lock = threading.Lock()
+        self.async_clients = {}
+        self.requests = 0
+
+    def _session(self):
+        with self.session_lock:
+            if self.session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_in_flight)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self.session = session
+            return self.session
+
+    def _post(self, path, payload, stop=None):
+        self.requests += 1
+        decoder = ChatDecoder(stop)
+        with self._session().post(self.base_url + path, json=payload, timeout=self.timeout, stream=True) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if decoder.feed_line(line):
+                    # 提前结束时关闭连接，Ollama 随之停止生成
+                    break
+        return decoder.text()
+
+    def submit(self, path, payload, priority=PRIORITY_NORMAL, stop=None):
+        """提交一个请求，返回 Future，结果为回答内容（字符串）"""
+        return self.executor.submit(self._post, path, payload, stop, priority=priority)
+
+    def chat(self, payload, priority=PRIORITY_NORMAL, stop=None):
+        """
+        同步调用 /api/chat，返回回答内容；在工作线程中执行。
+
+        :param payload: 请求内容，"stream": false 时 Ollama 一次返回整个回答
+        :param stop: 可选，STOP_PATTERNS 中的提前结束条件（需要流式响应）
+        """
+        return self.submit("/api/chat", payload, priority, stop).result()
+
+    async def achat(self, payload, priority=PRIORITY_NORMAL, stop=None):
+        """异步调用 /api/chat，返回回答内容（需要 httpx），参数与 chat 相同"""
+        # httpx 随 openai 安装，只在使用异步接口时导入
+        import httpx
+
+        loop = asyncio.get_running_loop()
+        state = self.async_clients.get(loop)
+        if state is None:
+            limits = httpx.Limits(max_connections=self.max_in_flight, max_keepalive_connections=self.max_in_flight)
+            state = (httpx.AsyncClient(base_url=self.base_url, limits=limits, timeout=self.timeout), AsyncPriorityLimiter(self.max_in_flight))
+            self.async_clients[loop] = state
+        client, limiter = state
+
+        await limiter.acquire(priority)
+        try:
+            self.requests += 1
+            decoder = ChatDecoder(stop)
+            async with client.stream("POST", "/api/chat", json=payload) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if decoder.feed_line(line):
+                        break
+            return decoder.text()
+        finally:
+            limiter.release()
+
+    async def aclose(self):
+        """关闭当前事件循环中的异步客户端"""
+        state = self.async_clients.pop(asyncio.get_running_loop(), None)
+        if state is not None:
+            await state[0].aclose()
+
+
+LLM_CLIENT = LLMClient()
@@ -12,18 +12,59 @@ def setup_logging():
 setup_logging()
 
 import argparse
-from movie_opt.commands.create import create_pc, create_phone
-from movie_opt.commands.translate import find_db_word
-from movie_opt.commands.pdf import pdf_to_txt_pdfplumber, split_sentences_2voice
-from movie_opt.commands.custom import custom1, custom2, custom3
+import importlib
+import sys
+import time
 
 from movie_opt.handle import Executor
+from movie_opt.media_probe import MEDIA_PROBE_CACHE
+from movie_opt.llm_cache import LLM_CACHE
+from movie_opt.lexicon import LEXICAL_PREFILTER
+
+
+# 启动耗时统计（--profile-startup）
+STARTUP_PROFILE = {"process_start": time.perf_counter()}
+
+# 导入慢、不应该被轻量命令导入的模块
+HEAVY_MODULES = ["torch", "TTS", "cv2", "pydub", "edge_tts", "dashscope", "markdown_pdf", "google.cloud.translate", "whisper", "PIL", "requests", "movie_opt.commands.ai"]
+
+
+def module_command(module_name, func_name):
+    """命令函数在执行时才导入所在的模块"""
+    def run(*args, **kwargs):
+        start = time.perf_counter()
+        func = getattr(importlib.import_module(module_name), func_name)
+        STARTUP_PROFILE["load_command"] = time.perf_counter() - start
+        return func(*args, **kwargs)
+    return run
+
+
+def operater_command(executor, operater_name, method_name):
+    """Operater 的方法在执行时才创建 Operater（以及导入它的模块）"""
+    def run(args):
+        start = time.perf_counter()
+        method = getattr(getattr(executor, operater_name), method_name)
+        STARTUP_PROFILE["load_command"] = time.perf_counter() - start
+        return method(args)
+    return run
+
+
+def print_startup_profile():
+    profile = STARTUP_PROFILE
+    print(f"启动耗时统计\n{'-'*22}")
+    print(f"导入main及解析参数: {profile['parse_args'] - profile['process_start']:.3f}秒")
+    print(f"加载命令（导入模块、创建Operater）: {profile.get('load_command', 0):.3f}秒")
+    print(f"执行命令: {profile.get('run_command', 0):.3f}秒")
+    loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+    print(f"已导入的重量级模块: {', '.join(loaded) if loaded else '无'}")
+
 
 def main():
     executor = Executor()
     parser = argparse.ArgumentParser(
         description="一个命令行工具将电影改为英语教程"
     )
+    parser.add_argument("--profile-startup", action="store_true", help="命令结束后打印启动耗时和已导入的重量级模块")
     subparsers = parser.add_subparsers(dest="command", help="命令列表")
 
     # Command create 
@@ -33,12 +74,18 @@ def main():
     # Command create -> Subcommand pc
     subparser_create_pc = subparser_create.add_parser("pc", help="创建pc视频")
     subparser_create_pc.add_argument("--path", required=False, help="包括了字幕和视频的文件夹的路径")
-    subparser_create_pc.set_defaults(func=create_pc)
+    subparser_create_pc.add_argument("--both", action="store_true", help="同一次解码同时生成pc视频和phone视频")
+    subparser_create_pc.add_argument("--text", required=False, help="可选，画面中间添加的文字")
+    subparser_create_pc.add_argument("--workers", required=False, type=int, default=None, help="同时处理的视频数，默认使用config.ENCODER_SLOTS")
+    subparser_create_pc.set_defaults(func=module_command("movie_opt.commands.create", "create_pc"))
 
     # Command create -> Subcommand phone
     subparser_create_phone = subparser_create.add_parser("phone", help="创建phone视频")
     subparser_create_phone.add_argument("--path", required=False, help="包括了字幕和视频的文件夹的路径")
-    subparser_create_phone.set_defaults(func=create_phone)
+    subparser_create_phone.add_argument("--both", action="store_true", help="同一次解码同时生成pc视频和phone视频")
+    subparser_create_phone.add_argument("--text", required=False, help="可选，画面中间添加的文字")
+    subparser_create_phone.add_argument("--workers", required=False, type=int, default=None, help="同时处理的视频数，默认使用config.ENCODER_SLOTS")
+    subparser_create_phone.set_defaults(func=module_command("movie_opt.commands.create", "create_phone"))
 
     #Command subtitle
     parser_subtitle = subparsers.add_parser("subtitle", help="格式转换")
@@ -47,61 +94,61 @@ def main():
     # Command subtitle -> Subcommand srt2ass
     subparser_subtitle_srt2ass = subparser_subtitle.add_parser("srt2ass", help="srt -> ass 视频")
     subparser_subtitle_srt2ass.add_argument("--path", required=False, help="srt的文件夹路径")
-    subparser_subtitle_srt2ass.set_defaults(func=executor.subtitleOperater.srt2ass)
+    subparser_subtitle_srt2ass.set_defaults(func=operater_command(executor, "subtitleOperater", "srt2ass"))
 
     # Command subtitle -> Subcommand reposition_srt
     subparser_subtitle_reposition_srt = subparser_subtitle.add_parser("reposition_srt", help="将英文的srt文件中的英文重新排版")
     subparser_subtitle_reposition_srt.add_argument("--path", required=False, help="srt的文件夹路径")
-    subparser_subtitle_reposition_srt.set_defaults(func=executor.subtitleOperater.reposition_srt)
+    subparser_subtitle_reposition_srt.set_defaults(func=operater_command(executor, "subtitleOperater", "reposition_srt"))
 
     # Command subtitle -> Subcommand ass_to_srt
     subparser_subtitle_ass_to_srt = subparser_subtitle.add_parser("ass_to_srt", help="将ass转化为srt")
     subparser_subtitle_ass_to_srt.add_argument("--path", required=False, help="srt的文件夹路径")
-    subparser_subtitle_ass_to_srt.set_defaults(func=executor.subtitleOperater.ass_to_srt)
+    subparser_subtitle_ass_to_srt.set_defaults(func=operater_command(executor, "subtitleOperater", "ass_to_srt"))
 
     
     # Command subtitle -> Subcommand change_ass_hard_word_style
     subparser_subtitle_change_ass_hard_word_style = subparser_subtitle.add_parser("change_ass_hard_word_style", help="ass文件的复杂单词修改颜色样式")
     subparser_subtitle_change_ass_hard_word_style.add_argument("--path", required=False, help="ass的文件夹路径")
-    subparser_subtitle_change_ass_hard_word_style.set_defaults(func=executor.subtitleOperater.change_ass_hard_word_style)
+    subparser_subtitle_change_ass_hard_word_style.set_defaults(func=operater_command(executor, "subtitleOperater", "change_ass_hard_word_style"))
 
 
     # Command subtitle -> Subcommand mergesrt
     subparser_subtitle_mergesrt = subparser_subtitle.add_parser("mergesrt", help="将两个不同语言的srt合并为一个srt")
     subparser_subtitle_mergesrt.add_argument("--path", required=False, help="srt的文件夹路径")
-    subparser_subtitle_mergesrt.set_defaults(func=executor.subtitleOperater.mergesrt)
+    subparser_subtitle_mergesrt.set_defaults(func=operater_command(executor, "subtitleOperater", "mergesrt"))
     
 
     # Command subtitle -> Subcommand addass
     subparser_subtitle_addass = subparser_subtitle.add_parser("addass", help="ass字幕添加到视频")
     subparser_subtitle_addass.add_argument("--path", required=False, help="ass的文件夹路径")
-    subparser_subtitle_addass.set_defaults(func=executor.subtitleOperater.addass)
+    subparser_subtitle_addass.set_defaults(func=operater_command(executor, "subtitleOperater", "addass"))
 
     # Command subtitle -> Subcommand sequencesrt
     subparser_subtitle_sequencesrt = subparser_subtitle.add_parser("sequencesrt", help="顺序显示每一行srt字幕")
     subparser_subtitle_sequencesrt.add_argument("--path", required=False, help="ass的文件夹路径")
-    subparser_subtitle_sequencesrt.set_defaults(func=executor.subtitleOperater.sequencesrt)
+    subparser_subtitle_sequencesrt.set_defaults(func=operater_command(executor, "subtitleOperater", "sequencesrt"))
 
     #Command subtitle -> Subcommand srt2txtpng
     subparser_subtitle_srt2txtpng = subparser_subtitle.add_parser("srt2txtpng", help="将pc尺寸的视频缩放为手机大小的视频")
     subparser_subtitle_srt2txtpng.add_argument("--path", required=False, help="视频文件夹的路径")
-    subparser_subtitle_srt2txtpng.set_defaults(func=executor.subtitleOperater.srt2txtpng)
+    subparser_subtitle_srt2txtpng.set_defaults(func=operater_command(executor, "subtitleOperater", "srt2txtpng"))
 
     #Command subtitle -> Subcommand srtsegment
     subparser_subtitle_srtsegment = subparser_subtitle.add_parser("srtsegment", help="将srt文件根据间隔时长分段为多个srt文件")
     subparser_subtitle_srtsegment.add_argument("--path", required=True, help="srt文件的路径")
     subparser_subtitle_srtsegment.add_argument("--second", required=True, default=7 ,help="视频分段的秒数，超过这个时间就分段。")
-    subparser_subtitle_srtsegment.set_defaults(func=executor.subtitleOperater.srtsegment)
+    subparser_subtitle_srtsegment.set_defaults(func=operater_command(executor, "subtitleOperater", "srtsegment"))
 
     #Command subtitle -> Subcommand convert_time
     subparser_subtitle_convert_time = subparser_subtitle.add_parser("convert_time", help="将所有srt文件的第一行字幕的开始时间改为00:00:00.000")
     subparser_subtitle_convert_time.add_argument("--path", required=True, help="包含srt文件夹的路径")
-    subparser_subtitle_convert_time.set_defaults(func=executor.subtitleOperater.convert_time)
+    subparser_subtitle_convert_time.set_defaults(func=operater_command(executor, "subtitleOperater", "convert_time"))
 
     #Command subtitle -> Subcommand count_srt_statistics
     subparser_subtitle_count_srt_statistics = subparser_subtitle.add_parser("count_srt_statistics", help="统计srt文件中的对话行数和英语词汇量")
     subparser_subtitle_count_srt_statistics.add_argument("--path", required=True, help="srt文件夹的路径")
-    subparser_subtitle_count_srt_statistics.set_defaults(func=executor.subtitleOperater.count_srt_statistics)
+    subparser_subtitle_count_srt_statistics.set_defaults(func=operater_command(executor, "subtitleOperater", "count_srt_statistics"))
     
 
     #Command picture
@@ -112,34 +159,46 @@ def main():
     subparser_picture_video_segment = subparser_picture.add_parser("video_segment", help="根据多个srt文件的字幕时间将指定mp4切分为多个mp4片段")
     subparser_picture_video_segment.add_argument("--srt_path", required=True, help="保存srt文件的文件夹路径")
     subparser_picture_video_segment.add_argument("--video_path", required=True,help="MP4文件的路径")
-    subparser_picture_video_segment.set_defaults(func=executor.pictureOperater.video_segment)
+    subparser_picture_video_segment.add_argument("--workers", required=False, type=int, default=None, help="同时截取多少个片段，默认使用config.SEGMENT_WORKERS")
+    subparser_picture_video_segment.add_argument("--smart_cut", action="store_true", help="只重新编码片段开头到下一个关键帧的部分，其余部分直接复制")
+    subparser_picture_video_segment.add_argument("--ass_path", required=False, help="整部视频的ass字幕，截取片段时同时烧录（不需要先执行subtitle addass）")
+    subparser_picture_video_segment.set_defaults(func=operater_command(executor, "pictureOperater", "video_segment"))
     
     # Command picture -> Subcommand cut_pc2phone
     subparser_picture_cut_pc2phone = subparser_picture.add_parser("cut_pc2phone", help="将pc尺寸的视频裁剪为手机大小的视频")
     subparser_picture_cut_pc2phone.add_argument("--path", required=False, help="视频文件夹的路径")
-    subparser_picture_cut_pc2phone.set_defaults(func=executor.pictureOperater.cut_pc2phone)
+    subparser_picture_cut_pc2phone.add_argument("--pc", action="store_true", help="同一次解码同时输出横屏视频(pc_前缀)")
+    subparser_picture_cut_pc2phone.add_argument("--workers", required=False, type=int, default=None, help="同时处理的视频数，默认使用config.ENCODER_SLOTS")
+    subparser_picture_cut_pc2phone.set_defaults(func=operater_command(executor, "pictureOperater", "cut_pc2phone"))
 
     #Command picture -> Subcommand scale_pc2phone
     subparser_picture_scale_pc2phone = subparser_picture.add_parser("scale_pc2phone", help="将pc尺寸的视频缩放为手机大小的视频")
     subparser_picture_scale_pc2phone.add_argument("--path", required=False, help="视频文件夹的路径")
-    subparser_picture_scale_pc2phone.set_defaults(func=executor.pictureOperater.scale_pc2phone)
+    subparser_picture_scale_pc2phone.add_argument("--pc", action="store_true", help="同一次解码同时输出横屏视频(pc_前缀)")
+    subparser_picture_scale_pc2phone.add_argument("--workers", required=False, type=int, default=None, help="同时处理的视频数，默认使用config.ENCODER_SLOTS")
+    subparser_picture_scale_pc2phone.set_defaults(func=operater_command(executor, "pictureOperater", "scale_pc2phone"))
 
     #Command picture -> Subcommand add_text
-    subparser_picture_add_text = subparser_picture.add_parser("add_text", help="将pc尺寸的视频缩放为手机大小的视频")
+    subparser_picture_add_text = subparser_picture.add_parser("add_text", help="在视频画面中间添加文字")
     subparser_picture_add_text.add_argument("--path", required=False, help="视频文件夹的路径")
-    subparser_picture_add_text.set_defaults(func=executor.pictureOperater.add_text)
+    subparser_picture_add_text.add_argument("--text", required=True, help="要添加的文字")
+    subparser_picture_add_text.add_argument("--phone", required=False, choices=["crop", "pad"], help="同一次解码同时输出竖屏视频：crop居中裁剪，pad缩放补黑边")
+    subparser_picture_add_text.add_argument("--workers", required=False, type=int, default=None, help="同时处理的视频数，默认使用config.ENCODER_SLOTS")
+    subparser_picture_add_text.set_defaults(func=operater_command(executor, "pictureOperater", "add_text"))
 
     #Command picture -> Subcommand split_video
     subparser_picture_split_video = subparser_picture.add_parser("split_video", help="通过视频和字幕文件生成视频中每一句的朗读视频")
     subparser_picture_split_video.add_argument("--srt_path", required=True, help="字幕文件夹的路径")
     subparser_picture_split_video.add_argument("--video_path", required=True, help="视频文件夹的路径")
-    subparser_picture_split_video.set_defaults(func=executor.pictureOperater.split_video)
+    subparser_picture_split_video.add_argument("--workers", required=False, type=int, default=None, help="同时生成多少行的每行视频，默认使用config.SPLIT_VIDEO_WORKERS")
+    subparser_picture_split_video.add_argument("--ass_path", required=False, help="视频片段对应的ass字幕（时间相对于片段），生成每行视频和时间线时同时烧录")
+    subparser_picture_split_video.set_defaults(func=operater_command(executor, "pictureOperater", "split_video"))
 
     
     #Command picture -> Subcommand generate_images
     subparser_picture_generate_images = subparser_picture.add_parser("generate_images", help="生成几百张封面图片")
     subparser_picture_generate_images.add_argument("--path", required=True, help="视频的路径")
-    subparser_picture_generate_images.set_defaults(func=executor.pictureOperater.generate_images)
+    subparser_picture_generate_images.set_defaults(func=operater_command(executor, "pictureOperater", "generate_images"))
 
     #Command ai
     parser_ai = subparsers.add_parser("ai", help="ai提问")
@@ -153,7 +212,7 @@ def main():
     # Command translate -> Subcommand find_db_word
     subparser_translate_find_db_word = subparser_translate.add_parser("find_db_word", help="使用db翻译英文单词")
     subparser_translate_find_db_word.add_argument("--word", required=True, help="英文单词")
-    subparser_translate_find_db_word.set_defaults(func=find_db_word)
+    subparser_translate_find_db_word.set_defaults(func=module_command("movie_opt.commands.translate", "find_db_word"))
     
 
     #Command voice
@@ -166,7 +225,7 @@ def main():
     subparser_voice_youdao_voice.add_argument("--content", required=True, help="朗读内容")
     subparser_voice_youdao_voice.add_argument("--save_path", required=False, help="保存文件的路径")
     subparser_voice_youdao_voice.add_argument("--type", required=False, default=1 ,help="发音类型")
-    subparser_voice_youdao_voice.set_defaults(func=executor.voiceOperater.youdao_voice)
+    subparser_voice_youdao_voice.set_defaults(func=operater_command(executor, "voiceOperater", "youdao_voice"))
 
     # Command voice -> Subcommand gtts_voice
     subparser_voice_gtts_voice = subparser_voice.add_parser("gtts_voice", help="将文本转化为gtts发音")
@@ -174,7 +233,7 @@ def main():
     subparser_voice_gtts_voice.add_argument("--save_path", required=False, help="保存文件的路径")
     subparser_voice_gtts_voice.add_argument("--language", required=False, default="en" ,help="语言")
     subparser_voice_gtts_voice.add_argument("--slow", required=False, default=False ,help="慢速")
-    subparser_voice_gtts_voice.set_defaults(func=executor.voiceOperater.gtts_voice)
+    subparser_voice_gtts_voice.set_defaults(func=operater_command(executor, "voiceOperater", "gtts_voice"))
 
     # Command voice -> Subcommand edge_tts_voice
     subparser_voice_edge_tts_voice = subparser_voice.add_parser("edge_tts_voice", help="将文本转化为edge_tts发音")
@@ -182,21 +241,21 @@ def main():
     subparser_voice_edge_tts_voice.add_argument("--save_path", required=False, help="保存文件的路径")
     subparser_voice_edge_tts_voice.add_argument("--language", required=False, default="en" ,help="语言")
     subparser_voice_edge_tts_voice.add_argument("--voice", required=False, default=None ,help="声音")
-    subparser_voice_edge_tts_voice.set_defaults(func=executor.voiceOperater.edge_tts_voice)
+    subparser_voice_edge_tts_voice.set_defaults(func=operater_command(executor, "voiceOperater", "edge_tts_voice"))
 
     # Command voice -> Subcommand create_mp3_by_clone_voice
     subparser_voice_create_mp3_by_clone_voice = subparser_voice.add_parser("create_mp3_by_clone_voice", help="克隆声音创建新的声音")
     subparser_voice_create_mp3_by_clone_voice.add_argument("--content", required=True, help="朗读内容")
     subparser_voice_create_mp3_by_clone_voice.add_argument("--save_path", required=False, help="保存文件的路径")
     subparser_voice_create_mp3_by_clone_voice.add_argument("--language", required=False, default="en" ,help="语言")
-    subparser_voice_create_mp3_by_clone_voice.set_defaults(func=executor.voiceOperater.create_mp3_by_clone_voice)
+    subparser_voice_create_mp3_by_clone_voice.set_defaults(func=operater_command(executor, "voiceOperater", "create_mp3_by_clone_voice"))
     
 
     # Command voice -> Subcommand clone_voice_conversion
     subparser_voice_clone_voice_conversion = subparser_voice.add_parser("clone_voice_conversion", help="转化wav音频为克隆声音")
     subparser_voice_clone_voice_conversion.add_argument("--target_wav", required=True, help="需要转化的wav文件路径")
     subparser_voice_clone_voice_conversion.add_argument("--save_path", required=False, help="保存文件的路径")
-    subparser_voice_clone_voice_conversion.set_defaults(func=executor.voiceOperater.clone_voice_conversion)
+    subparser_voice_clone_voice_conversion.set_defaults(func=operater_command(executor, "voiceOperater", "clone_voice_conversion"))
     
 
     #Command merge
@@ -206,18 +265,31 @@ def main():
     # Command merge -> Subcommand merge1
     subparser_merge_merge1 = subparser_merge.add_parser("merge1", help="视频拼接1")
     subparser_merge_merge1.add_argument("--path", required=False, help="包含子文件夹的路径")
-    subparser_merge_merge1.set_defaults(func=executor.mergeOperater.merge1)
+    subparser_merge_merge1.set_defaults(func=operater_command(executor, "mergeOperater", "merge1"))
+
+
+    # Command merge -> Subcommand timeline
+    subparser_merge_timeline = subparser_merge.add_parser("timeline", help="由split_video保存的时间线直接生成合并视频，不需要每行视频")
+    subparser_merge_timeline.add_argument("--path", required=False, help="包含时间线文件(*-timeline.json)的路径")
+    subparser_merge_timeline.add_argument("--types", required=False, help="合并视频类型，逗号分隔，默认“中英对照,磨耳朵,无儿童磨耳朵”")
+    subparser_merge_timeline.set_defaults(func=operater_command(executor, "mergeOperater", "timeline"))
 
+    # Command merge -> Subcommand audio
+    subparser_merge_audio = subparser_merge.add_parser("audio", help="由split_video保存的时间线只生成合并视频的音频（例如磨耳朵mp3），不编码视频")
+    subparser_merge_audio.add_argument("--path", required=False, help="包含时间线文件(*-timeline.json)的路径")
+    subparser_merge_audio.add_argument("--types", required=False, help="合并视频类型，逗号分隔，默认“磨耳朵”")
+    subparser_merge_audio.add_argument("--format", required=False, choices=["mp3", "opus"], help="音频格式，默认config.LESSON_AUDIO_FORMAT")
+    subparser_merge_audio.set_defaults(func=operater_command(executor, "mergeOperater", "audio"))
 
     # Command merge -> Subcommand merge2
     subparser_merge_merge2 = subparser_merge.add_parser("merge2", help="相同编号的“1中英文对照 2跟读 3磨耳朵”视频拼接起来")
     subparser_merge_merge2.add_argument("--path", required=True, help="包含子文件夹的路径")
-    subparser_merge_merge2.set_defaults(func=executor.mergeOperater.merge2)
+    subparser_merge_merge2.set_defaults(func=operater_command(executor, "mergeOperater", "merge2"))
 
     # Command merge -> Subcommand merge3
     subparser_merge_merge3 = subparser_merge.add_parser("merge3", help="将 所有“中英文对照”， 所有“跟读”， 所有“磨耳朵”视频拼接起来,形成三部完整的电影")
     subparser_merge_merge3.add_argument("--path", required=True, help="包含子文件夹的路径")
-    subparser_merge_merge3.set_defaults(func=executor.mergeOperater.merge3)
+    subparser_merge_merge3.set_defaults(func=operater_command(executor, "mergeOperater", "merge3"))
 
     #Command custom
     parser_custom = subparsers.add_parser("custom", help="自定义命令")
@@ -228,18 +300,20 @@ def main():
     subparser_custom_custom1.add_argument("--path", required=True, help="包含子文件夹的路径")
     subparser_custom_custom1.add_argument("--segment_second", required=False, help="间隔秒数分段依据")
     # 例如，使用 lambda 将 executor 传递给 custom1
-    subparser_custom_custom1.set_defaults(func=lambda args: custom1(args, executor))
+    subparser_custom_custom1.set_defaults(func=lambda args: module_command("movie_opt.commands.custom", "custom1")(args, executor))
 
     # Command custom -> Subcommand custom2
     subparser_custom_custom2 = subparser_custom.add_parser("custom2", help="将同名的mp4和srt文件移动到一个同名的文件夹中")
     subparser_custom_custom2.add_argument("--path", required=True, help="包含mp4和srt文件的文件夹路径")
-    subparser_custom_custom2.set_defaults(func=lambda args: custom2(args, executor))
+    subparser_custom_custom2.set_defaults(func=lambda args: module_command("movie_opt.commands.custom", "custom2")(args, executor))
 
     # Command custom -> Subcommand custom3
     subparser_custom_custom3 = subparser_custom.add_parser("custom3", help="操作多个包含了有双语srt和视频的动画片的文件夹生成完整视频")
     subparser_custom_custom3.add_argument("--path", required=True, help="包含子文件夹的路径")
+    subparser_custom_custom3.add_argument("--audio_only", action="store_true", help="存在时间线文件时只生成磨耳朵音频，不生成合并视频")
+    subparser_custom_custom3.add_argument("--audio_format", required=False, choices=["mp3", "opus"], help="磨耳朵音频格式，默认config.LESSON_AUDIO_FORMAT")
     # 例如，使用 lambda 将 executor 传递给 custom3
-    subparser_custom_custom3.set_defaults(func=lambda args: custom3(args, executor))
+    subparser_custom_custom3.set_defaults(func=lambda args: module_command("movie_opt.commands.custom", "custom3")(args, executor))
 
     #Command pdf
     parser_pdf = subparsers.add_parser("pdf", help="pdf操作")
@@ -248,12 +322,12 @@ def main():
     # Command pdf -> Subcommand pdf_to_txt_pdfplumber
     subparser_pdf_pdf_to_txt_pdfplumber = subparser_pdf.add_parser("pdf_to_txt_pdfplumber", help="pdf转txt")
     subparser_pdf_pdf_to_txt_pdfplumber.add_argument("--path", required=True, help="pdf文件或是包含了pdf文件的文件夹的路径")
-    subparser_pdf_pdf_to_txt_pdfplumber.set_defaults(func=pdf_to_txt_pdfplumber)
+    subparser_pdf_pdf_to_txt_pdfplumber.set_defaults(func=module_command("movie_opt.commands.pdf", "pdf_to_txt_pdfplumber"))
 
     # Command pdf -> Subcommand split_sentences_2voice
     subparser_pdf_split_sentences_2voice = subparser_pdf.add_parser("split_sentences_2voice", help="txt转mp3")
     subparser_pdf_split_sentences_2voice.add_argument("--path", required=True, help="txt文件或是包含了txt文件的文件夹的路径")
-    subparser_pdf_split_sentences_2voice.set_defaults(func=split_sentences_2voice)
+    subparser_pdf_split_sentences_2voice.set_defaults(func=module_command("movie_opt.commands.pdf", "split_sentences_2voice"))
 
     
 
@@ -261,9 +335,16 @@ def main():
     # and more ...
 
     args = parser.parse_args()
+    STARTUP_PROFILE["parse_args"] = time.perf_counter()
 
     if args.command:
         args.func(args)
+        STARTUP_PROFILE["run_command"] = time.perf_counter() - STARTUP_PROFILE["parse_args"] - STARTUP_PROFILE.get("load_command", 0)
+        logging.info(f"媒体信息缓存统计: {MEDIA_PROBE_CACHE.stats()}")
+        logging.info(f"大模型回答缓存统计: {LLM_CACHE.stats()}")
+        logging.info(f"难词预筛选统计: {LEXICAL_PREFILTER.stats()}")
+        if args.profile_startup:
+            print_startup_profile()
     else:
         parser.print_help()
 
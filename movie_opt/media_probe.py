@@ -0,0 +1,262 @@
+import json
+import logging
+import os
+import sqlite3
+import subprocess
+import threading
+from fractions import Fraction
+
+from movie_opt.config import CACHE_DIR
+
+
+class MediaInfo:
+    """
+    一个媒体文件的 ffprobe 信息（-show_streams -show_format）。
+
+    duration/width/height/time_base/codec/sample_rate 都从同一份 json 中读取，
+    不再为每个属性单独调用一次 ffprobe。
+    """
+
+    def __init__(self, path, probe):
+        self.path = path
+        self.probe = probe
+        streams = probe.get("streams", [])
+        self.format = probe.get("format", {})
+        self.video_stream = next((s for s in streams if s.get("codec_type") == "video" and not s.get("disposition", {}).get("attached_pic")), None)
+        self.audio_stream = next((s for s in streams if s.get("codec_type") == "audio"), None)
+
+    @property
+    def duration(self):
+        """文件总时长（秒），对应 format=duration"""
+        duration = self.format.get("duration")
+        if duration is None:
+            duration = self.stream_duration
+        return None if duration is None else float(duration)
+
+    @property
+    def stream_duration(self):
+        """视频流（没有视频流时为音频流）的时长（秒）"""
+        stream = self.video_stream or self.audio_stream
+        if stream is None or stream.get("duration") is None:
+            return None
+        return float(stream["duration"])
+
+    @property
+    def has_video(self):
+        return self.video_stream is not None
+
+    @property
+    def has_audio(self):
+        return self.audio_stream is not None
+
+    @property
+    def width(self):
+        return None if self.video_stream is None else self.video_stream.get("width")
+
+    @property
+    def height(self):
+        return None if self.video_stream is None else self.video_stream.get("height")
+
+    @property
+    def time_base(self):
+        """视频流的 time_base，例如 "1/1000" """
+        return None if self.video_stream is None else self.video_stream.get("time_base")
+
+    @property
+    def fps(self):
+        if self.video_stream is None:
+            return None
+        rate = self.video_stream.get("avg_frame_rate") or self.video_stream.get("r_frame_rate")
+        if not rate or rate == "0/0":
+            return None
+        return float(Fraction(rate))
+
+    @property
+    def pix_fmt(self):
+        return None if self.video_stream is None else self.video_stream.get("pix_fmt")
+
+    @property
+    def video_codec(self):
+        return None if self.video_stream is None else self.video_stream.get("codec_name")
+
+    @property
+    def video_profile(self):
+        """视频流的 profile，例如 "High" """
+        return None if self.video_stream is None else self.video_stream.get("profile")
+
+    @property
+    def video_level(self):
+        """视频流的 level（h264 为 level*10，例如 40），未知时为 None"""
+        if self.video_stream is None:
+            return None
+        level = self.video_stream.get("level")
+        return level if isinstance(level, int) and level > 0 else None
+
+    @property
+    def has_b_frames(self):
+        """视频流解码时需要缓存的 B 帧数量（has_b_frames），未知时为 None"""
+        return None if self.video_stream is None else self.video_stream.get("has_b_frames")
+
+    @property
+    def field_order(self):
+        """视频流的扫描方式，例如 "progressive"，ffprobe 没有给出时为 None"""
+        return None if self.video_stream is None else self.video_stream.get("field_order")
+
+    @property
+    def audio_codec(self):
+        return None if self.audio_stream is None else self.audio_stream.get("codec_name")
+
+    @property
+    def sample_rate(self):
+        if self.audio_stream is None or self.audio_stream.get("sample_rate") is None:
+            return None
+        return int(self.audio_stream["sample_rate"])
+
+    @property
+    def channels(self):
+        return None if self.audio_stream is None else self.audio_stream.get("channels")
+
+    @property
+    def audio_bit_rate(self):
+        if self.audio_stream is None or self.audio_stream.get("bit_rate") is None:
+            return None
+        return int(self.audio_stream["bit_rate"])
+
+
+def run_ffprobe(file_path):
+    """对文件执行一次 ffprobe，返回解析后的 json"""
+    command = [
+        "ffprobe", "-v", "error",
+        "-show_streams", "-show_format",
+        "-of", "json", file_path
+    ]
+    logging.info(" ".join(command))
+    result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, encoding="utf-8", errors="ignore")
+    if result.returncode != 0:
+        raise RuntimeError(f"ffprobe 执行失败: {result.stderr.strip()}")
+    if result.stdout is None or result.stdout.strip() == "":
+        raise RuntimeError(f"ffprobe 输出为空: {result.stderr.strip()}")
+    return json.loads(result.stdout)
+
+
+class MediaProbeCache:
+    """
+    ffprobe 结果的两级缓存：进程内存 + SQLite 文件。
+
+    key 是 (绝对路径, 文件大小, 修改时间)，文件被重新编码或替换后 key 随之变化，旧结果自动失效。
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.path.join(CACHE_DIR, "media_probe.db")
+        self.memory = {}
+        self.lock = threading.Lock()
+        self.conn = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _connect(self):
+        if self.conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS media_probe ("
+                "path TEXT NOT NULL, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, probe TEXT NOT NULL, "
+                "PRIMARY KEY (path, size, mtime_ns))"
+            )
+            self.conn.commit()
+        return self.conn
+
+    def get(self, file_path):
+        """返回文件的 MediaInfo，文件不存在抛出 FileNotFoundError，ffprobe 失败抛出 RuntimeError"""
+        path = os.path.abspath(file_path)
+        stat = os.stat(path)
+        key = (path, stat.st_size, stat.st_mtime_ns)
+
+        info = self.memory.get(key)
+        if info is not None:
+            self.memory_hits += 1
+            return info
+
+        with self.lock:
+            row = None
+            try:
+                row = self._connect().execute(
+                    "SELECT probe FROM media_probe WHERE path = ? AND size = ? AND mtime_ns = ?", key
+                ).fetchone()
+            except sqlite3.Error as e:
+                logging.error(f"读取媒体信息缓存失败: {e}")
+            if row is not None:
+                self.disk_hits += 1
+                info = MediaInfo(path, json.loads(row[0]))
+                self.memory[key] = info
+                return info
+
+        probe = run_ffprobe(path)
+        self.misses += 1
+        info = MediaInfo(path, probe)
+        with self.lock:
+            self.memory[key] = info
+            try:
+                conn = self._connect()
+                # 同一路径的旧记录已经失效
+                conn.execute("DELETE FROM media_probe WHERE path = ?", (path,))
+                conn.execute("INSERT OR REPLACE INTO media_probe VALUES (?, ?, ?, ?)", key + (json.dumps(probe),))
+                conn.commit()
+            except sqlite3.Error as e:
+                logging.error(f"写入媒体信息缓存失败: {e}")
+        return info
+
+    def stats(self):
+        return {"memory_hits": self.memory_hits, "disk_hits": self.disk_hits, "misses": self.misses}
+
+
+MEDIA_PROBE_CACHE = MediaProbeCache()
+
+
+def probe_media(file_path):
+    """获取媒体文件信息（带缓存）"""
+    return MEDIA_PROBE_CACHE.get(file_path)
+
+
+_keyframe_cache = {}
+_keyframe_lock = threading.Lock()
+
+
+def keyframe_times(file_path):
+    """
+    视频流所有关键帧的时间（秒，升序）。
+
+    只读取数据包的标记，不解码画面；结果按 (绝对路径, 文件大小, 修改时间) 缓存在进程内。
+    """
+    path = os.path.abspath(file_path)
+    stat = os.stat(path)
+    key = (path, stat.st_size, stat.st_mtime_ns)
+    with _keyframe_lock:
+        if key in _keyframe_cache:
+            return _keyframe_cache[key]
+
+    command = [
+        "ffprobe", "-v", "error",
+        "-select_streams", "v:0",
+        "-show_entries", "packet=pts_time,flags",
+        "-of", "csv=p=0", path
+    ]
+    logging.info(" ".join(command))
+    result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, encoding="utf-8", errors="ignore")
+    if result.returncode != 0:
+        raise RuntimeError(f"ffprobe 读取关键帧失败: {result.stderr.strip()}")
+
+    times = []
+    for line in result.stdout.splitlines():
+        parts = line.strip().split(",")
+        if len(parts) < 2 or "K" not in parts[1]:
+            continue
+        try:
+            times.append(float(parts[0]))
+        except ValueError:
+            continue
+    times.sort()
+    with _keyframe_lock:
+        _keyframe_cache[key] = times
+    return times
@@ -1,7 +1,7 @@
 import os
-from dashscope import Generation
 import traceback
 from movie_opt.config import REMOTE_MODEL_NAME
+from movie_opt.llm_cache import LLM_CACHE
 
 class QwenPlusAssistant:
     def __init__(self, api_key=None, model=REMOTE_MODEL_NAME, result_format="message"):
@@ -27,6 +27,16 @@ class QwenPlusAssistant:
         """
         messages = self.history.copy() if use_history else []
         messages.append({'role': 'user', 'content': message})
+
+        # 相同的对话直接使用缓存的回答，不需要导入 dashscope
+        cached = LLM_CACHE.get("dashscope", self.model, messages, {"result_format": self.result_format})
+        if cached is not None:
+            if use_history:
+                self.history = messages + [{'role': 'assistant', 'content': cached}]
+            return cached
+
+        # dashscope 导入较慢，只在真正调用模型时才导入
+        from dashscope import Generation
         
         try:
             response = Generation.call(
@@ -38,6 +48,8 @@ class QwenPlusAssistant:
             
             if response.status_code == 200:
                 reply_content = response.output.choices[0].message.content
+                # 只缓存成功的回答
+                LLM_CACHE.put("dashscope", self.model, messages, reply_content, {"result_format": self.result_format})
                 messages.append({'role': 'assistant', 'content': reply_content})
                 
                 # 如果使用了历史对话，则更新历史记录
@@ -0,0 +1,379 @@
+import json
+import logging
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+
+from movie_opt import audio_pcm
+from movie_opt import clip_catalog
+from movie_opt import clip_spec
+from movie_opt import config
+from movie_opt.encoder import video_encode_args
+from movie_opt.media_probe import probe_media
+from movie_opt.utils import shift_ass_events
+
+
+# 时间线文件由 split_video 写在视频旁边：{视频名}-timeline.json
+MANIFEST_SUFFIX = "-timeline.json"
+MANIFEST_VERSION = 1
+
+# 每种合并视频由哪些“每行…”内容按顺序组成
+LESSON_FOLDER_TYPES = {
+    "中英对照": ["每行完整视频", "每行中文视频", "每行儿童发音视频"],
+    "跟读": ["每行分段视频", "每行跟读视频"],
+    "磨耳朵": ["每行分段视频", "每行发音视频", "每行发音视频2", "每行儿童发音视频"],
+    "无儿童磨耳朵": ["每行完整视频", "每行发音视频", "每行发音视频2"],
+}
+
+# “每行…”内容在时间线中的来源：("range", 原视频时间段) 或 ("still", 截图 + 每行音频)
+FOLDER_PIECES = {
+    "每行完整视频": ("range", "complete"),
+    "每行分段视频": ("range", "fragment"),
+    "每行中文视频": ("still", "cn"),
+    "每行儿童发音视频": ("still", "child"),
+    "每行发音视频": ("still", "clips"),
+    "每行发音视频2": ("still", "clips2"),
+    "每行跟读视频": ("still", "empty"),
+}
+
+
+def manifest_path(video):
+    video_name = os.path.splitext(os.path.basename(video))[0]
+    return os.path.join(os.path.dirname(os.path.abspath(video)), video_name + MANIFEST_SUFFIX)
+
+
+def write_manifest(video, video_name, video_extension, lines, ass_path=None):
+    """
+    保存时间线文件。
+
+    :param lines: [{"id", "complete": [开始秒, 结束秒] 或 None, "fragment": [开始秒, 结束秒] 或 None,
+                   "screenshot": 截图路径或 None, "audio": {音频类型: wav路径}}, ...]
+    :param ass_path: 可选，生成合并视频时在原视频画面上烧录的 ASS 字幕（时间相对于 video）
+    :return: 时间线文件路径
+    """
+    path = manifest_path(video)
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "video": os.path.abspath(video),
+        "video_name": video_name,
+        "video_extension": video_extension,
+        "ass": os.path.abspath(ass_path) if ass_path else None,
+        "lines": sorted(lines, key=lambda line: line["id"]),
+    }
+    temp_path = path + ".temp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(temp_path, path)
+    logging.info(f"保存时间线 {path} 行数:{len(lines)}")
+    return path
+
+
+def load_manifest(path):
+    with open(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise ValueError(f"不支持的时间线版本 {manifest.get('version')}: {path}")
+    return manifest
+
+
+def find_manifests(path):
+    """文件夹中的所有时间线文件（不递归）"""
+    if not os.path.isdir(path):
+        return []
+    return sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith(MANIFEST_SUFFIX))
+
+
+def plan_lesson(manifest, lesson):
+    """
+    按合并视频的类型把时间线展开为内容列表。
+
+    与 merge_lessons 拼接每行视频的顺序相同：按行号，再按 LESSON_FOLDER_TYPES 中的顺序；
+    某一行只有“每行完整视频”和“每行分段视频”两项时只保留“每行完整视频”（见 merge.filter_videos1）。
+
+    :return: [{"type": "range", "start", "end"} 或 {"type": "still", "image", "audio"}, ...]
+    """
+    if lesson not in LESSON_FOLDER_TYPES:
+        raise ValueError(f"不存在的合并视频类型: {lesson}，可选: {', '.join(LESSON_FOLDER_TYPES)}")
+
+    pieces = []
+    for line in manifest["lines"]:
+        line_pieces = []
+        for folder_type in LESSON_FOLDER_TYPES[lesson]:
+            source, kind = FOLDER_PIECES[folder_type]
+            if source == "range":
+                if line.get(kind):
+                    start, end = line[kind]
+                    line_pieces.append((folder_type, {"type": "range", "start": start, "end": end}))
+            else:
+                audio = (line.get("audio") or {}).get(kind)
+                if line.get("screenshot") and audio:
+                    line_pieces.append((folder_type, {"type": "still", "image": line["screenshot"], "audio": audio}))
+
+        if sorted(folder_type for folder_type, _ in line_pieces) == ["每行分段视频", "每行完整视频"]:
+            line_pieces = [p for p in line_pieces if p[0] != "每行分段视频"]
+        pieces.extend(piece for _, piece in line_pieces)
+    return pieces
+
+
+def _frame_count(seconds):
+    return max(1, int(round(seconds * clip_spec.FPS)))
+
+
+def render_pieces(pieces, video, width, height, source_pcm, output_path, workspace, ass_path=None):
+    """
+    用一个 ffmpeg 进程把内容列表编码为一个视频。
+
+    原视频只作为一个输入解码一次，split 后每一段用 trim 截取；截图作为循环的图片输入。
+    每一段的画面补齐或截断到整数帧，音频在内存中按同样的帧数拼好后作为一个 wav 输入，所以音画始终对齐。
+    ass_path 不为空时在 split 之前烧录字幕，ffmpeg 以 workspace 为工作目录运行。
+    """
+    samples_per_frame = audio_pcm.SAMPLE_RATE // clip_spec.FPS
+    common_filter = f"fps={clip_spec.FPS},scale={width}:{height},setsar=1,format={clip_spec.PIX_FMT}"
+
+    ranges = [piece for piece in pieces if piece["type"] == "range"]
+    seek = min(piece["start"] for piece in ranges) if ranges else 0
+    command = ["ffmpeg", "-y"]
+    filter_lines = []
+    if ranges:
+        command.extend(["-ss", f"{seek:.3f}", "-i", os.path.abspath(video)])  # 输入跳转到第一段的开始位置
+        source = "[0:v:0]"
+        if ass_path:
+            # 字幕按输入跳转的位置平移，只保留这几段里的字幕
+            shift_ass_events(ass_path, seek, os.path.join(workspace, "subtitle.ass"), max(piece["end"] for piece in ranges) - seek)
+            source = "[0:v:0]ass=subtitle.ass,"
+        split_labels = "".join(f"[s{i}]" for i in range(len(ranges)))
+        filter_lines.append(f"{source}split={len(ranges)}{split_labels}" if len(ranges) > 1 else f"{source}null[s0]")
+
+    tracks = []
+    range_index = 0
+    input_index = 1 if ranges else 0
+    for i, piece in enumerate(pieces):
+        if piece["type"] == "range":
+            frames = _frame_count(piece["end"] - piece["start"])
+            start_sample = int(round(piece["start"] * audio_pcm.SAMPLE_RATE))
+            pcm = source_pcm[start_sample:start_sample + frames * samples_per_frame]
+            source = f"[s{range_index}]trim=start={piece['start'] - seek:.3f}:end={piece['end'] - seek:.3f},setpts=PTS-STARTPTS,"
+            range_index += 1
+        else:
+            pcm = audio_pcm.read_wav(piece["audio"])
+            frames = _frame_count(audio_pcm.duration(pcm))
+            command.extend([
+                "-loop", "1", "-framerate", str(clip_spec.FPS),
+                "-t", f"{frames / clip_spec.FPS + 1:.3f}",
+                "-i", os.path.abspath(piece["image"]),
+            ])
+            source = f"[{input_index}:v]"
+            input_index += 1
+        # 画面不够时重复最后一帧，再截到正好 frames 帧
+        filter_lines.append(f"{source}{common_filter},tpad=stop=-1:stop_mode=clone,trim=end_frame={frames},setpts=PTS-STARTPTS[p{i}]")
+        tracks.append(audio_pcm.fit(pcm, frames * samples_per_frame))
+
+    concat_labels = "".join(f"[p{i}]" for i in range(len(pieces)))
+    filter_lines.append(f"{concat_labels}concat=n={len(pieces)}:v=1:a=0[v]")
+
+    filter_script_path = os.path.join(workspace, "timeline-filter.txt")
+    with open(filter_script_path, "w", encoding="utf-8") as f:
+        f.write(";\n".join(filter_lines))
+    audio_path = os.path.join(workspace, "timeline-audio.wav")
+    audio_pcm.write_wav(audio_pcm.concat(*tracks), audio_path)
+
+    command.extend([
+        "-i", audio_path,
+        "-filter_complex_script", filter_script_path,
+        "-map", "[v]",
+        "-map", f"{input_index}:a",
+        "-map_metadata", "-1",  # 清除全局元信息
+        *video_encode_args(),   # 整个合并视频只编码一次
+        *clip_spec.output_args(),
+        output_path
+    ])
+    logging.info(f"时间线编码 video:{video} 内容数:{len(pieces)} command:{' '.join(command)}")
+    subprocess.run(command, check=True, cwd=workspace)
+
+
+def decode_source_pcm(manifest):
+    """
+    解码时间线原视频的音频。同一个时间线生成多个合并视频时只需要解码一次。
+
+    :return: PCM，原视频没有音频时返回空的 PCM
+    """
+    info = probe_media(manifest["video"])
+    return audio_pcm.decode_audio(manifest["video"]) if info.has_audio else audio_pcm.silence_samples(0)
+
+
+def render_lesson(manifest, lesson, output_path, source_pcm=None):
+    """
+    不经过每行视频，直接由时间线生成一个合并视频（中英对照、磨耳朵等）。
+
+    内容太多时每 config.TIMELINE_CHUNK_PIECES 个编码为一段，各段格式相同，最后直接复制拼接。
+
+    :param source_pcm: 原视频的音频（decode_source_pcm），为 None 时在这里解码
+    :return: 生成的视频路径，没有内容时返回 None
+    """
+    pieces = plan_lesson(manifest, lesson)
+    if not pieces:
+        logging.info(f"时间线没有{lesson}的内容 video:{manifest['video']}")
+        return None
+
+    video = manifest["video"]
+    info = probe_media(video)
+    if source_pcm is None:
+        # 原视频的音频只解码一次，之后按采样截取
+        source_pcm = decode_source_pcm(manifest)
+    extension = os.path.splitext(output_path)[1]
+
+    workspace = tempfile.mkdtemp(prefix=".timeline-", dir=os.path.dirname(os.path.abspath(output_path)))
+    try:
+        chunk_size = max(1, config.TIMELINE_CHUNK_PIECES)
+        parts = []
+        for chunk_index, start in enumerate(range(0, len(pieces), chunk_size)):
+            part_path = os.path.join(workspace, f"part-{chunk_index}{extension}")
+            render_pieces(pieces[start:start + chunk_size], video, info.width, info.height, source_pcm, part_path, workspace, manifest.get("ass"))
+            parts.append(part_path)
+
+        if len(parts) == 1:
+            os.replace(parts[0], output_path)
+        else:
+            merge_list_path = os.path.join(workspace, "merge_list.txt")
+            with open(merge_list_path, "w", encoding="utf-8") as f:
+                for part_path in parts:
+                    f.write(f"file '{part_path}'\n")
+            temp_output = os.path.join(workspace, f"lesson{extension}")
+            command = ["ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", merge_list_path, "-c", "copy", temp_output]
+            logging.info(f"拼接时间线分段 {' '.join(command)}")
+            subprocess.run(command, check=True)
+            os.replace(temp_output, output_path)
+    finally:
+        shutil.rmtree(workspace, ignore_errors=True)
+    logging.info(f"时间线生成{lesson}视频完成 {output_path} 内容数:{len(pieces)}")
+    return output_path
+
+
+def lesson_audio_pcm(manifest, lesson, source_pcm=None):
+    """
+    只拼接合并视频的音频：原视频片段的音频、每行的配音音频（已经包含静音和“ding”），不解码画面。
+
+    内容和顺序与 render_lesson 相同（见 plan_lesson），每一段音频的长度与视频中这一段的帧数一致。
+
+    :param source_pcm: 原视频的音频（decode_source_pcm），为 None 时在需要时解码
+    :return: PCM，没有内容时返回 None
+    """
+    pieces = plan_lesson(manifest, lesson)
+    if not pieces:
+        return None
+    samples_per_frame = audio_pcm.SAMPLE_RATE // clip_spec.FPS
+    tracks = []
+    for piece in pieces:
+        if piece["type"] == "range":
+            if source_pcm is None:
+                # 原视频的音频只解码一次
+                source_pcm = decode_source_pcm(manifest)
+            frames = _frame_count(piece["end"] - piece["start"])
+            start_sample = int(round(piece["start"] * audio_pcm.SAMPLE_RATE))
+            pcm = source_pcm[start_sample:start_sample + frames * samples_per_frame]
+        else:
+            pcm = audio_pcm.read_wav(piece["audio"])
+            frames = _frame_count(audio_pcm.duration(pcm))
+        tracks.append(audio_pcm.fit(pcm, frames * samples_per_frame))
+    return audio_pcm.concat(*tracks)
+
+
+def render_lesson_audio(manifest, lesson, output_path, audio_format=None, source_pcm=None):
+    """
+    只生成合并视频的音频（例如磨耳朵的 mp3），不编码视频，也不需要先生成合并视频再提取音轨。
+
+    :param audio_format: config.LESSON_AUDIO_CODECS 中的格式（mp3、opus），默认 config.LESSON_AUDIO_FORMAT
+    :param source_pcm: 原视频的音频（decode_source_pcm），为 None 时在需要时解码
+    :return: 生成的音频路径，没有内容时返回 None
+    """
+    audio_format = audio_format or config.LESSON_AUDIO_FORMAT
+    if audio_format not in config.LESSON_AUDIO_CODECS:
+        raise ValueError(f"不支持的音频格式: {audio_format}，可选: {', '.join(config.LESSON_AUDIO_CODECS)}")
+    pcm = lesson_audio_pcm(manifest, lesson, source_pcm)
+    if pcm is None:
+        logging.info(f"时间线没有{lesson}的内容 video:{manifest['video']}")
+        return None
+
+    temp_output = output_path + ".temp." + audio_format
+    command = [
+        "ffmpeg", "-y", "-v", "error",
+        *audio_pcm.input_args(),
+        *config.LESSON_AUDIO_CODECS[audio_format],
+        "-f", audio_format,     # 临时文件的后缀不是音频格式，需要指定复用器
+        temp_output
+    ]
+    logging.info(f"时间线生成{lesson}音频 {' '.join(command)}")
+    try:
+        subprocess.run(command, input=pcm.tobytes(), stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+        os.replace(temp_output, output_path)
+    finally:
+        if os.path.exists(temp_output):
+            os.remove(temp_output)
+    logging.info(f"时间线生成{lesson}音频完成 {output_path} 时长:{audio_pcm.duration(pcm):.1f}秒")
+    return output_path
+
+
+def lesson_output_path(path, lesson, video_name, video_extension):
+    """与 merge_lessons 相同的输出位置：{path}/合并视频-{类型}-{序号}/{电影名}-{序号}{后缀}"""
+    match = re.match(r"^(.*)-(.*)-(\d+)$", "每行完整视频-" + video_name)
+    if match:
+        movie_name, folder_index = match.group(2), match.group(3)
+    else:
+        movie_name, folder_index = video_name, "1"
+    output_dir = os.path.join(path, f"合并视频-{lesson}-{folder_index}")
+    os.makedirs(output_dir, exist_ok=True)
+    return os.path.join(output_dir, f"{movie_name}-{folder_index}{video_extension}")
+
+
+def render_timelines(path, lessons):
+    """
+    文件夹中每个时间线文件生成指定类型的合并视频。
+
+    :return: {类型: [生成的视频路径, ...]}
+    """
+    results = {lesson: [] for lesson in lessons}
+    for manifest_file in find_manifests(path):
+        manifest = load_manifest(manifest_file)
+        # 同一个原视频的各类合并视频共用一次解码的音频
+        source_pcm = None
+        for lesson in lessons:
+            output_path = lesson_output_path(path, lesson, manifest["video_name"], manifest["video_extension"])
+            try:
+                if source_pcm is None and plan_lesson(manifest, lesson):
+                    source_pcm = decode_source_pcm(manifest)
+                if render_lesson(manifest, lesson, output_path, source_pcm):
+                    results[lesson].append(output_path)
+                    clip_catalog.register_clip(output_path, media=clip_spec.clip_media())
+                    print(f"合并视频完成: {output_path}")
+            except subprocess.CalledProcessError as e:
+                print(f"合并失败: {output_path}")
+                logging.error(f"时间线生成{lesson}视频失败 {output_path} 错误信息: {e}")
+    return results
+
+
+def render_timeline_audios(path, lessons, audio_format=None):
+    """
+    文件夹中每个时间线文件生成指定类型的合并视频的音频，保存在与合并视频相同的位置（后缀为音频格式）。
+
+    :return: {类型: [生成的音频路径, ...]}
+    """
+    audio_format = audio_format or config.LESSON_AUDIO_FORMAT
+    results = {lesson: [] for lesson in lessons}
+    for manifest_file in find_manifests(path):
+        manifest = load_manifest(manifest_file)
+        # 同一个原视频的各类合并音频共用一次解码的音频
+        source_pcm = None
+        for lesson in lessons:
+            output_path = lesson_output_path(path, lesson, manifest["video_name"], "." + audio_format)
+            try:
+                if source_pcm is None and any(piece["type"] == "range" for piece in plan_lesson(manifest, lesson)):
+                    source_pcm = decode_source_pcm(manifest)
+                if render_lesson_audio(manifest, lesson, output_path, audio_format, source_pcm):
+                    results[lesson].append(output_path)
+                    print(f"合并音频完成: {output_path}")
+            except subprocess.CalledProcessError as e:
+                print(f"合并音频失败: {output_path}")
+                logging.error(f"时间线生成{lesson}音频失败 {output_path} 错误信息: {e.stderr}")
+    return results
@@ -1,8 +1,6 @@
 import json
 import shutil
 import os
-import torch
-from pydub import AudioSegment
 import subprocess
 import shlex
 from datetime import datetime, timedelta
@@ -11,13 +9,32 @@ import logging
 import time
 from functools import wraps
 import re
-from PIL import Image, ImageDraw, ImageFont
-import cv2
 import chardet
-from tinytag import TinyTag
-from markdown_pdf import MarkdownPdf, Section
+from movie_opt.media_probe import probe_media
+from movie_opt.encoder import video_encode_args, hwaccel_args
+from movie_opt.chunked_encode import encode_chunked
+
+
+_CUDA_AVAILABLE = None
+
+def cuda_available():
+    """
+    是否可以使用 CUDA。
+
+    torch 导入很慢，只在第一次需要判断时才导入，结果在进程内缓存。
+    """
+    global _CUDA_AVAILABLE
+    if _CUDA_AVAILABLE is None:
+        try:
+            import torch
+            _CUDA_AVAILABLE = torch.cuda.is_available()
+        except ImportError:
+            _CUDA_AVAILABLE = False
+    return _CUDA_AVAILABLE
+
 
 def markdown_to_pdf(md_file, pdf_file):
+    from markdown_pdf import MarkdownPdf, Section
     pdf = MarkdownPdf()
     pdf.meta["title"] = "教程"
     pdf.meta["author"] = "Luo"
@@ -116,6 +133,8 @@ def overlay_image(background_path, overlay_path, output_path=None, new_width=Non
     如果未提供 output_path，则直接覆盖原背景图片。
     """
     from PIL import Image
+    # 提高 Pillow 允许的最大像素数
+    Image.MAX_IMAGE_PIXELS = None
 
     # 打开背景图片并转换为RGBA模式（支持透明度）
     bg = Image.open(background_path).convert("RGBA")
@@ -155,10 +174,6 @@ def overlay_image(background_path, overlay_path, output_path=None, new_width=Non
 
 
 
-
-# 提高 Pillow 允许的最大像素数
-Image.MAX_IMAGE_PIXELS = None
-
 def wrap_text(text, draw, font, max_width):
     wrapped_lines = []
     current_line = ""
@@ -219,6 +234,7 @@ def colorize_text(text, key_words):
 
 def create_png_with_text(text, output_path, font_size=44, background_alpha=100, image_width=1284,
                          font_color="black", background_color=(255, 255, 255),colors_ex=None):
+    from PIL import Image, ImageDraw, ImageFont
     alpha = int(background_alpha * 255 / 100)
     font_path = os.path.join(os.path.dirname(resource_filename(__name__,".")),'commands/static', "AlibabaPuHuiTi-3-75-SemiBold.ttf")
     font = None
@@ -725,6 +741,22 @@ def delete_txt_files(folder_path):
                 except Exception as e:
                     print(f"无法删除文件 {file_path}: {e}")
 
+def drawtext_filter(text):
+    """在画面正中间绘制半透明大字的 drawtext 滤镜"""
+    # 字体文件路径
+    font_path = os.path.join(resource_filename(__name__,"commands"),'static', "AlibabaPuHuiTi-3-115-Black.ttf")  # 确保使用正确的路径
+    # drawtext需要修改路径样式为 "C\:/Users/luoruofeng/Desktop/test3/SourceHanSerif-Bold.otf"
+    font_path = font_path.replace("\\","/").replace(":","\\:")
+    return (
+        f"drawtext=text='{text}':"  # 动态设置文本
+        f"fontfile='{font_path}':"  # 设置字体文件路径
+        "fontcolor=white@0.5:"  # 设置字体颜色为白色，透明度50%
+        "fontsize=222:"  # 设置字体大小
+        "x=(w-text_w)/2:"  # 水平居中
+        "y=(h-text_h)/2"  # 垂直居中
+    )
+
+
 def add_text_to_video(input_file, text):
     """
     在视频中添加文字，先保存到临时文件，再将临时文件替换原视频文件
@@ -741,37 +773,20 @@ def add_text_to_video(input_file, text):
     # 获取文件扩展名
     file_ext = os.path.splitext(input_file)[1].lower()
 
-    # 临时文件路径
-    temp_file = f"add_font_temp{file_ext}"
+    # 临时文件放在原视频旁边，多个视频同时处理时不会冲突
+    temp_file = f"{input_file}.add_font_temp{file_ext}"
 
     # 如果临时文件已经存在，删除它
     if os.path.exists(temp_file):
         os.remove(temp_file)
 
     try:
-        # 字体文件路径
-        font_path = os.path.join(resource_filename(__name__,"commands"),'static', "AlibabaPuHuiTi-3-115-Black.ttf")  # 确保使用正确的路径
-        # drawtext需要修改路径样式为 "C\:/Users/luoruofeng/Desktop/test3/SourceHanSerif-Bold.otf"
-        font_path = font_path.replace("\\","/").replace(":","\\:")
-        
-        if torch.cuda.is_available():
-            video_codec = "h264_nvenc"
-        else:
-            video_codec = "libx264"
-
         # 构造ffmpeg命令
         command = [
             "ffmpeg",
             "-i", input_file,  # 输入文件
-            "-vf", (
-                f"drawtext=text='{text}':"  # 动态设置文本
-                f"fontfile='{font_path}':"  # 设置字体文件路径
-                "fontcolor=white@0.5:"  # 设置字体颜色为白色，透明度50%
-                "fontsize=222:"  # 设置字体大小
-                "x=(w-text_w)/2:"  # 水平居中
-                "y=(h-text_h)/2"  # 垂直居中
-            ),
-            "-c:v", video_codec,
+            "-vf", drawtext_filter(text),
+            *video_encode_args(),
             "-codec:a", "copy",  # 保留原始音频
             temp_file  # 临时输出文件
         ]
@@ -781,7 +796,7 @@ def add_text_to_video(input_file, text):
 
         # 替换原文件为处理后的临时文件
         os.replace(temp_file, input_file)
-        logging.info(f"视频添加文字 text:{text} input_file:{input_file} font_path:{font_path}")
+        logging.info(f"视频添加文字 text:{text} input_file:{input_file}")
     finally:
         # 操作完成后，删除临时文件
         if os.path.exists(temp_file):
@@ -900,28 +915,24 @@ def resize_video(video_path, target_width, target_height, file_extension=".mp4")
 
     if (width, height) != (target_width, target_height):
         temp_path = f"{video_path}.temp" + file_extension
-        if torch.cuda.is_available():
-            command = [
-                "ffmpeg",
-                "-hwaccel", "cuda",
-                "-i", video_path,
-                "-vf", f"scale_cuda={target_width}:{target_height}",
-                "-c:v", "h264_nvenc",
-                "-c:a", "copy",
-                temp_path
-            ]
-        else:
-            command = [
-                "ffmpeg",
-                "-i", video_path,
-                "-vf", f"scale={target_width}:{target_height}",
-                "-c:v", "libx264",
-                "-c:a", "copy",
-                temp_path
-            ]
-        print(" ".join(command))
+        hwaccel = hwaccel_args()
         try:
-            subprocess.run(command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            if hwaccel:
+                # 解码、缩放、编码都在显卡上完成
+                command = [
+                    "ffmpeg",
+                    *hwaccel,
+                    "-i", video_path,
+                    "-vf", f"scale_cuda={target_width}:{target_height}",
+                    *video_encode_args(),
+                    "-c:a", "copy",
+                    temp_path
+                ]
+                print(" ".join(command))
+                subprocess.run(command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            else:
+                # CPU 编码时分段并行
+                encode_chunked(video_path, temp_path, video_filter=f"scale={target_width}:{target_height}")
             # 如果视频调整成功，删除原视频并重命名临时文件
             if os.path.exists(video_path):
                 os.remove(video_path)  # 删除原视频
@@ -941,25 +952,19 @@ def resize_video(video_path, target_width, target_height, file_extension=".mp4")
 
 def get_video_w_h(video_path):
         """
-        获取视频的宽高像素，例如 "1920x1080"。
+        获取视频的宽高像素，例如 (1920, 1080)。
 
         :param video_path: str, 视频文件的路径。
-        :return: str, 视频的宽高像素，格式为 "宽x高"。
+        :return: tuple, 视频的 (宽, 高)。
         :raises ValueError: 如果无法读取视频。
         """
-        # 打开视频文件
-        cap = cv2.VideoCapture(video_path)
-        if not cap.isOpened():
+        try:
+            info = probe_media(video_path)
+        except Exception as e:
+            raise ValueError(f"无法打开视频文件: {video_path} {e}")
+        if info.width is None or info.height is None:
             raise ValueError(f"无法打开视频文件: {video_path}")
-
-        # 获取视频的宽度和高度
-        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-
-        # 释放视频对象
-        cap.release()
-
-        return width,height
+        return info.width,info.height
 
 def get_filename_without_extension(file_path):
     """
@@ -1049,6 +1054,76 @@ def timestamp_convert_to_seconds(timestamp):
     return total_seconds
 
 
+def ass_time_to_seconds(ass_time):
+    """将 ASS 时间 (h:mm:ss.cc) 转换为秒"""
+    hours, minutes, seconds = ass_time.strip().split(":")
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def seconds_to_ass_time(seconds):
+    """将秒转换为 ASS 时间 (h:mm:ss.cc)"""
+    centiseconds = int(round(max(0.0, seconds) * 100))
+    hours, centiseconds = divmod(centiseconds, 360000)
+    minutes, centiseconds = divmod(centiseconds, 6000)
+    return f"{hours}:{minutes:02d}:{centiseconds // 100:02d}.{centiseconds % 100:02d}"
+
+
+def shift_ass_events(ass_path, offset_seconds, output_path, duration=None):
+    """
+    把 ASS 字幕所有事件的时间减去 offset_seconds，保存为新的 ASS 文件。
+
+    截取视频片段时输入的时间戳从片段开头（offset_seconds）重新计算，字幕也要一起平移才能对齐。
+    平移后在片段之外（结束时间 <= 0 或开始时间 >= duration）的事件直接删除。
+
+    :param duration: 片段时长，None 时不删除片段之后的事件
+    :return: 保留的事件数量
+    """
+    with open(ass_path, "r", encoding="utf-8-sig") as f:
+        lines = f.read().splitlines()
+
+    output_lines = []
+    in_events = False
+    fields = None
+    kept = 0
+    for line in lines:
+        stripped = line.strip()
+        if stripped.startswith("[") and stripped.endswith("]"):
+            in_events = stripped.lower() == "[events]"
+        elif in_events and stripped.lower().startswith("format:"):
+            fields = [field.strip().lower() for field in stripped.split(":", 1)[1].split(",")]
+        elif in_events and fields and (stripped.startswith("Dialogue:") or stripped.startswith("Comment:")):
+            event_type, value = line.split(":", 1)
+            values = value.split(",", len(fields) - 1)
+            start_index, end_index = fields.index("start"), fields.index("end")
+            start = ass_time_to_seconds(values[start_index]) - offset_seconds
+            end = ass_time_to_seconds(values[end_index]) - offset_seconds
+            if end <= 0 or (duration is not None and start >= duration):
+                continue
+            values[start_index] = seconds_to_ass_time(start)
+            values[end_index] = seconds_to_ass_time(end)
+            line = f"{event_type}: {','.join(v.strip() if i < len(fields) - 1 else v.lstrip() for i, v in enumerate(values))}"
+            kept += 1
+        output_lines.append(line)
+
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(output_lines) + "\n")
+    logging.info(f"平移ASS字幕 {ass_path} -> {output_path} offset:{offset_seconds:.3f} 保留事件数:{kept}")
+    return kept
+
+
+def burn_subtitle_filter(ass_path, offset_seconds, duration, workspace):
+    """
+    在截取片段的同一次编码中烧录 ASS 字幕（不需要先生成整部带字幕的视频）。
+
+    字幕按片段开头 offset_seconds 平移后保存到 workspace/subtitle.ass。
+    ffmpeg 必须以 workspace 为工作目录运行（cwd=workspace），滤镜里只用相对文件名，避免转义 Windows 路径。
+
+    :return: ass 滤镜
+    """
+    shift_ass_events(ass_path, offset_seconds, os.path.join(workspace, "subtitle.ass"), duration)
+    return "ass=subtitle.ass"
+
+
 
 # 统一音频编码和参数
 
@@ -1089,32 +1164,13 @@ def normalize_audio(video_files):
 
 
 def get_time_base(video_path):
-    # 使用 shlex.quote 自动处理路径中的特殊字符（如空格），但不要加额外的引号
-    safe_video_path = shlex.quote(video_path).strip("'")
-    
-    # 使用 ffprobe 获取视频的 time_base
-    command = [
-        'ffprobe',
-        '-v', 'error',
-        '-select_streams', 'v:0',
-        '-show_entries', 'stream=time_base',
-        '-of', 'default=noprint_wrappers=1:nokey=1',
-        safe_video_path  # 使用 shlex.quote 处理后的路径
-    ]
-    print(" ".join(command))  # 打印命令以供调试
-    # 执行命令并捕获输出，显式指定 stderr 使用 utf-8 编码
-    result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, encoding='utf-8')
+    # 视频流的 time_base 来自缓存的 ffprobe 信息
+    try:
+        time_base = probe_media(video_path).time_base
+    except Exception as e:
+        print(f"FFmpeg Error: {e}")
+        time_base = None
 
-    # 检查 stderr 是否为空，并进行相应的处理
-    if result.stderr:
-        try:
-            print(f"FFmpeg Error: {result.stderr.strip()}")
-        except UnicodeDecodeError:
-            print("Error decoding FFmpeg output.")
-    
-    # 获取 time_base 值
-    time_base = result.stdout.strip()
-    
     if time_base:
         return time_base
     else:
@@ -1172,41 +1228,27 @@ def change_timescale(video_path, timescale=1000,file_extension=".mp4"):
 # video_path = r"C:\Users\luoruofeng\Desktop\test\视频片段\每行中文视频-Lion King 2 1998-en@cn-3\Lion King 2 1998-en@cn-3-19.mp4"
 # change_timescale(video_path,800)
 
+def has_audio_stream(file_path):
+    """
+    判断文件是否包含音频流。
+
+    :param file_path: str, 媒体文件路径
+    :return: bool, 有音频流返回 True
+    """
+    return probe_media(file_path).has_audio
+
+
 def get_mp4_duration_ffmpeg(file_path):
     """
-    使用 ffmpeg 获取 MP4 视频的总时长（秒），精确到小数点后 3 位。
+    使用 ffprobe 获取 MP4 视频的总时长（秒），精确到小数点后 3 位。
 
     :param file_path: str, MP4 文件路径
     :return: float, 视频时长（秒）
     """
     try:
-        # 确保路径为绝对路径
-        file_path = os.path.abspath(file_path)
-
-        # 调用 ffprobe 获取视频时长
-        command = [
-            "ffprobe", "-v", "error", "-select_streams", "v:0",
-            "-show_entries", "format=duration", "-of", "csv=p=0", file_path
-        ]
-        print(" ".join(command))
-        result = subprocess.run(
-            command,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            encoding="utf-8"  # 显式指定编码
-        )
-        
-        # 检查 ffprobe 是否成功执行
-        if result.returncode != 0:
-            raise RuntimeError(f"ffprobe 执行失败: {result.stderr.strip()}")
-        
-        # 检查 stdout 是否为空
-        if result.stdout is None or result.stdout.strip() == "":
-            raise RuntimeError(f"ffprobe 输出为空: {result.stderr.strip()}")
-
-        # 解析时长并保留 3 位小数
-        duration = float(result.stdout.strip())
+        duration = probe_media(file_path).duration
+        if duration is None:
+            raise RuntimeError(f"ffprobe 没有返回时长: {file_path}")
         return round(duration, 3)
     except Exception as e:
         print(f"发生错误: {e}")
@@ -1232,13 +1274,9 @@ def mp4_2_mp3(video_path: str):
         print(f"MP3 文件已存在，跳过转换: {output_path}")
         return output_path
 
+    # 音频提取不需要解码视频，也就不需要硬件加速
     command = ["ffmpeg"]
 
-    # 虽然音频提取主要是CPU工作，但如果需要，可以添加硬件加速解码
-    if torch.cuda.is_available():
-        print("CUDA is available, attempting to use hwaccel.")
-        command.extend(["-hwaccel", "cuda"])
-
     command.extend([
         "-i", video_path,
         "-vn",  # 禁用视频流
@@ -1263,32 +1301,16 @@ def mp4_2_mp3(video_path: str):
 
 def get_mp4_duration_cv2(file_path):
     """
-    使用 OpenCV (cv2) 获取 MP4 视频的总时长（秒），精确到小数点后 3 位。
+    获取 MP4 视频流的总时长（秒），精确到小数点后 3 位。
 
     :param file_path: str, MP4 文件路径
     :return: float, 视频时长（秒）
     """
     try:
-        # 确保路径为绝对路径
-        file_path = os.path.abspath(file_path)
-
-        # 打开视频文件
-        cap = cv2.VideoCapture(file_path)
-
-        if not cap.isOpened():
-            raise RuntimeError(f"无法打开视频文件: {file_path}")
-
-        # 获取视频的帧数和帧率
-        frame_count = cap.get(cv2.CAP_PROP_FRAME_COUNT)  # 视频的总帧数
-        fps = cap.get(cv2.CAP_PROP_FPS)  # 视频的帧率
-
-        # 计算视频时长（秒）
-        duration = frame_count / fps
-
-        # 释放视频捕获对象
-        cap.release()
-
-        # 保留 3 位小数
+        info = probe_media(file_path)
+        duration = info.stream_duration
+        if duration is None:
+            duration = info.duration
         return round(duration, 3)
     except Exception as e:
         print(f"发生错误: {e}")
@@ -1321,6 +1343,7 @@ def merge_mp3_files(mp3_path1, mp3_path2):
     :param mp3_path1: 第一个 MP3 文件路径
     :param mp3_path2: 第二个 MP3 文件路径（保存路径）
     """
+    from pydub import AudioSegment
     try:
         # 加载 MP3 文件
         audio1 = AudioSegment.from_file(mp3_path1, format="mp3")
@@ -1344,17 +1367,17 @@ def merge_mp3_files(mp3_path1, mp3_path2):
 # concatenate_mp3("path_to_first.mp3", "path_to_second.mp3")
 
 def get_mp3_duration_tinytag(file_path):
-    """使用 tinytag 获取 MP3 文件时长（秒）"""
+    """获取 MP3 文件时长（秒）"""
     try:
-        audio = TinyTag.get(file_path)
-        duration = audio.duration
-        return duration
+        return probe_media(file_path).duration
     except FileNotFoundError:
         raise ValueError(f"文件 '{file_path}' 未找到")
     except Exception as e:
         raise ValueError(f"发生错误：{e}")
 
 def crop_image(image_path, width=None, height=None):
+    from PIL import Image
+    Image.MAX_IMAGE_PIXELS = None
     # 打开图片
     with Image.open(image_path) as img:
         # 获取原始宽高
@@ -0,0 +1,35 @@
+import pytest
+
+ai = pytest.importorskip("movie_opt.commands.ai")
+
+
+def test_parse_word_judgements_validates_each_word():
+    reply = """```json
+{"words": [
+  {"word": "Serendipity", "score": 8, "in_sentence": true, "misspelled": false, "is_name": false, "proper_noun": false},
+  {"word": "simba", "score": 6, "in_sentence": true, "misspelled": false, "is_name": true, "proper_noun": true},
+  {"word": "ubiquitous", "score": "9", "in_sentence": true, "misspelled": false, "is_name": false, "proper_noun": false},
+  {"word": "other", "score": 7, "in_sentence": true, "misspelled": false, "is_name": false, "proper_noun": false}
+]}
+```"""
+    judgements = ai.parse_word_judgements(reply, ["serendipity", "simba", "ubiquitous"])
+
+    assert sorted(judgements) == ["serendipity", "simba"]
+    assert ai.judgement_score(judgements["serendipity"], 4) == 8
+    assert ai.judgement_score(judgements["simba"], 4) == 0
+
+
+def test_parse_word_judgements_invalid_reply():
+    assert ai.parse_word_judgements("调用模型时发生错误", ["word"]) == {}
+
+
+def test_score_lines_returns_explanations_once():
+    calls = []
+    launage_ai = ai.LaunageAI.__new__(ai.LaunageAI)
+    launage_ai.get_hard_word_scores = lambda cn, en, filter_score: calls.append(en) or ({"ubiquitous": 8} if "ubiquitous" in en else None)
+    launage_ai.explain_words = lambda scores: calls.append(tuple(scores)) or ("解释", {"en": "cn"})
+
+    results = launage_ai.score_lines([("中", "it is ubiquitous"), ("中", "it is fine")], explain=True, workers=1)
+
+    assert results == [({"ubiquitous": 8}, "解释", {"en": "cn"}), (None, None, None)]
+    assert calls == ["it is ubiquitous", ("ubiquitous",), "it is fine"]
@@ -0,0 +1,10 @@
+from movie_opt.chunked_encode import plan_chunks
+
+
+def test_plan_chunks_splits_at_keyframes():
+    keyframes = [0, 2, 4, 6, 8, 10, 12, 14, 16, 18]
+    assert plan_chunks(keyframes, 20.0, 5) == [(0.0, 6), (6, 12), (12, 20.0)]
+
+
+def test_plan_chunks_short_video_is_one_chunk():
+    assert plan_chunks([0, 2, 4], 5.0, 60) == [(0.0, 5.0)]
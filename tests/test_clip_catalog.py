@@ -0,0 +1,62 @@
+from movie_opt import clip_catalog
+
+
+def test_parse_clip_path():
+    assert clip_catalog.parse_clip_path("/x/每行发音视频-movie-2/movie-2-15.mp4") == {
+        "kind": "每行发音视频", "movie": "movie", "segment": 2, "line": 15,
+    }
+    assert clip_catalog.parse_clip_path("/x/合并视频-中英对照-3/movie-3.mp4") == {
+        "kind": "合并视频-中英对照", "movie": "movie", "segment": 3, "line": None,
+    }
+    assert clip_catalog.parse_clip_path("/x/每行截图-movie-2/movie-2-15.mp4") is None
+    assert clip_catalog.parse_clip_path("/x/每行发音视频-movie-2/movie-2-15.png") is None
+
+
+def test_sync_and_query(tmp_path):
+    for folder, name in [
+        ("每行完整视频-movie-1", "movie-1-2.mp4"),
+        ("每行完整视频-movie-1", "movie-1-1.mp4"),
+        ("每行中文视频-movie-1", "movie-1-1.mp4"),
+        ("每行中文视频-movie-2", "movie-2-1.mp4"),
+        ("合并视频-磨耳朵-1", "movie-1.mp4"),
+    ]:
+        (tmp_path / folder).mkdir(exist_ok=True)
+        (tmp_path / folder / name).write_bytes(b"0")
+
+    catalog = clip_catalog.ClipCatalog(str(tmp_path))
+    catalog.sync()
+
+    kinds = ["每行完整视频", "每行中文视频"]
+    assert catalog.segments(kinds) == [1, 2]
+    rows = catalog.lines(kinds, 1)
+    assert [(row["kind"], row["line"]) for row in rows] == [
+        ("每行完整视频", 1), ("每行中文视频", 1), ("每行完整视频", 2),
+    ]
+    assert list(catalog.merged("合并视频-磨耳朵")) == [1]
+
+    (tmp_path / "每行中文视频-movie-2" / "movie-2-1.mp4").unlink()
+    assert catalog.segments(kinds) == [1]
+
+
+def test_register_does_not_probe(tmp_path, monkeypatch):
+    probed = []
+
+    def probe_media(path):
+        probed.append(path)
+        raise OSError(f"不是视频: {path}")
+
+    monkeypatch.setattr(clip_catalog, "probe_media", probe_media)
+    folder = tmp_path / "每行发音视频-movie-1"
+    folder.mkdir()
+    (folder / "movie-1-1.mp4").write_bytes(b"0")
+    (folder / "movie-1-2.mp4").write_bytes(b"0")
+
+    clip_catalog.register_clip(str(folder / "movie-1-1.mp4"), media={"duration": 2.5, "fps": 25})
+    assert probed == []
+
+    # 只有没有登记过的片段在同步时读取媒体信息
+    catalog = clip_catalog.open_catalog(str(tmp_path))
+    catalog.sync()
+    assert probed == [str(folder / "movie-1-2.mp4")]
+    rows = catalog.lines(["每行发音视频"], 1)
+    assert [(row["line"], row["duration"], row["fps"]) for row in rows] == [(1, 2.5, 25), (2, None, None)]
@@ -0,0 +1,29 @@
+from movie_opt import clip_spec
+from movie_opt.media_probe import MediaInfo
+
+
+def clip_info(path, **video):
+    stream = {
+        "codec_type": "video", "codec_name": "h264", "avg_frame_rate": "25/1", "time_base": "1/1000",
+        "pix_fmt": "yuv420p", "width": 1280, "height": 720, "profile": "High", "level": 31, "has_b_frames": 2,
+    }
+    stream.update(video)
+    audio = {"codec_type": "audio", "codec_name": "aac", "sample_rate": "44100", "channels": 2}
+    return MediaInfo(path, {"streams": [stream, audio], "format": {}})
+
+
+def test_clips_conform_checks_profile_and_level(monkeypatch):
+    infos = {
+        "a.mp4": clip_info("a.mp4"),
+        "b.mp4": clip_info("b.mp4"),
+        "main.mp4": clip_info("main.mp4", profile="Main"),
+        "level.mp4": clip_info("level.mp4", level=40),
+        "nvenc.mp4": clip_info("nvenc.mp4", has_b_frames=0),
+    }
+    monkeypatch.setattr(clip_spec, "probe_media", lambda path: infos[path])
+
+    assert clip_spec.clips_conform(["a.mp4", "b.mp4"])
+    assert not clip_spec.clips_conform(["a.mp4", "main.mp4"])
+    assert not clip_spec.clips_conform(["a.mp4", "level.mp4"])
+    assert not clip_spec.clips_conform(["a.mp4", "nvenc.mp4"])
+    assert clip_spec.check_clip("level.mp4") == []
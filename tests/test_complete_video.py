@@ -0,0 +1,26 @@
+import pytest
+
+picture = pytest.importorskip("movie_opt.commands.picture")
+
+
+def subtitle_lines(end_times):
+    return [{"st": "00:00:00,000", "et": et} for et in end_times]
+
+
+def test_every_line_gets_a_complete_clip():
+    # 后两行字幕的结束时间超过了视频时长
+    lines = subtitle_lines(["00:00:01,000", "00:00:02,000", "00:00:09,990", "00:00:12,000", "00:00:15,000"])
+    boundaries = picture.complete_video_boundaries(lines, 10)
+
+    assert len(boundaries) == len(lines) - 1
+    assert boundaries[:2] == [1, 2]
+    assert all(b < a for b, a in zip(boundaries, boundaries[1:]))
+    assert boundaries[-1] <= 10 - picture.COMPLETE_VIDEO_MIN_PIECE_SECOND + 1e-6
+
+
+def test_video_too_short_for_all_lines():
+    lines = subtitle_lines(["00:00:01,000"] * 10)
+    boundaries = picture.complete_video_boundaries(lines, 0.2)
+
+    assert len(boundaries) == 3
+    assert boundaries[0] >= picture.COMPLETE_VIDEO_MIN_PIECE_SECOND - 1e-6
@@ -0,0 +1,31 @@
+from movie_opt.concat_plan import plan_shared_runs
+
+
+def expand(runs, plan):
+    items = []
+    for kind, value in plan:
+        items.extend(runs[value] if kind == "run" else [value])
+    return items
+
+
+def test_shared_runs_between_lessons():
+    sequences = {
+        "磨耳朵": ["分段1", "发音1", "发音2-1", "儿童1", "分段2", "发音2", "发音2-2", "儿童2"],
+        "无儿童磨耳朵": ["完整1", "发音1", "发音2-1", "完整2", "发音2", "发音2-2"],
+    }
+    runs, plans = plan_shared_runs(sequences, 2)
+
+    assert runs == [("发音1", "发音2-1"), ("发音2", "发音2-2")]
+    assert plans["无儿童磨耳朵"] == [("clip", "完整1"), ("run", 0), ("clip", "完整2"), ("run", 1)]
+    for name, items in sequences.items():
+        assert expand(runs, plans[name]) == items
+
+
+def test_disabled_or_unshared():
+    sequences = {"a": ["x", "y", "z"], "b": ["x", "y", "w"]}
+    runs, plans = plan_shared_runs(sequences, 0)
+    assert runs == []
+    assert plans["a"] == [("clip", "x"), ("clip", "y"), ("clip", "z")]
+
+    runs, plans = plan_shared_runs({"a": ["x", "y"], "b": ["y", "x"]}, 2)
+    assert runs == []
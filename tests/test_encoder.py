@@ -0,0 +1,88 @@
+from movie_opt.encoder import _parse_encoders, _parse_hwaccels, smart_cut_head_args, smart_cut_keyframe, smart_cut_parts
+from movie_opt.media_probe import MediaInfo
+
+
+def video_info(**stream):
+    video = {"codec_type": "video", "codec_name": "h264", "profile": "High", "level": 40, "pix_fmt": "yuv420p", "field_order": "progressive"}
+    video.update(stream)
+    return MediaInfo("movie.mp4", {"streams": [video]})
+
+
+def test_parse_encoders():
+    output = """Encoders:
+ V..... = Video
+ ------
+ V....D libx264              libx264 H.264 / AVC / MPEG-4 AVC / MPEG-4 part 10 (codec h264)
+ V....D h264_nvenc           NVIDIA NVENC H.264 encoder (codec h264)
+ A....D aac                  AAC (Advanced Audio Coding)
+"""
+    assert _parse_encoders(output) == ["libx264", "h264_nvenc", "aac"]
+
+
+def test_parse_hwaccels():
+    output = "Hardware acceleration methods:\ncuda\nvaapi\n\n"
+    assert _parse_hwaccels(output) == ["cuda", "vaapi"]
+
+
+def test_smart_cut_head_args_match_source():
+    args, reason = smart_cut_head_args(video_info(profile="Main", level=31), profile="fast")
+    assert reason is None
+    assert args[:2] == ["-c:v", "libx264"]
+    assert args[args.index("-profile:v") + 1] == "main"
+    assert args[args.index("-level:v") + 1] == "3.1"
+    assert args[args.index("-pix_fmt") + 1] == "yuv420p"
+
+    args, _ = smart_cut_head_args(video_info(profile="Constrained Baseline"), profile="fast")
+    assert args[args.index("-profile:v") + 1] == "baseline"
+
+
+def test_smart_cut_head_args_fallbacks():
+    for stream in [
+        {"codec_name": "hevc"},
+        {"profile": "High 10"},
+        {"profile": "High 4:2:2"},
+        {"pix_fmt": "yuv420p10le"},
+        {"field_order": "tt"},
+        {"level": -99},
+        {"level": None},
+    ]:
+        args, reason = smart_cut_head_args(video_info(**stream), profile="fast")
+        assert args is None and reason, stream
+
+
+def test_smart_cut_keyframe():
+    keyframes = [0.0, 2.0, 4.0]
+    assert smart_cut_keyframe(keyframes, 1.0, 3.0) == 2.0
+    assert smart_cut_keyframe(keyframes, 2.0, 3.0) == 2.0
+    # 片段内没有关键帧
+    assert smart_cut_keyframe(keyframes, 2.5, 3.5) is None
+    assert smart_cut_keyframe(keyframes, 4.5, 5.0) is None
+
+
+def cut_frames(frames, keyframes, plan):
+    """按 ffmpeg 的行为模拟两部分输出的帧：开头精确跳转到 -ss，复制部分从 -ss 之前最近的关键帧开始"""
+    output = []
+    if plan["head"] is not None:
+        seek, duration = plan["head"]
+        output += [t for t in frames if seek <= t and t - seek < duration]
+    seek, duration = plan["tail"]
+    copy_start = max(k for k in keyframes if k <= seek)
+    output += [t for t in frames if copy_start <= t and t - copy_start < duration]
+    return output
+
+
+def test_smart_cut_parts_frames_match_requested_range():
+    # 29.97fps，每 12 帧一个关键帧：关键帧时间不是整毫秒，舍入到毫秒会落到上一个 GOP
+    frame_duration = 1001 / 30000
+    frames = [i * frame_duration for i in range(300)]
+    keyframes = frames[::12]
+
+    for start_frame, end_frame in [(5, 100), (12, 40), (13, 25), (1, 299)]:
+        start, end = frames[start_frame], frames[end_frame]
+        keyframe = smart_cut_keyframe(keyframes, start, end)
+        output = cut_frames(frames, keyframes, smart_cut_parts(keyframe, start, end))
+
+        expected = frames[start_frame:end_frame]
+        assert output == expected, (start_frame, end_frame)
+        duration = output[-1] - output[0] + frame_duration
+        assert abs(duration - (end - start)) < 1e-6
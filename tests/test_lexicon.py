@@ -0,0 +1,69 @@
+import sqlite3
+
+from movie_opt import lexicon
+
+
+def test_tokenize_and_names():
+    tokens = lexicon.tokenize("Where is Harry? He went to Hogwarts with I'm-sure Ron.")
+    assert tokens[0] == ("Where", True)
+    assert ("Harry", False) in tokens
+    assert ("He", True) in tokens
+    assert lexicon.looks_like_name("Harry", False)
+    assert not lexicon.looks_like_name("Harry", True)
+    assert not lexicon.looks_like_name("I'm", False)
+    assert not lexicon.looks_like_name("STOP", False)
+
+
+def test_lemma_candidates():
+    assert "run" in lexicon.lemma_candidates("running")
+    assert "study" in lexicon.lemma_candidates("studies")
+    assert "go" in lexicon.lemma_candidates("went")
+    assert "nothing" in lexicon.lemma_candidates("Nothing's")
+
+
+def test_inflections_need_matching_part_of_speech():
+    prefilter = lexicon.LexicalPrefilter(db_path="/nonexistent/english_data.db")
+
+    for word in ["running", "studies", "stopped", "happier", "biggest", "quickly", "sadness", "knives", "went"]:
+        assert prefilter.is_common(word), word
+    # 后缀相同但不是变形：earn/home/sing 等不能让这些单词变成常用词
+    for word in ["earnest", "wither", "sheer", "cower", "seer", "homely", "singed", "witness"]:
+        assert not prefilter.is_common(word), word
+    assert prefilter.check_line("Be earnest, and wither not.") == ["earnest", "wither"]
+
+
+def test_bundled_common_words():
+    prefilter = lexicon.LexicalPrefilter(db_path="/nonexistent/english_data.db")
+
+    assert prefilter.check_line("I think we should go home now, it's getting late.") == []
+    assert prefilter.check_line("The prophecy, Harry, was unequivocal.") == ["prophecy", "unequivocal"]
+    assert prefilter.filter_words(["home", "unequivocal", "put up with"]) == ["unequivocal", "put up with"]
+    stats = prefilter.stats()
+    assert stats["lines"] == 2 and stats["lines_skipped"] == 1 and stats["words_dropped"] == 1
+    assert stats["names_skipped"] == 1
+    assert stats["llm_calls_saved"] >= 2
+
+
+def test_english_data_db(tmp_path):
+    db_path = tmp_path / "english_data.db"
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE english_data (word TEXT, frq INTEGER, bnc INTEGER, oxford INTEGER, collins INTEGER, tag TEXT, exchange TEXT)")
+    conn.executemany("INSERT INTO english_data VALUES (?, ?, ?, ?, ?, ?, ?)", [
+        ("window", 900, 1100, 1, 5, "zk gk", ""),
+        ("prophecy", 9000, 12000, 0, 1, "gre", ""),
+        ("mice", 5000, 6000, 0, 0, "", "0:mouse/1:s"),
+        ("mouse", 1500, 2500, 1, 3, "zk", ""),
+    ])
+    conn.commit()
+    conn.close()
+    words_path = tmp_path / "common_words.txt"
+    words_path.write_text("# test\nthe a and of\n", encoding="utf-8")
+
+    prefilter = lexicon.LexicalPrefilter(db_path=str(db_path), common_words_path=str(words_path), common_rank=2000)
+    assert prefilter.is_common("windows")
+    assert prefilter.is_common("mice")
+    assert not prefilter.is_common("prophecy")
+    assert prefilter.check_line("The windows, the mice and the prophecy of Trelawney") == ["prophecy"]
+    # 复数还原成 prophecy，仍然不是常用词
+    assert not prefilter.is_common("prophecies")
+    assert prefilter.stats()["names_skipped"] == 1
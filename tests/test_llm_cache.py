@@ -0,0 +1,33 @@
+import time
+
+from movie_opt.llm_cache import LLMCache
+
+
+def test_hit_miss_and_ttl(tmp_path):
+    cache = LLMCache(db_path=str(tmp_path / "llm.db"), ttl=60, max_entries=0)
+    messages = [{"role": "user", "content": "hello"}]
+
+    assert cache.get("ollama", "qwen", messages) is None
+    cache.put("ollama", "qwen", messages, "你好")
+    assert cache.get("ollama", "qwen", messages) == "你好"
+    # 后端或模型不同时是不同的提问
+    assert cache.get("dashscope", "qwen", messages) is None
+    cache.put("ollama", "qwen", [{"role": "user", "content": "empty"}], "")
+    assert cache.get("ollama", "qwen", [{"role": "user", "content": "empty"}]) is None
+
+    cache.ttl = 0.001
+    time.sleep(0.01)
+    assert cache.get("ollama", "qwen", messages) is None
+    assert cache.stats()["expired"] == 1
+
+
+def test_lru_eviction(tmp_path):
+    cache = LLMCache(db_path=str(tmp_path / "llm.db"), ttl=0, max_entries=1)
+    cache.put("ollama", "qwen", "a", "1")
+    cache.put("ollama", "qwen", "b", "2")
+    cache.puts = 100  # 下一次保存时检查条数
+    cache.put("ollama", "qwen", "c", "3")
+
+    assert cache.get("ollama", "qwen", "c") == "3"
+    assert cache.get("ollama", "qwen", "a") is None
+    assert cache.get("ollama", "qwen", "b") is None
@@ -0,0 +1,79 @@
+import asyncio
+import threading
+
+import pytest
+
+llm_client = pytest.importorskip("movie_opt.llm_client")
+AsyncPriorityLimiter = llm_client.AsyncPriorityLimiter
+PriorityExecutor = llm_client.PriorityExecutor
+
+
+def test_priority_executor_runs_higher_priority_first():
+    executor = PriorityExecutor(1)
+    gate = threading.Event()
+    order = []
+    # 第一个任务占住唯一的工作线程，其余任务排队
+    first = executor.submit(gate.wait)
+    futures = [executor.submit(order.append, name, priority=priority) for name, priority in [("low", 20), ("high", 0), ("normal", 10)]]
+    gate.set()
+    first.result(timeout=5)
+    for future in futures:
+        future.result(timeout=5)
+    assert order == ["high", "normal", "low"]
+
+
+def test_async_priority_limiter():
+    async def run():
+        limiter = AsyncPriorityLimiter(1)
+        order = []
+
+        async def task(name, priority):
+            await limiter.acquire(priority)
+            try:
+                order.append(name)
+                await asyncio.sleep(0)
+            finally:
+                limiter.release()
+
+        await limiter.acquire()
+        tasks = [asyncio.create_task(task(name, priority)) for name, priority in [("low", 20), ("high", 0)]]
+        await asyncio.sleep(0)
+        limiter.release()
+        await asyncio.gather(*tasks)
+        assert limiter.active == 0
+        return order
+
+    assert asyncio.run(run()) == ["high", "low"]
+
+
+def test_chat_decoder_streams_until_done():
+    decoder = llm_client.ChatDecoder()
+    frames = [
+        b'{"message": {"role": "assistant", "content": "Hel"}, "done": false}',
+        b'',
+        b'{"message": {"role": "assistant", "content": "lo"}, "done": false}',
+        b'{"message": {"role": "assistant", "content": ""}, "done": true}',
+    ]
+    assert [decoder.feed_line(frame) for frame in frames] == [False, False, False, True]
+    assert decoder.text() == "Hello"
+
+
+def test_chat_decoder_stops_early():
+    decoder = llm_client.ChatDecoder(stop="number")
+    assert not decoder.feed_line('{"message": {"content": "1"}, "done": false}')
+    assert decoder.feed_line('{"message": {"content": "0分"}, "done": false}')
+    assert decoder.text() == "10分"
+
+    decoder = llm_client.ChatDecoder(stop="yes_no")
+    assert not decoder.feed_line('{"message": {"content": "不"}, "done": false}')
+    assert decoder.feed_line('{"message": {"content": "是，因为"}, "done": false}')
+    assert decoder.text() == "不是，因为"
+
+
+def test_chat_decoder_non_streaming_and_error():
+    decoder = llm_client.ChatDecoder()
+    assert decoder.feed_line('{"message": {"role": "assistant", "content": "苹果"}, "done": true}')
+    assert decoder.text() == "苹果"
+
+    with pytest.raises(RuntimeError):
+        llm_client.ChatDecoder().feed_line('{"error": "model not found"}')
@@ -0,0 +1,38 @@
+import json
+import shutil
+import subprocess
+
+import pytest
+
+pytestmark = pytest.mark.skipif(shutil.which("ffmpeg") is None or shutil.which("ffprobe") is None, reason="需要 ffmpeg")
+picture = pytest.importorskip("movie_opt.commands.picture")
+
+
+def probe_frames(path):
+    result = subprocess.run([
+        "ffprobe", "-v", "error", "-select_streams", "v:0", "-count_frames",
+        "-show_entries", "stream=nb_read_frames:format=duration", "-of", "json", path
+    ], stdout=subprocess.PIPE, check=True, text=True)
+    data = json.loads(result.stdout)
+    return int(data["streams"][0]["nb_read_frames"]), float(data["format"]["duration"])
+
+
+def test_smart_cut_segment_frame_count(tmp_path):
+    # 29.97fps、每 12 帧一个关键帧的 h264 视频，关键帧时间不是整毫秒
+    source = str(tmp_path / "source.mp4")
+    subprocess.run([
+        "ffmpeg", "-y", "-v", "error",
+        "-f", "lavfi", "-i", "testsrc=size=320x240:rate=30000/1001:duration=10",
+        "-f", "lavfi", "-i", "sine=frequency=440:duration=10",
+        "-c:v", "libx264", "-profile:v", "high", "-pix_fmt", "yuv420p", "-g", "12", "-keyint_min", "12", "-sc_threshold", "0",
+        "-c:a", "aac", "-shortest", source
+    ], check=True)
+
+    frame_duration = 1001 / 30000
+    start_frame, end_frame = 5, 100
+    output = str(tmp_path / "cut.mp4")
+    picture.smart_cut_segment(source, start_frame * frame_duration, end_frame * frame_duration, output)
+
+    frames, duration = probe_frames(output)
+    assert frames == end_frame - start_frame
+    assert abs(duration - (end_frame - start_frame) * frame_duration) < 0.05
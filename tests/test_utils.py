@@ -0,0 +1,27 @@
+import pytest
+
+utils = pytest.importorskip("movie_opt.utils")
+
+
+def test_shift_ass_events(tmp_path):
+    ass_path = tmp_path / "movie.ass"
+    ass_path.write_text(
+        "[Script Info]\n"
+        "Title: test\n"
+        "\n"
+        "[Events]\n"
+        "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text\n"
+        "Dialogue: 0,0:00:01.00,0:00:03.50,Default,,0,0,0,,before\n"
+        "Dialogue: 0,0:01:05.25,0:01:07.00,Default,,0,0,0,,{\\c&H00FF00&}inside, with comma\n"
+        "Dialogue: 0,0:03:00.00,0:03:01.00,Default,,0,0,0,,after\n",
+        encoding="utf-8",
+    )
+    output_path = tmp_path / "segment.ass"
+
+    kept = utils.shift_ass_events(str(ass_path), 60, str(output_path), duration=60)
+
+    assert kept == 1
+    content = output_path.read_text(encoding="utf-8")
+    assert "Dialogue: 0,0:00:05.25,0:00:07.00,Default,,0,0,0,,{\\c&H00FF00&}inside, with comma" in content
+    assert "before" not in content and "after" not in content
+    assert "[Script Info]" in content